@@ -0,0 +1,149 @@
+# app/cache.py
+"""
+프로세스 전역 TTL/LRU 캐시.
+- repo 조회 결과는 월 단위로만 바뀌므로 (함수, 인자, 최신 적재월) 키로 재사용.
+- Streamlit 재실행(위젯 클릭)마다 같은 SQL을 다시 돌리지 않도록 함.
+- CSV 적재 후 invalidate() 호출 → 즉시 무효화. 다른 프로세스는 최신월 변경으로 자연 무효화.
+"""
+from __future__ import annotations
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.deps import get_session
+
+REPO_CACHE_MAXSIZE = int(os.getenv("REPO_CACHE_MAXSIZE", "512"))
+REPO_CACHE_TTL_SEC = float(os.getenv("REPO_CACHE_TTL_SEC", str(6 * 3600)))
+# 최신 적재월 재확인 주기(다른 프로세스의 적재 반영 지연 상한)
+DATA_MONTH_TTL_SEC = float(os.getenv("REPO_CACHE_DATA_MONTH_TTL_SEC", "60"))
+
+_MISSING = object()
+
+
+class TTLCache:
+    """크기 제한(LRU) + TTL 캐시. 스레드 안전."""
+
+    def __init__(self, maxsize: int = 512, ttl: float = 3600.0):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl)
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = _MISSING) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else float(ttl))
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / total) if total else None,
+            }
+
+
+# 이름별 캐시 레지스트리(invalidate()/cache_stats() 일괄 대상)
+_caches: Dict[str, TTLCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str, maxsize: int = REPO_CACHE_MAXSIZE, ttl: float = REPO_CACHE_TTL_SEC) -> TTLCache:
+    with _caches_lock:
+        c = _caches.get(name)
+        if c is None:
+            c = _caches[name] = TTLCache(maxsize, ttl)
+        return c
+
+
+repo_cache = get_cache("repo")
+
+_SQL_DATA_MONTH = text("select to_char(max(month), 'YYYYMM') from public.mart_merchant_monthly_metrics")
+
+_data_month_lock = threading.Lock()
+_data_month: Tuple[float, Optional[str]] = (0.0, None)
+
+
+def data_month() -> Optional[str]:
+    """최신 적재월(TA_YM). DATA_MONTH_TTL_SEC 동안 메모."""
+    global _data_month
+    now = time.monotonic()
+    with _data_month_lock:
+        checked_at, value = _data_month
+        if checked_at and now - checked_at < DATA_MONTH_TTL_SEC:
+            return value
+    with get_session() as s:
+        value = s.execute(_SQL_DATA_MONTH).scalar()
+    with _data_month_lock:
+        _data_month = (now, value)
+    return value
+
+
+def cached(fn: Callable) -> Callable:
+    """repo fetch 래퍼. 키=(함수, 인자, 최신 적재월). 반환값은 복사본(호출측 변경이 캐시에 새지 않음)."""
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (name, args, tuple(sorted(kwargs.items())), data_month())
+        hit = repo_cache.get(key)
+        if hit is not _MISSING:
+            return copy.deepcopy(hit)
+        value = fn(*args, **kwargs)
+        repo_cache.set(key, value)
+        return copy.deepcopy(value)
+
+    wrapper.uncached = fn
+    return wrapper
+
+
+def invalidate() -> None:
+    """CSV 적재/마트 갱신 후 호출."""
+    global _data_month
+    with _caches_lock:
+        caches = list(_caches.values())
+    for c in caches:
+        c.clear()
+    with _data_month_lock:
+        _data_month = (0.0, None)
+
+
+def cache_stats() -> Dict[str, Any]:
+    with _caches_lock:
+        caches = dict(_caches)
+    return {**{name: c.stats() for name, c in caches.items()}, "data_month": _data_month[1]}
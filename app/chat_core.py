@@ -1,21 +1,30 @@
 # app/chat_core.py
 from __future__ import annotations
-import os, json
-from typing import Any, Dict, Tuple
+import atexit, os, json, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 
-# 공통 LLM 클라이언트(가능하면 우선)
-from app.llm_client import generate as llm_generate
+from app.chat_writer import drain_first_at_exit, get_chat_writer
+from app.deps import get_engine
+from app.llm_cache import get_llm_cache, make_key as llm_cache_key
 
-# SDK 백업
-try:
-    import google.generativeai as genai
-except Exception:
-    genai = None
+# 공통 LLM 클라이언트(보고서/JSON 경로와 같은 호출·지표 경로)
+from app.llm_client import (
+    BLOCKED_REASONS,
+    cache_config as llm_cache_config,
+    finish_reason_label,
+    generate as llm_generate,
+    generate_stream as llm_generate_stream,
+)
+from app.llm_metrics import metrics as llm_metrics
+from app.llm_retry import breaker as llm_breaker, is_retryable, retry_policy
 
-BYPASS_CLIENT = os.getenv("LLM_BYPASS_CLIENT", "1") == "1"  # 1이면 llm_client 우회 사용
+CHAT_SAFETY = os.getenv("CHAT_SAFETY_PROFILE", "relaxed")  # llm_client.SAFETY_PROFILES 키
+# generate_marketing_report 프롬프트 버전(reports 저장 키). 프롬프트 문구를 바꾸면 올릴 것
+REPORT_PROMPT_VERSION = "v1"
 
 
 # ----------------------------
@@ -34,116 +43,65 @@ def _json_default(o):
         pass
     return str(o)
 
-def _finish_reason_label(reason: int | None) -> str:
-    return {
-        1:"STOP",2:"MAX_TOKENS",3:"SAFETY",4:"RECITATION",5:"OTHER",
-        6:"BLOCKLIST",7:"PROHIBITED_CONTENT",8:"SPII",9:"MALFORMED_FUNCTION_CALL",
-    }.get(reason, "UNKNOWN")
-
-def _extract_block_info_from_obj(resp_obj: Any) -> Dict[str, Any]:
-    info: Dict[str, Any] = {}
-    pf = getattr(resp_obj, "prompt_feedback", None)
-    if pf:
-        info["block_reason"] = getattr(pf, "block_reason", None)
-        sr = getattr(pf, "safety_ratings", None) or []
-        info["safety_ratings"] = [getattr(r, "category", None) for r in sr]
-    return info
-
-def _extract_text_and_reason(resp: Any) -> Tuple[str, int | None, Dict[str, Any]]:
-    # 문자열
-    if isinstance(resp, str):
-        return resp.strip(), None, {}
-
-    # dict
-    if isinstance(resp, dict):
-        if "error" in resp and resp.get("error"):
-            return "", None, {"error": resp["error"]}
-        for k in ("text","output","message","content"):
-            v = resp.get(k)
-            if isinstance(v, str) and v.strip():
-                return v.strip(), resp.get("finish_reason"), resp.get("usage", {})
-        cands = resp.get("candidates") or []
-        if cands:
-            c0 = cands[0]; reason = c0.get("finish_reason")
-            parts = ((c0.get("content") or {}).get("parts") or [])
-            if parts:
-                t = parts[0].get("text") or ""
-                return t.strip(), reason, resp.get("usage", {})
-            return "", reason, resp.get("usage", {})
-        pf = resp.get("prompt_feedback") or {}
-        if pf:
-            return "", 3, {"prompt_feedback": pf, "usage": resp.get("usage", {})}
-        return "", resp.get("finish_reason"), resp.get("usage", {})
-
-    # SDK 객체
+# 컨텍스트 로드 SQL(ddl_008 인덱스). 리뷰는 필터 조합별로 분리
+# (‘:x is null or col=:x’ 형태는 인덱스 top-N 스캔을 못 씀)
+_SQL_LAST_SUMMARY = text("""
+    select summary_json
+    from conversations
+    where user_id = :uid and ended_at is not null
+    order by ended_at desc
+    limit 1
+""")
+
+_REVIEW_WHERE = {
+    (False, False): "",
+    (True, False): "where area = :area",
+    (False, True): "where category = :category",
+    (True, True): "where area = :area and category = :category",
+}
+_SQL_REVIEWS = {
+    k: text(f"select text from review_raw {w} order by created_at desc limit 20")
+    for k, w in _REVIEW_WHERE.items()
+}
+
+# 대화 저장 SQL
+_SQL_INSERT_CONVERSATION = text("""
+    insert into conversations(user_id, area, category, started_at, ended_at, summary_json)
+    values (:uid, :area, :category, now()-interval '5 minutes', now(), null)
+    returning id
+""")
+
+# 메시지 N건을 배열 2개로 넘겨 단일 insert(순서 유지)
+_SQL_INSERT_MESSAGES = text("""
+    insert into messages(conversation_id, role, content, created_at)
+    select :cid, t.role, t.content, now()
+    from unnest(cast(:roles as text[]), cast(:contents as text[])) with ordinality as t(role, content, ord)
+    order by t.ord
+""")
+
+_SQL_UPDATE_SUMMARY = text("update conversations set summary_json = :summary where id = :cid")
+
+# 대화 요약 백그라운드 워커(종료 시 남은 작업 완료 후 정리)
+CHAT_SUMMARY_WORKERS = int(os.getenv("CHAT_SUMMARY_WORKERS", "1"))
+_summary_pool: ThreadPoolExecutor | None = None
+_summary_lock = threading.Lock()
+
+def _summary_executor() -> ThreadPoolExecutor:
+    global _summary_pool
+    with _summary_lock:
+        if _summary_pool is None:
+            _summary_pool = ThreadPoolExecutor(max_workers=max(1, CHAT_SUMMARY_WORKERS),
+                                               thread_name_prefix="chat-summary")
+            atexit.register(_summary_pool.shutdown, wait=True)
+            drain_first_at_exit()  # 종료 시 writer가 남은 close 콜백을 먼저 넘기도록
+    return _summary_pool
+
+def _submit_summary(fn, *args) -> None:
+    """요약 작업 제출. executor가 이미 닫혔으면(종료 중) 현재 스레드에서 바로 실행."""
     try:
-        usage = getattr(resp, "usage_metadata", None)
-        usage_dict = {}
-        if usage:
-            usage_dict = {
-                "input_tokens": getattr(usage, "prompt_token_count", None),
-                "output_tokens": getattr(usage, "candidates_token_count", None),
-                "total_tokens": getattr(usage, "total_token_count", None),
-            }
-        cands = getattr(resp, "candidates", None)
-        if cands:
-            c0 = cands[0]; reason = getattr(c0, "finish_reason", None)
-            content = getattr(c0, "content", None)
-            parts = getattr(content, "parts", None) if content else None
-            if parts and getattr(parts[0], "text", None):
-                return parts[0].text.strip(), reason, usage_dict
-            return "", reason, usage_dict
-        # candidates 없음 → 차단 정보 surface
-        block_info = _extract_block_info_from_obj(resp)
-        if block_info:
-            return "", 3, {"prompt_feedback": block_info} | usage_dict
-        # fallback
-        t = getattr(resp, "text", "") or ""
-        return str(t).strip(), None, usage_dict
-    except Exception:
-        return "", None, {}
-
-def _sdk_generate(prompt: str, model_name: str, max_output_tokens: int, temperature: float, **kwargs) -> Dict[str, Any]:
-    if not genai:
-        return {"text":"", "finish_reason":None, "usage":{}, "error":"SDK not available"}
-    api_key = os.getenv("GEMINI_API_KEY")
-    try:
-        genai.configure(api_key=api_key)
-    except Exception:
-        pass
-    try:
-        model = genai.GenerativeModel(model_name)
-        generation_config = {
-            "max_output_tokens": max_output_tokens,
-            "temperature": temperature,
-            "top_p": 0.9, "top_k": 40,
-            "candidate_count": 1,
-            "stop_sequences": [],
-            "response_mime_type": "text/plain",
-        }
-        if isinstance(kwargs.get("generation_config"), dict):
-            generation_config.update(kwargs["generation_config"])
-        resp = model.generate_content(
-            prompt,
-            generation_config=generation_config,
-            safety_settings=[
-                {"category":"HARM_CATEGORY_DANGEROUS_CONTENT","threshold":"BLOCK_NONE"},
-                {"category":"HARM_CATEGORY_HARASSMENT","threshold":"BLOCK_ONLY_HIGH"},
-                {"category":"HARM_CATEGORY_HATE_SPEECH","threshold":"BLOCK_ONLY_HIGH"},
-                {"category":"HARM_CATEGORY_SEXUAL_CONTENT","threshold":"BLOCK_NONE"},
-                {"category":"HARM_CATEGORY_SEXUAL_AND_MINORS","threshold":"BLOCK_NONE"},
-            ],
-            request_options={"timeout": 30},
-        )
-        text, reason, usage = _extract_text_and_reason(resp)
-        out = {"text": text, "finish_reason": reason, "usage": usage}
-        if not text and not reason:
-            out["error"] = "empty_response"
-            out["debug"] = _extract_block_info_from_obj(resp)
-        return out
-    except Exception as e:
-        return {"text":"", "finish_reason":None, "usage":{}, "error":str(e)}
-
+        _summary_executor().submit(fn, *args)
+    except RuntimeError:
+        fn(*args)
 
 # ----------------------------
 # 핵심 클래스
@@ -157,14 +115,37 @@ class ChatCore:
         self.engine = None
         self.SessionLocal = None
         if database_url:
-            self.engine = create_engine(database_url, pool_size=5, max_overflow=5, pool_pre_ping=True)
+            self.engine = get_engine(database_url)  # repo와 같은 풀 공유
             self.SessionLocal = sessionmaker(bind=self.engine, autoflush=False, autocommit=False)
 
         # LLM
         self.model = model or os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
         self.llm_ready = bool(os.getenv("GEMINI_API_KEY"))
 
+    # 응답 캐시 조회(적중도 지표에 기록)
+    def _cache_lookup(self, prompt: str, temperature: float, max_tokens: int, feature: str):
+        cache = get_llm_cache()
+        ckey = llm_cache_key(self.model, llm_cache_config(max_tokens, temperature, safety=CHAT_SAFETY), prompt)
+        hit = cache.get(ckey)
+        if hit is not None:
+            llm_metrics.record(feature=feature, model=self.model, latency_ms=0.0, cached=True)
+        return cache, ckey, hit
+
+    @staticmethod
+    def _fallback(prompt: str, gen_kwargs: dict, reason: str) -> str:
+        # 브레이커 open/예산 소진 시: 호출측 규칙 기반 답변(있으면) → 안내 문구
+        fb = gen_kwargs.get("fallback")
+        if callable(fb):
+            try:
+                return fb(prompt)
+            except Exception:
+                pass
+        return f"(LLM 일시 중단: {reason}. 잠시 후 다시 시도해 주세요)"
+
     # 공통 LLM 호출
+    # gen_kwargs: temperature, max_output_tokens, feature(지표 귀속: chat/report/review_summary ...),
+    #             fallback(prompt -> str, LLM 장애 시 규칙 기반 답변),
+    #             ladder_start(사다리 시작 단계: 스트림이 원 프롬프트로 빈 응답을 받은 뒤 1부터)
     def call_llm(self, prompt: str, **gen_kwargs) -> str:
         if not self.llm_ready:
             return "(LLM 비활성화) " + prompt[:500]
@@ -174,50 +155,133 @@ class ChatCore:
             prompt = prompt[:6000]
 
         temperature = float(gen_kwargs.get("temperature", 0.3))
+        max_tokens = int(gen_kwargs.get("max_output_tokens", 256))
+        feature = gen_kwargs.get("feature", "chat")
+
+        # 응답 캐시(같은 모델·설정·프롬프트면 재호출 없음)
+        cache, ckey, hit = self._cache_lookup(prompt, temperature, max_tokens, feature)
+        if hit is not None:
+            return hit
+        if not llm_breaker.allow():
+            return self._fallback(prompt, gen_kwargs, "업스트림 장애")
+
+        # 프롬프트 사다리: MAX_TOKENS/빈 응답일 때만 다음 단계(백오프 없음)
         head = prompt.split("데이터:\n")[0] if "데이터:\n" in prompt else prompt[:400]
-        attempts = [
-            {"max_output_tokens": int(gen_kwargs.get("max_output_tokens", 256)), "prompt": prompt},
+        ladder = [
+            {"max_output_tokens": max_tokens, "prompt": prompt},
             {"max_output_tokens": 384, "prompt": f"{head}\n민감 표현과 비속어는 제거. 결과만 4줄."},
             {"max_output_tokens": 512, "prompt": f"{head}\n핵심만 5문장 이하로 요약."},
         ]
 
-        last_reason = None
-        last_usage = None
-        last_err = None
-        last_debug = None
-
-        for opt in attempts:
-            p = opt["prompt"]
-            try:
-                if BYPASS_CLIENT:
-                    sdk = _sdk_generate(p, self.model, opt["max_output_tokens"], temperature)
-                    text, reason, usage = sdk.get("text",""), sdk.get("finish_reason"), sdk.get("usage")
-                    last_err = sdk.get("error"); last_debug = sdk.get("debug")
-                else:
-                    resp = llm_generate(p, model=self.model, temperature=temperature, max_output_tokens=opt["max_output_tokens"])
-                    text, reason, usage = _extract_text_and_reason(resp)
-
-                last_reason, last_usage = reason, usage
-                if text:
-                    return text
-                if reason in (3, 6, 7, 8):  # SAFETY류
+        # 전송 오류(타임아웃/429/5xx)는 같은 단계를 백오프 후 재시도, 전체는 데드라인 예산 안에서
+        deadline = retry_policy.start()
+        resp: Dict[str, Any] = {}
+        step, retries = int(gen_kwargs.get("ladder_start", 0)), 0
+        for attempt in range(retry_policy.max_attempts):
+            timeout = retry_policy.call_timeout(deadline)
+            if timeout is None:
+                resp = {**resp, "error": "deadline_exceeded", "retryable": True}
+                break
+            opt = ladder[step]
+            resp = llm_generate(
+                opt["prompt"],
+                model=self.model,
+                temperature=temperature,
+                max_output_tokens=opt["max_output_tokens"],
+                safety=CHAT_SAFETY,
+                feature=feature,
+                attempt=attempt,
+                timeout=timeout,
+            )
+            if resp.get("text"):
+                # 원 프롬프트(step 0)로 정상 종료(STOP)한 답만 캐시: 잘린 답·사다리 축약 답은 제외
+                if step == 0 and finish_reason_label(resp.get("finish_reason")) == "STOP":
+                    cache.put(ckey, resp["text"], model=self.model)
+                return resp["text"]
+            if resp.get("retryable"):
+                if not llm_breaker.allow() or not retry_policy.backoff(retries, deadline):
                     break
-                if not reason and not text:
-                    last_err = last_err or "empty_response"
-            except Exception as e:
-                last_err = str(e)
+                retries += 1
                 continue
-
-        label = _finish_reason_label(last_reason)
+            if resp.get("finish_reason") in BLOCKED_REASONS:
+                break
+            if resp.get("error") not in (None, "empty_response"):
+                break  # 종단 오류(400/권한 등): 재시도 무의미
+            step += 1
+            if step >= len(ladder):
+                break
+
+        if resp.get("retryable"):
+            return self._fallback(prompt, gen_kwargs, resp.get("error") or "재시도 예산 소진")
+
+        last_reason, last_usage = resp.get("finish_reason"), resp.get("usage")
+        label = finish_reason_label(last_reason)
         meta = ""
-        if isinstance(last_usage, dict):
+        if isinstance(last_usage, dict) and last_usage:
             meta = f" (tokens in/out/total: {last_usage.get('input_tokens')}/{last_usage.get('output_tokens')}/{last_usage.get('total_tokens')})"
-        dbg = f" | debug={last_debug}" if last_debug else ""
+        dbg = f" | debug={resp['debug']}" if resp.get("debug") else ""
         if last_reason == 2:
             return f"(LLM 오류: MAX_TOKENS{meta}{dbg})"
-        if last_reason in (3, 6, 7, 8):
+        if last_reason in BLOCKED_REASONS:
             return f"(LLM 오류: SAFETY 차단: {label}{meta}{dbg})"
-        return f"(LLM 오류: {label or 'UNKNOWN'}{meta} | {last_err or '원인 불명'}{dbg})"
+        return f"(LLM 오류: {label}{meta} | {resp.get('error') or '원인 불명'}{dbg})"
+
+    # 스트리밍 LLM 호출: SDK 청크를 받는 즉시 yield (첫 토큰 지연 최소화)
+    def stream_llm(self, prompt: str, **gen_kwargs) -> Iterator[str]:
+        if not self.llm_ready:
+            yield "(LLM 비활성화) " + prompt[:500]
+            return
+        if len(prompt) > 6000:
+            prompt = prompt[:6000]
+
+        temperature = float(gen_kwargs.get("temperature", 0.3))
+        max_tokens = int(gen_kwargs.get("max_output_tokens", 256))
+        feature = gen_kwargs.get("feature", "chat")
+        cache, ckey, hit = self._cache_lookup(prompt, temperature, max_tokens, feature)
+        if hit is not None:
+            yield hit
+            return
+        if not llm_breaker.allow():
+            yield self._fallback(prompt, gen_kwargs, "업스트림 장애")
+            return
+
+        finish: Dict[str, Any] = {}
+        pieces: list[str] = []
+        try:
+            for piece in llm_generate_stream(
+                prompt,
+                model=self.model,
+                temperature=temperature,
+                max_output_tokens=max_tokens,
+                safety=CHAT_SAFETY,
+                feature=feature,
+                timeout=retry_policy.call_timeout_sec,
+                on_finish=lambda reason, usage: finish.update(reason=reason, usage=usage),
+            ):
+                pieces.append(piece)
+                yield piece
+        except Exception as e:
+            if pieces:
+                yield f"\n(LLM 오류: 스트림 중단 | {e})"
+            elif is_retryable(e):
+                # 첫 청크 전 전송 오류(타임아웃/429/5xx) → 백오프 재시도(call_llm)로 폴백
+                yield self.call_llm(prompt, **gen_kwargs)
+            else:
+                yield f"(LLM 오류: {e})"  # 종단 오류(400/권한 등): 다시 호출해도 같은 결과
+            return
+
+        reason = finish.get("reason")
+        if not pieces and reason in BLOCKED_REASONS:
+            yield f"(LLM 오류: SAFETY 차단: {finish_reason_label(reason)})"
+        elif not pieces:
+            # 원 프롬프트는 이미 빈 응답/MAX_TOKENS → 사다리 다음 단계부터
+            yield self.call_llm(prompt, **{**gen_kwargs, "ladder_start": 1})
+        elif reason == 2:
+            yield "\n(LLM: MAX_TOKENS로 답변이 잘렸습니다)"
+        elif reason in BLOCKED_REASONS:
+            yield f"\n(LLM 오류: SAFETY 차단: {finish_reason_label(reason)})"
+        elif finish_reason_label(reason) == "STOP":
+            cache.put(ckey, "".join(pieces), model=self.model)  # 정상 종료분만 캐시
 
     # 기본 채팅
     def reply(self, messages: list[dict[str, str]]) -> str:
@@ -226,6 +290,13 @@ class ChatCore:
             return "질문을 입력해 주세요."
         return self.call_llm(user_text)
 
+    def reply_stream(self, messages: list[dict[str, str]], fallback=None) -> Iterator[str]:
+        user_text = self._latest_user_text(messages)
+        if not user_text:
+            yield "질문을 입력해 주세요."
+            return
+        yield from self.stream_llm(user_text, fallback=fallback)
+
     # 리뷰 요약
     def summarize_reviews(self, raw_texts: list[str]) -> dict:
         if not raw_texts:
@@ -234,7 +305,7 @@ class ChatCore:
                   "감정 점수(0~100)를 JSON으로 작성하라.\n"
                   "필드: summary, aspects(list[str]), sentiment(int)\n\n"
                   + "\n\n".join(raw_texts[:30]))
-        resp = self.call_llm(prompt, temperature=0.2, max_output_tokens=256)
+        resp = self.call_llm(prompt, temperature=0.2, max_output_tokens=256, feature="review_summary")
         return self._safe_json(resp)
 
     # 보고서 자동 생성
@@ -247,7 +318,7 @@ class ChatCore:
             "1. 핵심 요약\n2. 고객층 분석\n3. 경쟁점 요약\n4. 개선 제안 3가지\n\n"
             f"데이터(JSON):\n{json.dumps(ctx, ensure_ascii=False, default=_json_default)}"
         )
-        return self.call_llm(prompt, temperature=0.25, max_output_tokens=384)
+        return self.call_llm(prompt, temperature=0.25, max_output_tokens=384, feature="report")
 
     # DB 유틸
     def db(self):
@@ -260,58 +331,69 @@ class ChatCore:
         ctx: dict = {}
         if self.engine:
             with self.engine.connect() as conn:
-                last = conn.execute(text("""
-                    select summary_json
-                    from conversations
-                    where user_id=:uid
-                    order by ended_at desc
-                    limit 1
-                """), {"uid": user_id}).scalar()
+                last = conn.execute(_SQL_LAST_SUMMARY, {"uid": user_id}).scalar()
                 if last:
                     ctx["last_summary"] = last
 
-                docs = conn.execute(text("""
-                    select text
-                    from review_raw
-                    where (:area is null or area=:area)
-                      and (:category is null or category=:category)
-                    order by created_at desc
-                    limit 20
-                """), {"area": area, "category": category}).scalars().all()
+                sql = _SQL_REVIEWS[(area is not None, category is not None)]
+                docs = conn.execute(sql, {"area": area, "category": category}).scalars().all()
                 ctx["docs"] = docs
         ctx["greeting"] = f"{area or ''}/{category or ''} 컨텍스트를 불러왔습니다."
         return ctx
 
-    # 대화 종료 저장
-    def end_conversation(self, messages: list[dict[str, str]], metadata: dict | None = None) -> None:
+    # 대화 시작/메시지: write-behind 큐에 적재(UI는 DB를 기다리지 않음). 반환 토큰으로 이어서 기록
+    def start_conversation(self, metadata: dict | None = None) -> str | None:
         if not self.engine:
-            return
-        summary = None
-        if self.llm_ready and messages:
-            try:
-                prompt = "다음 대화를 5줄 이내로 요약:\n\n" + "\n".join(
-                    f"{m['role']}: {m['content']}" for m in messages[-50:]
-                )
-                summary = self.call_llm(prompt, temperature=0.2, max_output_tokens=192)
-            except Exception:
-                summary = None
+            return None
+        return get_chat_writer(self.engine).open(metadata)
+
+    def log_message(self, conversation: str | None, role: str, content: str) -> bool:
+        if not (self.engine and conversation):
+            return False
+        return get_chat_writer(self.engine).append(conversation, role, content)
 
+    # 대화 종료 저장
+    # - conversation 토큰이 있으면(메시지는 이미 큐로 적재) 종료만 큐에 넣고, 기록되면 요약을 백그라운드로
+    # - 없으면 대화 1행 + 메시지 다중행 insert 1회(왕복 2회). 요약은 백그라운드에서 채움
+    def end_conversation(self, messages: list[dict[str, str]], metadata: dict | None = None,
+                         conversation: str | None = None) -> int | None:
+        if not self.engine:
+            return None
+        if conversation:
+            msgs = list(messages)
+            on_closed = (lambda cid: _submit_summary(self._summarize_conversation, cid, msgs)) \
+                if self.llm_ready and msgs else None
+            get_chat_writer(self.engine).close(conversation, on_closed)
+            return None
+        meta = metadata or {}
         with self.engine.begin() as conn:
-            conv_id = conn.execute(text("""
-                insert into conversations(user_id, area, category, started_at, ended_at, summary_json)
-                values (:uid, :area, :category, now()-interval '5 minutes', now(), :summary)
-                returning id
-            """), {
-                "uid": (metadata or {}).get("user_id", "demo-user"),
-                "area": (metadata or {}).get("area"),
-                "category": (metadata or {}).get("category"),
-                "summary": summary
+            conv_id = conn.execute(_SQL_INSERT_CONVERSATION, {
+                "uid": meta.get("user_id", "demo-user"),
+                "area": meta.get("area"),
+                "category": meta.get("category"),
             }).scalar()
-            for m in messages:
-                conn.execute(text("""
-                    insert into messages(conversation_id, role, content, created_at)
-                    values (:cid, :role, :content, now())
-                """), {"cid": conv_id, "role": m.get("role"), "content": m.get("content")})
+            if messages:
+                conn.execute(_SQL_INSERT_MESSAGES, {
+                    "cid": conv_id,
+                    "roles": [m.get("role") for m in messages],
+                    "contents": [m.get("content") for m in messages],
+                })
+        if self.llm_ready and messages:
+            _submit_summary(self._summarize_conversation, conv_id, list(messages))
+        return conv_id
+
+    def _summarize_conversation(self, conv_id: int, messages: list[dict[str, str]]) -> None:
+        try:
+            prompt = "다음 대화를 5줄 이내로 요약:\n\n" + "\n".join(
+                f"{m['role']}: {m['content']}" for m in messages[-50:]
+            )
+            summary = self.call_llm(prompt, temperature=0.2, max_output_tokens=192, feature="conversation_summary")
+            if summary.startswith("(LLM"):  # 오류/차단 문구는 저장하지 않음
+                return
+            with self.engine.begin() as conn:
+                conn.execute(_SQL_UPDATE_SUMMARY, {"cid": conv_id, "summary": summary})
+        except Exception:
+            pass
 
     # 헬퍼
     @staticmethod
@@ -0,0 +1,236 @@
+# app/chat_writer.py
+"""
+대화/메시지 write-behind 큐(chat_view에서 메시지가 생길 때마다 적재).
+- UI 스레드는 큐에 넣기만 함(put_nowait). 큐가 가득 차면 버리고 dropped 집계 → 메모리 상한
+- 워커 스레드가 배치 크기(CHAT_WRITE_BATCH) 또는 대기 시간(CHAT_WRITE_FLUSH_SEC) 도달 시 한 트랜잭션으로 기록
+  · open: conversations 1행(ended_at null) → 토큰↔id 매핑
+  · msg : messages 다중행 insert 1회(unnest)
+  · close: ended_at 갱신 후 on_closed(conversation_id) 콜백(요약 등)
+- DB 오류 시 같은 배치를 재시도(CHAT_WRITE_RETRIES), 초과하면 버리고 errors 집계
+- 종료 시(atexit) 남은 큐를 비우고 정리(요약 executor보다 먼저: drain_first_at_exit)
+환경변수: CHAT_WRITE_BATCH, CHAT_WRITE_FLUSH_SEC, CHAT_WRITE_MAX_QUEUE, CHAT_WRITE_RETRIES
+"""
+from __future__ import annotations
+import atexit
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+CHAT_WRITE_BATCH = int(os.getenv("CHAT_WRITE_BATCH", "50"))
+CHAT_WRITE_FLUSH_SEC = float(os.getenv("CHAT_WRITE_FLUSH_SEC", "2"))
+CHAT_WRITE_MAX_QUEUE = int(os.getenv("CHAT_WRITE_MAX_QUEUE", "10000"))
+CHAT_WRITE_RETRIES = int(os.getenv("CHAT_WRITE_RETRIES", "3"))
+
+_SQL_OPEN = text("""
+insert into conversations(user_id, area, category, started_at, ended_at, summary_json)
+values (:uid, :area, :category, :ts, null, null)
+returning id
+""")
+
+# 여러 대화의 메시지를 배열로 넘겨 단일 insert(큐 순서 유지)
+_SQL_MESSAGES = text("""
+insert into messages(conversation_id, role, content, created_at)
+select t.cid, t.role, t.content, t.ts
+from unnest(cast(:cids as int[]), cast(:roles as text[]), cast(:contents as text[]), cast(:ts as timestamptz[]))
+     with ordinality as t(cid, role, content, ts, ord)
+order by t.ord
+""")
+
+_SQL_CLOSE = text("update conversations set ended_at = :ts where id = :cid")
+
+_STOP = object()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class ChatWriter:
+    def __init__(self, engine: Engine, batch_size: int = CHAT_WRITE_BATCH, flush_sec: float = CHAT_WRITE_FLUSH_SEC,
+                 max_queue: int = CHAT_WRITE_MAX_QUEUE, retries: int = CHAT_WRITE_RETRIES):
+        self.engine = engine
+        self.batch_size = max(1, batch_size)
+        self.flush_sec = flush_sec
+        self.retries = max(0, retries)
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, max_queue))
+        self._ids: Dict[str, int] = {}  # 토큰 → conversations.id (워커 스레드 전용)
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name="chat-writer", daemon=True)
+        self._thread.start()
+
+    # ---------- 생산자(UI 스레드) ----------
+    def _put(self, item: Tuple) -> bool:
+        try:
+            self._q.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def open(self, metadata: Optional[dict] = None) -> str:
+        """대화 시작. 반환 토큰으로 append/close(실제 id는 워커가 기록 시 발급)."""
+        token = uuid.uuid4().hex
+        self._put(("open", token, dict(metadata or {}), _now()))
+        return token
+
+    def append(self, token: str, role: str, content: str) -> bool:
+        return self._put(("msg", token, role, content, _now()))
+
+    def close(self, token: str, on_closed: Optional[Callable[[int], None]] = None) -> bool:
+        return self._put(("close", token, on_closed, _now()))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """큐가 빌 때까지 대기(테스트·종료용)."""
+        done = threading.Event()
+        if not self._put(("barrier", done)):
+            return False
+        return done.wait(timeout)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        if not self._thread.is_alive():
+            return
+        try:
+            self._q.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    # ---------- 워커 ----------
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            item = self._q.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_sec
+            while len(batch) < self.batch_size and item[0] not in ("close", "barrier"):
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                try:
+                    item = self._q.get(timeout=left)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)  # 종료/대기 요청이 들어오면(배치 첫 항목이어도) 바로 기록
+
+    def _write(self, batch: List[Tuple]) -> None:
+        barriers = [b[1] for b in batch if b[0] == "barrier"]
+        events = [b for b in batch if b[0] != "barrier"]
+        closed: List[Tuple[int, Callable[[int], None]]] = []
+        for attempt in range(self.retries + 1):
+            try:
+                closed = self._write_once(events)
+                break
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                if attempt < self.retries:
+                    time.sleep(min(0.5 * 2 ** attempt, 5.0))
+        else:
+            with self._lock:
+                self.dropped += len(events)
+        for cid, cb in closed:
+            try:
+                cb(cid)
+            except Exception:
+                pass
+        for ev in barriers:
+            ev.set()
+
+    def _write_once(self, events: List[Tuple]) -> List[Tuple[int, Callable[[int], None]]]:
+        ids = dict(self._ids)  # 실패 시 매핑을 되돌릴 수 있도록 사본에 반영
+        msgs: Dict[str, list] = {"cids": [], "roles": [], "contents": [], "ts": []}
+        closes: List[Tuple[int, datetime, Optional[Callable[[int], None]]]] = []
+        skipped = 0
+        with self.engine.begin() as conn:
+            for ev in events:
+                kind, token = ev[0], ev[1]
+                if kind == "open":
+                    meta, ts = ev[2], ev[3]
+                    ids[token] = conn.execute(_SQL_OPEN, {
+                        "uid": meta.get("user_id", "demo-user"),
+                        "area": meta.get("area"),
+                        "category": meta.get("category"),
+                        "ts": ts,
+                    }).scalar()
+                    continue
+                cid = ids.get(token)
+                if cid is None:  # open이 버려진 대화
+                    skipped += 1
+                    continue
+                if kind == "msg":
+                    msgs["cids"].append(cid)
+                    msgs["roles"].append(ev[2])
+                    msgs["contents"].append(ev[3])
+                    msgs["ts"].append(ev[4])
+                elif kind == "close":
+                    closes.append((cid, ev[3], ev[2]))
+                    ids.pop(token, None)
+            if msgs["cids"]:
+                conn.execute(_SQL_MESSAGES, msgs)
+            if closes:
+                conn.execute(_SQL_CLOSE, [{"cid": cid, "ts": ts} for cid, ts, _ in closes])
+        self._ids = ids
+        with self._lock:
+            self.written += len(msgs["cids"])
+            self.batches += 1
+            self.dropped += skipped
+        return [(cid, cb) for cid, _, cb in closes if cb is not None]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": self._q.qsize(),
+                "open_conversations": len(self._ids),
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "batches": self.batches,
+                "dropped": self.dropped,
+                "errors": self.errors,
+            }
+
+
+_writer: Optional[ChatWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_chat_writer(engine: Optional[Engine] = None) -> ChatWriter:
+    """프로세스 단일 writer(첫 호출의 engine 사용, 없으면 DATABASE_URL)."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            if engine is None:
+                from app.deps import get_engine
+                engine = get_engine()
+            _writer = ChatWriter(engine)
+            atexit.register(_writer.shutdown)
+    return _writer
+
+
+def drain_first_at_exit() -> None:
+    """writer 종료(남은 큐 기록)를 atexit 맨 앞으로 다시 등록(atexit는 역순 실행).
+    on_closed가 쓰는 executor를 writer보다 늦게 만들었을 때 호출 → executor가 먼저 닫히지 않게."""
+    with _writer_lock:
+        if _writer is not None:
+            atexit.unregister(_writer.shutdown)
+            atexit.register(_writer.shutdown)
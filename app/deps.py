@@ -1,34 +1,144 @@
 # app/deps.py
 import os
+import threading
+import time
 from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
 
 # .env 로드
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL not set")
 
-# Streamlit 재실행 대비 전역 엔진(커넥션 헬스체크 활성화)
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=5,
-    future=True,
-)
+# 프로세스당 풀 크기. Supabase 커넥션 상한 = 프로세스 수 × (POOL_SIZE + MAX_OVERFLOW)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+class PoolStats:
+    """커넥션 체크아웃 대기시간/타임아웃 집계."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.peak_checked_out = 0
+
+    def record(self, wait: float, timed_out: bool, checked_out: int) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            n = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": (self.wait_total / n * 1000) if n else 0.0,
+                "wait_ms_max": self.wait_max * 1000,
+                "peak_checked_out": self.peak_checked_out,
+            }
+
+
+def _timed_pool_class(stats: PoolStats):
+    # recreate()가 self.__class__를 쓰므로 dispose 후에도 같은 stats 유지
+    class TimedQueuePool(QueuePool):
+        _stats = stats
 
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False, future=True)
+        def _do_get(self):
+            t0 = time.perf_counter()
+            timed_out = False
+            try:
+                return super()._do_get()
+            except PoolTimeoutError:
+                timed_out = True
+                raise
+            finally:
+                self._stats.record(time.perf_counter() - t0, timed_out, self.checkedout())
 
-def get_engine():
+    return TimedQueuePool
+
+
+# (URL, 풀 이름)별 전역 엔진 레지스트리(Streamlit 재실행·repo·ChatCore 공용)
+# pool="app": 공용 풀. 그 외 이름은 용도별 전용 풀(예: llm_slots = LLM 동시성 advisory lock, AUTOCOMMIT)
+_engines: Dict[Tuple[str, str], Engine] = {}
+_lock = threading.Lock()
+
+SessionLocal = sessionmaker(autoflush=False, autocommit=False, expire_on_commit=False, future=True)
+
+def get_engine(database_url: Optional[str] = None, pool: str = "app", pool_size: Optional[int] = None,
+               max_overflow: Optional[int] = None, isolation_level: Optional[str] = None) -> Engine:
+    """풀 설정(pool_size 등)은 그 풀을 처음 만들 때만 적용."""
+    url = database_url or DATABASE_URL
+    if not url:
+        raise RuntimeError("DATABASE_URL not set")
+    with _lock:
+        engine = _engines.get((url, pool))
+        if engine is None:
+            kw = {"isolation_level": isolation_level} if isolation_level else {}
+            engine = create_engine(
+                url,
+                poolclass=_timed_pool_class(PoolStats()),
+                pool_pre_ping=True,
+                pool_size=DB_POOL_SIZE if pool_size is None else pool_size,
+                max_overflow=DB_MAX_OVERFLOW if max_overflow is None else max_overflow,
+                pool_timeout=DB_POOL_TIMEOUT,
+                pool_recycle=DB_POOL_RECYCLE,
+                future=True,
+                **kw,
+            )
+            _engines[(url, pool)] = engine
     return engine
 
+def pool_stats(database_url: Optional[str] = None, pool: str = "app") -> Dict[str, Any]:
+    """풀 사용률·체크아웃 대기시간(대시보드/로그용)."""
+    p = get_engine(database_url, pool).pool
+    checked_out = p.checkedout()
+    size, overflow = p.size(), p._max_overflow
+    capacity = size + max(overflow, 0)
+    return {
+        "pool_size": size,
+        "max_overflow": overflow,
+        "checked_out": checked_out,
+        "idle": p.checkedin(),
+        "utilization": checked_out / capacity if capacity else None,
+        **p._stats.snapshot(),
+    }
+
+def all_pool_stats(database_url: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """이미 만들어진 풀 전부 {풀 이름: pool_stats}."""
+    url = database_url or DATABASE_URL
+    with _lock:
+        names = [name for (u, name) in _engines if u == url]
+    return {name: pool_stats(url, name) for name in names}
+
+def libpq_dsn(database_url: Optional[str] = None) -> str:
+    """SQLAlchemy URL(postgresql+psycopg2://...) → psycopg3/libpq 접속 문자열."""
+    url = database_url or DATABASE_URL
+    if not url:
+        raise RuntimeError("DATABASE_URL not set")
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
 @contextmanager
-def get_session():
-    session = SessionLocal()
+def get_session(database_url: Optional[str] = None):
+    session = SessionLocal(bind=get_engine(database_url))
     try:
         yield session
         session.commit()
@@ -0,0 +1,222 @@
+# app/llm_cache.py
+"""
+LLM 응답 캐시(내용 주소 기반).
+- 키: sha256(model + generation config + 정규화 프롬프트). 같은 달·같은 가맹점 보고서는 재호출 없이 재사용.
+- 1단: 프로세스 내 LRU(TTL)  2단: 영속 저장소(sqlite 기본 / postgres) + TTL·행 수 상한 퇴출.
+- 영속 저장소 오류는 삼키고 LLM 호출을 계속(캐시는 최적화일 뿐).
+환경변수: LLM_CACHE_BACKEND(sqlite|postgres|off), LLM_CACHE_PATH, LLM_CACHE_TTL_SEC,
+          LLM_CACHE_MAX_ROWS, LLM_CACHE_MEMORY_SIZE
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+from app.cache import TTLCache
+
+ROOT = Path(__file__).resolve().parents[1]
+
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "sqlite").lower()
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", str(ROOT / ".cache" / "llm_cache.sqlite3"))
+LLM_CACHE_TTL_SEC = float(os.getenv("LLM_CACHE_TTL_SEC", str(35 * 24 * 3600)))  # 월 데이터 주기 + 여유
+LLM_CACHE_MAX_ROWS = int(os.getenv("LLM_CACHE_MAX_ROWS", "5000"))
+LLM_CACHE_MEMORY_SIZE = int(os.getenv("LLM_CACHE_MEMORY_SIZE", "256"))
+LLM_CACHE_PURGE_EVERY = int(os.getenv("LLM_CACHE_PURGE_EVERY", "100"))
+
+_WS = re.compile(r"\s+")
+
+def normalize_prompt(prompt: str) -> str:
+    return _WS.sub(" ", unicodedata.normalize("NFC", prompt or "")).strip()
+
+def make_key(model: str, config: Optional[Dict[str, Any]], prompt: str) -> str:
+    raw = json.dumps(
+        {"model": model, "config": config or {}, "prompt": normalize_prompt(prompt)},
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ----------------------------
+# 영속 저장소
+# ----------------------------
+class _SqliteStore:
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("pragma journal_mode=wal")
+            self._conn.execute("""
+                create table if not exists llm_response_cache (
+                  cache_key   text primary key,
+                  model       text not null,
+                  value       text not null,
+                  created_at  real not null,
+                  last_hit_at real not null,
+                  hits        integer not null default 0
+                )""")
+            self._conn.execute("create index if not exists idx_llm_cache_last_hit on llm_response_cache(last_hit_at)")
+
+    def get(self, key: str, ttl: float) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "select value from llm_response_cache where cache_key=? and created_at > ?",
+                (key, now - ttl),
+            ).fetchone()
+            if row:
+                self._conn.execute(
+                    "update llm_response_cache set last_hit_at=?, hits=hits+1 where cache_key=?", (now, key)
+                )
+        return row[0] if row else None
+
+    def put(self, key: str, model: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """insert into llm_response_cache(cache_key, model, value, created_at, last_hit_at)
+                   values (?, ?, ?, ?, ?)
+                   on conflict(cache_key) do update set value=excluded.value,
+                     created_at=excluded.created_at, last_hit_at=excluded.last_hit_at""",
+                (key, model, value, now, now),
+            )
+
+    def purge(self, ttl: float, max_rows: int) -> int:
+        with self._lock:
+            n = self._conn.execute("delete from llm_response_cache where created_at <= ?", (time.time() - ttl,)).rowcount
+            n += self._conn.execute(
+                """delete from llm_response_cache where cache_key in (
+                     select cache_key from llm_response_cache order by last_hit_at desc limit -1 offset ?)""",
+                (max_rows,),
+            ).rowcount
+        return n
+
+
+class _PostgresStore:
+    """db/ddl_005_llm_cache.sql 테이블 사용. 커넥션은 app.deps 공용 풀."""
+
+    def get(self, key: str, ttl: float) -> Optional[str]:
+        from app.deps import get_session
+        with get_session() as s:
+            v = s.execute(text("""
+                update public.llm_response_cache
+                   set last_hit_at = now(), hits = hits + 1
+                 where cache_key = :k and created_at > now() - make_interval(secs => :ttl)
+             returning value::text
+            """), {"k": key, "ttl": ttl}).scalar()
+        return v
+
+    def put(self, key: str, model: str, value: str) -> None:
+        from app.deps import get_session
+        with get_session() as s:
+            s.execute(text("""
+                insert into public.llm_response_cache(cache_key, model, value)
+                values (:k, :model, cast(:v as jsonb))
+                on conflict (cache_key) do update
+                   set value = excluded.value, created_at = now(), last_hit_at = now()
+            """), {"k": key, "model": model, "v": value})
+
+    def purge(self, ttl: float, max_rows: int) -> int:
+        from app.deps import get_session
+        with get_session() as s:
+            n = s.execute(text("""
+                delete from public.llm_response_cache
+                 where created_at <= now() - make_interval(secs => :ttl)
+            """), {"ttl": ttl}).rowcount
+            n += s.execute(text("""
+                delete from public.llm_response_cache where cache_key in (
+                  select cache_key from public.llm_response_cache
+                  order by last_hit_at desc offset :max_rows)
+            """), {"max_rows": max_rows}).rowcount
+        return n
+
+
+# ----------------------------
+# 2단 캐시
+# ----------------------------
+class LLMCache:
+    def __init__(self, backend: str = LLM_CACHE_BACKEND, ttl: float = LLM_CACHE_TTL_SEC,
+                 max_rows: int = LLM_CACHE_MAX_ROWS, memory_size: int = LLM_CACHE_MEMORY_SIZE):
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.memory = TTLCache(memory_size, ttl)
+        self.store = None
+        if backend == "sqlite":
+            self.store = _SqliteStore(LLM_CACHE_PATH)
+        elif backend == "postgres":
+            self.store = _PostgresStore()
+        self._lock = threading.Lock()
+        self.persistent_hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        v = self.memory.get(key, None)
+        if v is not None:
+            return v
+        if self.store is not None:
+            try:
+                raw = self.store.get(key, self.ttl)
+            except Exception:
+                raw = None
+                with self._lock: self.errors += 1
+            if raw is not None:
+                v = json.loads(raw)
+                self.memory.set(key, v)
+                with self._lock: self.persistent_hits += 1
+                return v
+        with self._lock: self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any, model: str = "") -> None:
+        self.memory.set(key, value)
+        if self.store is None:
+            return
+        with self._lock:
+            self.puts += 1
+            purge = self.puts % LLM_CACHE_PURGE_EVERY == 0
+        try:
+            self.store.put(key, model, json.dumps(value, ensure_ascii=False))
+            if purge:
+                n = self.store.purge(self.ttl, self.max_rows)
+                with self._lock: self.evictions += n
+        except Exception:
+            with self._lock: self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        mem = self.memory.stats()
+        with self._lock:
+            hits = mem["hits"] + self.persistent_hits
+            total = hits + self.misses
+            return {
+                "memory_hits": mem["hits"],
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "hit_rate": (hits / total) if total else None,
+                "puts": self.puts,
+                "evictions": self.evictions + mem["evictions"],
+                "errors": self.errors,
+                "memory_size": mem["size"],
+            }
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache() -> LLMCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache(backend=LLM_CACHE_BACKEND if LLM_CACHE_BACKEND in ("sqlite", "postgres") else "off")
+        return _cache
@@ -1,7 +1,11 @@
 # app/llm_client.py
 from __future__ import annotations
-import os, json
-from typing import Any, Dict, Tuple
+import os, json, threading, time
+from typing import Any, Dict, Iterator, Tuple
+
+from app.llm_metrics import metrics
+from app.llm_limiter import LLMQueueTimeout, estimate_tokens, limiter
+from app.llm_retry import breaker, is_retryable
 
 try:
     import google.generativeai as genai
@@ -12,6 +16,29 @@ except Exception:
 # Internal helpers
 # ==============================
 def _extract_from_obj(resp: Any) -> Tuple[str, int | None, Dict[str, Any]]:
+    if isinstance(resp, str):
+        return resp.strip(), None, {}
+
+    # dict
+    if isinstance(resp, dict):
+        if resp.get("error"):
+            return "", None, {"error": resp["error"]}
+        cands = resp.get("candidates") or []
+        if cands:
+            reason = cands[0].get("finish_reason")
+            parts = ((cands[0].get("content") or {}).get("parts") or [])
+            if parts:
+                return (parts[0].get("text") or "").strip(), reason, resp.get("usage", {})
+            return "", reason, resp.get("usage", {})
+        for k in ("text", "output", "message", "content"):
+            v = resp.get(k)
+            if isinstance(v, str) and v.strip():
+                return v.strip(), resp.get("finish_reason"), resp.get("usage", {})
+        pf = resp.get("prompt_feedback")
+        if pf:
+            return "", 3, {"prompt_feedback": pf, "usage": resp.get("usage", {})}
+        return "", resp.get("finish_reason"), resp.get("usage", {})
+
     # SDK object
     try:
         usage = getattr(resp, "usage_metadata", None)
@@ -46,40 +73,104 @@ def _extract_from_obj(resp: Any) -> Tuple[str, int | None, Dict[str, Any]]:
         t = getattr(resp, "text", "") or ""
         return str(t).strip(), None, usage_dict
     except Exception:
-        pass
+        return "", None, {}
 
-    # dict fallback
-    if isinstance(resp, dict):
-        if resp.get("error"):
-            return "", None, {"error": resp["error"]}
-        cands = resp.get("candidates") or []
-        if cands:
-            reason = cands[0].get("finish_reason")
-            parts = ((cands[0].get("content") or {}).get("parts") or [])
-            if parts:
-                return (parts[0].get("text") or "").strip(), reason, resp.get("usage", {})
-            return "", reason, resp.get("usage", {})
-        for k in ("text", "output", "message", "content"):
-            v = resp.get(k)
-            if isinstance(v, str) and v.strip():
-                return v.strip(), resp.get("finish_reason"), resp.get("usage", {})
-        pf = resp.get("prompt_feedback")
-        if pf:
-            return "", 3, {"prompt_feedback": pf, "usage": resp.get("usage", {})}
-        return "", resp.get("finish_reason"), resp.get("usage", {})}
+_FINISH_REASONS = {
+    1: "STOP", 2: "MAX_TOKENS", 3: "SAFETY", 4: "RECITATION", 5: "OTHER",
+    6: "BLOCKLIST", 7: "PROHIBITED_CONTENT", 8: "SPII", 9: "MALFORMED_FUNCTION_CALL",
+}
+BLOCKED_REASONS = (3, 6, 7, 8)  # SAFETY류
 
-    t = getattr(resp, "text", "") or ""
-    return str(t).strip(), None, {}
+def finish_reason_label(reason: Any) -> str:
+    try:
+        return _FINISH_REASONS.get(int(reason), "UNKNOWN")
+    except Exception:
+        return "UNKNOWN"
 
-def _ensure_sdk() -> bool:
-    if not genai:
-        return False
-    api_key = os.getenv("GEMINI_API_KEY")
+def _chunk_text(chunk: Any) -> str:
+    # 스트리밍 청크 텍스트(공백 보존: strip 금지)
     try:
-        genai.configure(api_key=api_key)
+        cands = getattr(chunk, "candidates", None) or []
+        if cands:
+            content = getattr(cands[0], "content", None)
+            parts = getattr(content, "parts", None) or []
+            return "".join(getattr(p, "text", "") or "" for p in parts)
     except Exception:
         pass
-    return True
+    return ""
+
+def _safety_key(safety: list[Dict[str, str]] | None) -> Tuple:
+    return tuple(sorted((d.get("category"), d.get("threshold")) for d in (safety or [])))
+
+# ==============================
+# Client (process-wide)
+# ==============================
+class GeminiClient:
+    """
+    프로세스당 1개.
+    - genai.configure 는 최초 1회만(매 호출 configure → SDK 내부 클라이언트/채널 재생성 방지)
+    - GenerativeModel 은 (모델명, safety) 키로 풀링해 재사용(채널도 SDK 기본 클라이언트 재사용)
+    환경변수: GEMINI_API_KEY, GEMINI_TRANSPORT(grpc|rest, 선택)
+    """
+
+    def __init__(self, api_key: str | None = None, transport: str | None = None):
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self.transport = transport or os.getenv("GEMINI_TRANSPORT") or None
+        self._configured = False
+        self._models: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return genai is not None
+
+    def _configure(self) -> None:
+        with self._lock:
+            if self._configured:
+                return
+            kw: Dict[str, Any] = {"api_key": self.api_key}
+            if self.transport:
+                kw["transport"] = self.transport
+            try:
+                genai.configure(**kw)
+            except Exception:
+                pass
+            self._configured = True
+
+    def model(self, name: str, safety: list[Dict[str, str]] | None = None):
+        key = (name, _safety_key(safety))
+        m = self._models.get(key)
+        if m is not None:
+            return m
+        if not self._configured:
+            self._configure()
+        with self._lock:
+            m = self._models.get(key)
+            if m is None:
+                m = self._models[key] = genai.GenerativeModel(name, safety_settings=safety)
+        return m
+
+    def generate_content(self, prompt: str, *, model: str, generation_config: Dict,
+                         safety_settings: list[Dict[str, str]] | None = None,
+                         stream: bool = False, timeout: float = 30):
+        return self.model(model, safety_settings).generate_content(
+            prompt,
+            generation_config=generation_config,
+            stream=stream,
+            request_options={"timeout": timeout},
+        )
+
+
+_client: GeminiClient | None = None
+_client_lock = threading.Lock()
+
+def get_client() -> GeminiClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GeminiClient()
+    return _client
 
 def _safe_dump_json(data: Dict[str, Any]) -> str:
     # compact JSON only. no reviews. db metrics only should be passed in.
@@ -102,18 +193,79 @@ def _default_generation_config(max_output_tokens: int, temperature: float, extra
         cfg.update(extra)
     return cfg
 
-def _default_safety(kwargs: Dict | None) -> list[Dict[str, str]]:
-    # conservative defaults; no relaxed sexual terms to avoid surprises
-    ss = (kwargs or {}).get("safety_settings")
-    if isinstance(ss, list):
-        return ss
-    return [
+# safety 프로파일: default(보고서/JSON), relaxed(채팅 – 성적 표현 차단 완화)
+SAFETY_PROFILES: Dict[str, list[Dict[str, str]]] = {
+    "default": [
         {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
         {"category": "HARM_CATEGORY_HARASSMENT",        "threshold": "BLOCK_ONLY_HIGH"},
         {"category": "HARM_CATEGORY_HATE_SPEECH",       "threshold": "BLOCK_ONLY_HIGH"},
         {"category": "HARM_CATEGORY_SEXUAL_CONTENT",    "threshold": "BLOCK_ONLY_HIGH"},
         {"category": "HARM_CATEGORY_SEXUAL_AND_MINORS", "threshold": "BLOCK_ONLY_HIGH"},
-    ]
+    ],
+    "relaxed": [
+        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+        {"category": "HARM_CATEGORY_HARASSMENT",        "threshold": "BLOCK_ONLY_HIGH"},
+        {"category": "HARM_CATEGORY_HATE_SPEECH",       "threshold": "BLOCK_ONLY_HIGH"},
+        {"category": "HARM_CATEGORY_SEXUAL_CONTENT",    "threshold": "BLOCK_NONE"},
+        {"category": "HARM_CATEGORY_SEXUAL_AND_MINORS", "threshold": "BLOCK_NONE"},
+    ],
+}
+
+def _default_safety(kwargs: Dict | None) -> list[Dict[str, str]]:
+    # safety_settings(list) 직접 지정 > safety="relaxed" 등 프로파일명 > default
+    kwargs = kwargs or {}
+    ss = kwargs.get("safety_settings")
+    if isinstance(ss, list):
+        return ss
+    return SAFETY_PROFILES.get(kwargs.get("safety") or "default", SAFETY_PROFILES["default"])
+
+def cache_config(max_output_tokens: int, temperature: float, **kwargs) -> Dict[str, Any]:
+    """응답 캐시 키용: 실제 전송하는 generation_config + safety 설정(generate()와 같은 규칙)."""
+    return {
+        "generation_config": _default_generation_config(max_output_tokens, temperature, kwargs.get("generation_config")),
+        "safety": _default_safety(kwargs),
+    }
+
+def _call(prompt: str, model: str, cfg: Dict, safety: list[Dict[str, str]], *,
+          feature: str | None, attempt: int, timeout: float = 30) -> Dict[str, Any]:
+    """
+    단건 호출 + 지표 기록. 예외는 error 필드로(retryable: 타임아웃/429/5xx/대기열 초과 여부).
+    응답을 받으면 브레이커 성공, 재시도 대상 오류면 브레이커 실패로 집계.
+    그 외(대기열 초과·비재시도 오류)는 breaker.abandon() → half-open 시험 호출이 새지 않게 정리.
+    동시성/RPM/TPM 제한은 limiter 슬롯 안에서 호출.
+    """
+    t0 = time.perf_counter()
+    settled = False  # 브레이커에 성공/실패를 알렸는지(아니면 finally에서 abandon)
+    try:
+        with limiter.acquire(estimate_tokens(prompt, cfg.get("max_output_tokens", 0)), timeout) as permit:
+            left = max(1.0, timeout - (time.perf_counter() - t0))  # 대기한 만큼 호출 timeout 차감
+            resp = get_client().generate_content(prompt, model=model, generation_config=cfg,
+                                                 safety_settings=safety, timeout=left)
+            breaker.record_success()
+            settled = True
+            text, reason, usage = _extract_from_obj(resp)
+            permit.settle(usage)
+        out = {"text": text, "finish_reason": reason, "usage": usage}
+        if not text and reason is None:
+            out["error"] = usage.get("error") or "empty_response"
+            out["debug"] = usage.get("prompt_feedback")
+    except LLMQueueTimeout as e:
+        out = {"text": "", "finish_reason": None, "usage": {}, "error": str(e), "retryable": True}
+    except Exception as e:
+        retryable = is_retryable(e)
+        if retryable:
+            breaker.record_failure()
+            settled = True
+        out = {"text": "", "finish_reason": None, "usage": {}, "error": str(e), "retryable": retryable}
+    finally:
+        if not settled:
+            breaker.abandon()
+    metrics.record(
+        feature=feature or "unknown", model=model, latency_ms=(time.perf_counter() - t0) * 1000,
+        finish_reason=finish_reason_label(out["finish_reason"]) if out["finish_reason"] is not None else None,
+        usage=out["usage"], attempt=attempt, error=out.get("error"),
+    )
+    return out
 
 # ==============================
 # JSON-only entrypoint (use this)
@@ -126,6 +278,7 @@ def generate_json(
     temperature: float = 0.25,
     max_output_tokens: int = 384,
     generation_config: Dict | None = None,
+    feature: str = "report_json",
     **kwargs,
 ) -> Dict[str, Any]:
     """
@@ -134,7 +287,8 @@ def generate_json(
     - Uses ONLY the provided DB-derived dict.
     - Adds a minimal system guard to ignore external knowledge.
     """
-    if not _ensure_sdk():
+    client = get_client()
+    if not client.available:
         return {"text": "", "finish_reason": None, "usage": {}, "error": "Gemini SDK not available"}
 
     # Build minimal, neutral prompt
@@ -147,21 +301,9 @@ def generate_json(
     payload = _safe_dump_json(data)
     prompt = _truncate(prefix + payload)
 
-    model_obj = genai.GenerativeModel(model)
     cfg = _default_generation_config(max_output_tokens, temperature, generation_config)
-    safety = _default_safety(kwargs)
-
-    try:
-        resp = model_obj.generate_content(
-            prompt,
-            generation_config=cfg,
-            safety_settings=safety,
-            request_options={"timeout": 30},
-        )
-        text, reason, usage = _extract_from_obj(resp)
-        return {"text": text, "finish_reason": reason, "usage": usage}
-    except Exception as e:
-        return {"text": "", "finish_reason": None, "usage": {}, "error": str(e)}
+    return _call(prompt, model, cfg, _default_safety(kwargs), feature=feature,
+                 attempt=int(kwargs.get("attempt", 0)), timeout=float(kwargs.get("timeout", 30)))
 
 # ==============================
 # Backward-compatible prompt entrypoint
@@ -175,24 +317,78 @@ def generate(
 ):
     """
     Legacy API. Prefer generate_json() for DB-only use.
+    kwargs: safety("default"|"relaxed") 또는 safety_settings, feature(지표 귀속), attempt(재시도 차수), timeout(초)
     """
-    if not _ensure_sdk():
+    client = get_client()
+    if not client.available:
         return {"text": "", "finish_reason": None, "usage": {}, "error": "Gemini SDK not available"}
 
     prompt = _truncate(prompt)
 
+    cfg = _default_generation_config(max_output_tokens, temperature, kwargs.get("generation_config"))
+    return _call(prompt, model, cfg, _default_safety(kwargs), feature=kwargs.get("feature"),
+                 attempt=int(kwargs.get("attempt", 0)), timeout=float(kwargs.get("timeout", 30)))
+
+# ==============================
+# Streaming entrypoint
+# ==============================
+def generate_stream(
+    prompt: str,
+    model: str,
+    temperature: float = 0.3,
+    max_output_tokens: int = 512,
+    **kwargs,
+) -> Iterator[str]:
+    """
+    SDK가 만드는 대로 텍스트 조각을 yield.
+    - 오류는 예외로 전파(호출측에서 fallback 처리).
+    - 마지막 청크의 finish_reason/usage는 kwargs["on_finish"](reason, usage) 콜백으로 전달.
+    - 지표: 전체 지연 + 첫 청크 지연(ttft_ms), feature는 kwargs["feature"].
+    """
+    client = get_client()
+    if not client.available:
+        raise RuntimeError("Gemini SDK not available")
+
+    prompt = _truncate(prompt)
     cfg = _default_generation_config(max_output_tokens, temperature, kwargs.get("generation_config"))
     safety = _default_safety(kwargs)
+    on_finish = kwargs.get("on_finish")
+    feature = kwargs.get("feature") or "unknown"
 
+    timeout = float(kwargs.get("timeout", 30))
+    t0 = time.perf_counter()
+    ttft = None
+    last = None
+    settled = False  # 소비측이 중간에 버린 경우(GeneratorExit)도 finally에서 abandon
     try:
-        model_obj = genai.GenerativeModel(model)
-        resp = model_obj.generate_content(
-            prompt,
-            generation_config=cfg,
-            safety_settings=safety,
-            request_options={"timeout": 30},
-        )
-        text, reason, usage = _extract_from_obj(resp)
-        return {"text": text, "finish_reason": reason, "usage": usage}
+        # 스트림이 끝날 때까지 슬롯 유지
+        with limiter.acquire(estimate_tokens(prompt, cfg.get("max_output_tokens", 0)), timeout) as permit:
+            resp = client.generate_content(prompt, model=model, generation_config=cfg, safety_settings=safety,
+                                           stream=True, timeout=timeout)
+            for chunk in resp:
+                last = chunk
+                piece = _chunk_text(chunk)
+                if piece:
+                    if ttft is None:
+                        ttft = (time.perf_counter() - t0) * 1000
+                    yield piece
+            if last is not None:
+                permit.settle(_extract_from_obj(last)[2])
+        breaker.record_success()
+        settled = True
     except Exception as e:
-        return {"text": "", "finish_reason": None, "usage": {}, "error": str(e)}
+        if is_retryable(e) and not isinstance(e, LLMQueueTimeout):
+            breaker.record_failure()
+            settled = True
+        metrics.record(feature=feature, model=model, latency_ms=(time.perf_counter() - t0) * 1000,
+                       error=str(e), stream=True, ttft_ms=ttft)
+        raise
+    finally:
+        if not settled:
+            breaker.abandon()
+    _, reason, usage = _extract_from_obj(last) if last is not None else ("", None, {})
+    metrics.record(feature=feature, model=model, latency_ms=(time.perf_counter() - t0) * 1000,
+                   finish_reason=finish_reason_label(reason) if reason is not None else None,
+                   usage=usage, stream=True, ttft_ms=ttft)
+    if callable(on_finish):
+        on_finish(reason, usage)
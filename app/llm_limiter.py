@@ -0,0 +1,246 @@
+# app/llm_limiter.py
+"""
+Gemini 호출 동시성/속도 제한(llm_client 단일 경로에서 사용).
+- 동시 호출 상한: 프로세스 세마포어(기본) 또는 Postgres advisory lock 슬롯(여러 프로세스 공유)
+- 토큰 버킷: 분당 요청 수(RPM) / 분당 토큰 수(TPM). 토큰은 추정치로 선차감 → 응답 usage로 정산
+- 대기열 timeout 초과 시 LLMQueueTimeout. 대기열 깊이·대기시간은 stats()
+환경변수: LLM_MAX_CONCURRENCY, LLM_RPM, LLM_TPM, LLM_QUEUE_TIMEOUT_SEC,
+          LLM_LIMITER_BACKEND(local|postgres), LLM_LIMITER_LOCK_KEY
+"""
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import text
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_RPM = float(os.getenv("LLM_RPM", "60"))
+LLM_TPM = float(os.getenv("LLM_TPM", "120000"))
+LLM_QUEUE_TIMEOUT_SEC = float(os.getenv("LLM_QUEUE_TIMEOUT_SEC", "10"))
+LLM_LIMITER_BACKEND = os.getenv("LLM_LIMITER_BACKEND", "local").lower()
+LLM_LIMITER_LOCK_KEY = int(os.getenv("LLM_LIMITER_LOCK_KEY", "724301"))  # advisory lock 네임스페이스
+
+log = logging.getLogger(__name__)
+
+
+class LLMQueueTimeout(TimeoutError):
+    """대기열에서 timeout 안에 슬롯/토큰을 얻지 못함(업스트림 장애 아님)."""
+
+
+def estimate_tokens(prompt: str, max_output_tokens: int) -> int:
+    # 한글 위주 프롬프트 ≈ 2자/토큰. 출력은 상한으로 선차감
+    return len(prompt or "") // 2 + int(max_output_tokens)
+
+
+class TokenBucket:
+    """분당 rate 보충, capacity 상한. rate<=0 이면 무제한."""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else per_minute)
+        self._tokens = self.capacity
+        self._t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._t) * self.rate)
+        self._t = now
+
+    def try_take(self, n: float) -> float:
+        """차감 성공 시 0, 아니면 필요한 대기 초."""
+        if self.rate <= 0:
+            return 0.0
+        n = min(n, self.capacity)  # 상한보다 큰 요청도 언젠가는 통과
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= n:
+                self._tokens -= n
+                return 0.0
+            return (n - self._tokens) / self.rate
+
+    def adjust(self, delta: float) -> None:
+        """정산: delta>0 추가 차감, delta<0 환급."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens - delta)
+
+    def available(self) -> Optional[float]:
+        if self.rate <= 0:
+            return None
+        with self._lock:
+            self._refill(time.monotonic())
+            return round(self._tokens, 1)
+
+
+class _LocalSlots:
+    def __init__(self, n: int):
+        self._sem = threading.BoundedSemaphore(max(1, n))
+
+    def acquire(self, timeout: float):
+        return True if self._sem.acquire(timeout=max(0.0, timeout)) else None
+
+    def release(self, handle) -> None:
+        self._sem.release()
+
+
+class _PostgresSlots:
+    """pg_try_advisory_lock(key, slot) 로 N개 슬롯을 프로세스 간 공유. 잠금은 커넥션 세션에 귀속.
+    deps 레지스트리의 전용 AUTOCOMMIT 풀(llm_slots, 커넥션 N개)을 사용 → 공용 풀 커넥션을 호출 내내
+    점유하지 않고 idle in transaction으로 남지 않음. pool_stats(pool="llm_slots")로 확인.
+    DB 오류(접속 불가 등)는 경고 로그 후 프로세스 슬롯만으로 진행(fail open) → 대기열 timeout으로 위장하지 않음."""
+
+    POOL = "llm_slots"
+
+    def __init__(self, n: int, key: int):
+        self.n = max(1, n)
+        self.key = key
+        self._local = _LocalSlots(self.n)  # 프로세스 내에서 먼저 걸러 DB 폴링 감소
+        self.fail_open = 0
+
+    def _engine(self):
+        from app.deps import get_engine
+        # 프로세스 내 동시 보유 ≤ n(_local) → 풀 n개면 대기 없음
+        return get_engine(pool=self.POOL, pool_size=self.n, max_overflow=0, isolation_level="AUTOCOMMIT")
+
+    def acquire(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        if not self._local.acquire(timeout):
+            return None
+        conn = None
+        try:
+            conn = self._engine().connect()
+            delay = 0.05
+            while True:
+                for slot in range(self.n):
+                    if conn.execute(text("select pg_try_advisory_lock(:k, :s)"), {"k": self.key, "s": slot}).scalar():
+                        return (conn, slot)
+                if time.monotonic() + delay > deadline:
+                    break
+                time.sleep(delay)
+                delay = min(delay * 2, 0.5)
+        except Exception:
+            log.warning("LLM limiter: postgres slot 획득 실패 → 프로세스 슬롯만으로 진행", exc_info=True)
+            if conn is not None:
+                conn.invalidate()
+                conn.close()
+            self.fail_open += 1
+            return (None, None)  # 프로세스 슬롯은 보유한 채 진행
+        conn.close()
+        self._local.release(None)
+        return None
+
+    def release(self, handle) -> None:
+        conn, slot = handle
+        if conn is None:  # fail open 핸들
+            self._local.release(None)
+            return
+        try:
+            conn.execute(text("select pg_advisory_unlock(:k, :s)"), {"k": self.key, "s": slot})
+        except Exception:
+            conn.invalidate()  # 해제 실패 → 세션을 끊어 잠금이 풀에 남지 않게
+            raise
+        finally:
+            conn.close()
+            self._local.release(None)
+
+
+class LLMLimiter:
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, rpm: float = LLM_RPM, tpm: float = LLM_TPM,
+                 queue_timeout: float = LLM_QUEUE_TIMEOUT_SEC, backend: str = LLM_LIMITER_BACKEND):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.slots = _PostgresSlots(max_concurrency, LLM_LIMITER_LOCK_KEY) if backend == "postgres" \
+            else _LocalSlots(max_concurrency)
+        self.rpm = TokenBucket(rpm)
+        self.tpm = TokenBucket(tpm)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def _take_buckets(self, est_tokens: int, deadline: float) -> bool:
+        while True:
+            w = self.rpm.try_take(1)
+            if w == 0.0:
+                w = self.tpm.try_take(est_tokens)
+                if w == 0.0:
+                    return True
+                self.rpm.adjust(-1)  # TPM 대기 → RPM 환급 후 재시도
+            if time.monotonic() + w > deadline:
+                return False
+            time.sleep(min(w, 1.0))
+
+    @contextmanager
+    def acquire(self, est_tokens: int = 0, timeout: Optional[float] = None) -> Iterator["_Permit"]:
+        timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        t0 = time.monotonic()
+        deadline = t0 + timeout
+        with self._lock:
+            self.waiting += 1
+        handle, ok = None, False
+        try:
+            handle = self.slots.acquire(timeout)
+            ok = handle is not None and self._take_buckets(est_tokens, deadline)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        if not ok:
+            if handle is not None:
+                self.slots.release(handle)
+            with self._lock:
+                self.timeouts += 1
+            raise LLMQueueTimeout(f"LLM queue timeout ({timeout:.1f}s)")
+
+        waited = (time.monotonic() - t0) * 1000
+        with self._lock:
+            self.in_flight += 1
+            self.acquired += 1
+            self.wait_ms_total += waited
+            self.wait_ms_max = max(self.wait_ms_max, waited)
+        permit = _Permit(self, est_tokens)
+        try:
+            yield permit
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self.slots.release(handle)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self.in_flight,
+                "queue_depth": self.waiting,
+                "acquired": self.acquired,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": round(self.wait_ms_total / self.acquired, 1) if self.acquired else None,
+                "wait_ms_max": round(self.wait_ms_max, 1),
+                "rpm_available": self.rpm.available(),
+                "tpm_available": self.tpm.available(),
+                "slot_fail_open": getattr(self.slots, "fail_open", None),  # postgres 슬롯 장애로 우회한 횟수
+            }
+
+
+class _Permit:
+    def __init__(self, limiter: LLMLimiter, est_tokens: int):
+        self._limiter = limiter
+        self._est = est_tokens
+
+    def settle(self, usage: Optional[Dict[str, Any]]) -> None:
+        """응답 usage(total_tokens)로 TPM 선차감분 정산."""
+        total = (usage or {}).get("total_tokens")
+        if total is not None:
+            self._limiter.tpm.adjust(int(total) - self._est)
+            self._est = int(total)
+
+
+limiter = LLMLimiter()
@@ -0,0 +1,97 @@
+# app/llm_metrics.py
+"""
+LLM 호출 지표 싱크.
+- 호출 1건 = 이벤트 1개(feature, model, latency, 토큰, finish reason, 재시도 차수, 캐시 적중)
+- feature별 누적 집계 → 비용/지연을 기능 단위로 귀속(chat, report, review_summary ...)
+- LLM_METRICS_PATH 지정 시 이벤트를 JSONL로 추가 기록(오프라인 분석용)
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+LLM_METRICS_PATH = os.getenv("LLM_METRICS_PATH") or None
+
+
+def _new_agg() -> Dict[str, Any]:
+    return {
+        "calls": 0, "errors": 0, "retries": 0, "cache_hits": 0, "streams": 0,
+        "latency_ms_total": 0.0, "latency_ms_max": 0.0,
+        "input_tokens": 0, "output_tokens": 0, "total_tokens": 0,
+        "finish_reasons": {},
+    }
+
+
+class LLMMetrics:
+    """스레드 안전 인메모리 집계 + 최근 이벤트 링버퍼."""
+
+    def __init__(self, recent: int = 500, path: Optional[str] = None):
+        self.path = path
+        self._recent: deque = deque(maxlen=recent)
+        self._by_feature: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, *, feature: str, model: str, latency_ms: float, finish_reason: Optional[str] = None,
+               usage: Optional[Dict[str, Any]] = None, attempt: int = 0, error: Optional[str] = None,
+               stream: bool = False, cached: bool = False, ttft_ms: Optional[float] = None) -> None:
+        usage = usage or {}
+        ev = {
+            "ts": time.time(), "feature": feature, "model": model,
+            "latency_ms": round(latency_ms, 1), "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+            "finish_reason": finish_reason, "attempt": attempt, "error": error,
+            "stream": stream, "cached": cached,
+            "input_tokens": usage.get("input_tokens"), "output_tokens": usage.get("output_tokens"),
+            "total_tokens": usage.get("total_tokens"),
+        }
+        with self._lock:
+            self._recent.append(ev)
+            agg = self._by_feature.setdefault(feature, _new_agg())
+            if cached:
+                agg["cache_hits"] += 1
+            else:
+                agg["calls"] += 1
+                agg["errors"] += 1 if error else 0
+                agg["retries"] += 1 if attempt > 0 else 0
+                agg["streams"] += 1 if stream else 0
+                agg["latency_ms_total"] += latency_ms
+                agg["latency_ms_max"] = max(agg["latency_ms_max"], latency_ms)
+                for k in ("input_tokens", "output_tokens", "total_tokens"):
+                    agg[k] += int(ev[k] or 0)
+                fr = finish_reason or "UNKNOWN"
+                agg["finish_reasons"][fr] = agg["finish_reasons"].get(fr, 0) + 1
+        if self.path:
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(ev, ensure_ascii=False) + "\n")
+            except Exception:
+                pass
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            out = {}
+            for feature, agg in self._by_feature.items():
+                a = {**agg, "finish_reasons": dict(agg["finish_reasons"])}
+                total = a.pop("latency_ms_total")
+                a["latency_ms_avg"] = round(total / a["calls"], 1) if a["calls"] else None
+                a["latency_ms_max"] = round(a["latency_ms_max"], 1)
+                out[feature] = a
+            return out
+
+    def recent(self, n: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._recent)[-n:]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._recent.clear()
+            self._by_feature.clear()
+
+
+metrics = LLMMetrics(path=LLM_METRICS_PATH)
+
+
+def llm_metrics() -> Dict[str, Dict[str, Any]]:
+    return metrics.snapshot()
@@ -0,0 +1,147 @@
+# app/llm_retry.py
+"""
+LLM 재시도 정책 + 서킷 브레이커.
+- RetryPolicy: 총 데드라인 예산 안에서 지수 백오프(full jitter). 호출별 timeout = min(기본, 남은 예산)
+- 재시도 대상: 타임아웃·429·5xx·연결 오류. 그 외(400/401/403 등)는 즉시 종료
+- CircuitBreaker: 연속 실패 N회 → open(호출 차단) → reset_after 후 half-open 1건 시험 → 성공 시 close
+  시험 호출이 판정 없이 끝나면(비재시도 오류·대기열 초과·스트림 중단) abandon()으로 다시 open.
+  abandon이 누락돼도 reset_after가 지나면 시험 호출 1건을 새로 허용
+환경변수: LLM_DEADLINE_SEC, LLM_CALL_TIMEOUT_SEC, LLM_MAX_ATTEMPTS, LLM_BACKOFF_BASE_SEC, LLM_BACKOFF_MAX_SEC,
+          LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SEC
+"""
+from __future__ import annotations
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+LLM_DEADLINE_SEC = float(os.getenv("LLM_DEADLINE_SEC", "20"))
+LLM_CALL_TIMEOUT_SEC = float(os.getenv("LLM_CALL_TIMEOUT_SEC", "15"))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "4"))
+LLM_BACKOFF_BASE_SEC = float(os.getenv("LLM_BACKOFF_BASE_SEC", "0.5"))
+LLM_BACKOFF_MAX_SEC = float(os.getenv("LLM_BACKOFF_MAX_SEC", "4"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SEC = float(os.getenv("LLM_BREAKER_RESET_SEC", "30"))
+
+_RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+_RETRYABLE_NAMES = (
+    "Timeout", "DeadlineExceeded", "ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+    "InternalServerError", "BadGateway", "GatewayTimeout", "ConnectionError", "RetryError", "Aborted",
+)
+_RETRYABLE_TEXT = ("timeout", "timed out", "deadline", "429", "500", "502", "503", "504",
+                   "unavailable", "resource exhausted", "quota", "connection reset", "temporarily")
+
+
+def is_retryable(err: Any) -> bool:
+    """예외 객체 또는 오류 문자열 → 재시도 대상 여부."""
+    if err is None:
+        return False
+    if isinstance(err, BaseException):
+        code = getattr(err, "code", None)
+        if isinstance(code, int) and code in _RETRYABLE_CODES:
+            return True
+        if isinstance(err, (TimeoutError, ConnectionError)):
+            return True
+        if any(n in type(err).__name__ for n in _RETRYABLE_NAMES):
+            return True
+    low = str(err).lower()
+    return any(t in low for t in _RETRYABLE_TEXT)
+
+
+class RetryPolicy:
+    def __init__(self, deadline_sec: float = LLM_DEADLINE_SEC, call_timeout_sec: float = LLM_CALL_TIMEOUT_SEC,
+                 max_attempts: int = LLM_MAX_ATTEMPTS, base_delay: float = LLM_BACKOFF_BASE_SEC,
+                 max_delay: float = LLM_BACKOFF_MAX_SEC, min_call_sec: float = 1.0):
+        self.deadline_sec = deadline_sec
+        self.call_timeout_sec = call_timeout_sec
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.min_call_sec = min_call_sec
+
+    def start(self) -> float:
+        return time.monotonic() + self.deadline_sec
+
+    def remaining(self, deadline: float) -> float:
+        return deadline - time.monotonic()
+
+    def call_timeout(self, deadline: float) -> Optional[float]:
+        """이번 호출에 줄 timeout. 예산이 최소치 미만이면 None(중단)."""
+        left = self.remaining(deadline)
+        if left < self.min_call_sec:
+            return None
+        return min(self.call_timeout_sec, left)
+
+    def backoff(self, retry: int, deadline: float) -> bool:
+        """retry번째 재시도 전 대기(full jitter). 대기 후 호출할 예산이 없으면 False."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry)))
+        if self.remaining(deadline) - delay < self.min_call_sec:
+            return False
+        time.sleep(delay)
+        return True
+
+
+class CircuitBreaker:
+    """프로세스 전역. 업스트림 장애(재시도 대상 오류)만 실패로 집계."""
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_after: float = LLM_BREAKER_RESET_SEC):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe = False
+        self._probe_at = 0.0
+        self._lock = threading.Lock()
+        self.short_circuits = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == "closed":
+                return True
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_after:
+                self._state = "half_open"
+                self._probe = False
+            now = time.monotonic()
+            if self._state == "half_open" and (not self._probe or now - self._probe_at >= self.reset_after):
+                self._probe = True  # 시험 호출 1건만 통과(결과 없이 reset_after 지나면 재시험)
+                self._probe_at = now
+                return True
+            self.short_circuits += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._probe = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                self._probe = False
+
+    def abandon(self) -> None:
+        """성공/실패 판정 없이 끝난 호출. half-open 시험 호출이었다면 실패로 보고 다시 open."""
+        with self._lock:
+            if self._state == "half_open" and self._probe:
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                self._probe = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self._state, "failures": self._failures, "short_circuits": self.short_circuits}
+
+
+retry_policy = RetryPolicy()
+breaker = CircuitBreaker()
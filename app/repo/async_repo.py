@@ -0,0 +1,129 @@
+"""
+psycopg3 AsyncConnectionPool 기반 비동기 repo.
+- SQL은 동기 repo(metrics_repo/compare_repo)와 공유. ':name' 파라미터만 '%(name)s'로 변환.
+- 전용 이벤트 루프 스레드가 풀을 소유 → 동기 코드(Streamlit)는 run_sync()로 호출.
+- gather_report_data(): 보고서용 시계열·스냅샷·경쟁점 3개 쿼리를 동시에 실행(merchant_bundle이 사용).
+"""
+from __future__ import annotations
+import asyncio
+import atexit
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from app.deps import libpq_dsn
+from app.repo.compare_repo import SQL_COMPETITORS
+from app.repo.metrics_repo import _SQL_SNAPSHOT, _SQL_TIMESERIES
+
+DB_ASYNC_POOL_MIN = int(os.getenv("DB_ASYNC_POOL_MIN", "1"))
+DB_ASYNC_POOL_MAX = int(os.getenv("DB_ASYNC_POOL_MAX", "3"))
+DB_ASYNC_POOL_TIMEOUT = float(os.getenv("DB_ASYNC_POOL_TIMEOUT", "30"))
+
+_PARAM = re.compile(r"(?<![:\w]):(\w+)")
+
+def _pyformat(sql) -> str:
+    """SQLAlchemy text() → psycopg pyformat. '::cast'는 유지, 리터럴 %는 이스케이프."""
+    return _PARAM.sub(r"%(\1)s", sql.text.replace("%", "%%"))
+
+_Q_TIMESERIES = _pyformat(_SQL_TIMESERIES)
+_Q_SNAPSHOT = _pyformat(_SQL_SNAPSHOT)
+_Q_COMPETITORS = _pyformat(SQL_COMPETITORS)
+
+# ----------------------------
+# 이벤트 루프 / 풀
+# ----------------------------
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_pool: Optional[AsyncConnectionPool] = None
+_pool_lock: Optional[asyncio.Lock] = None
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-repo-loop", daemon=True).start()
+    return _loop
+
+def run_sync(coro, timeout: Optional[float] = None):
+    """동기 코드에서 코루틴 실행(풀 소유 루프에서)."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result(timeout)
+
+async def get_pool() -> AsyncConnectionPool:
+    global _pool, _pool_lock
+    if _pool is not None:
+        return _pool
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is None:
+            pool = AsyncConnectionPool(
+                libpq_dsn(),
+                min_size=DB_ASYNC_POOL_MIN,
+                max_size=DB_ASYNC_POOL_MAX,
+                timeout=DB_ASYNC_POOL_TIMEOUT,
+                # Supabase pooler(트랜잭션 모드) 대비 prepared statement 비활성
+                kwargs={"row_factory": dict_row, "prepare_threshold": None, "autocommit": True},
+                open=False,
+            )
+            await pool.open()
+            _pool = pool
+    return _pool
+
+async def close_pool() -> None:
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.close()
+
+@atexit.register
+def _shutdown() -> None:
+    if _loop is None or not _loop.is_running():
+        return
+    try:
+        run_sync(close_pool(), timeout=5)
+    except Exception:
+        pass
+    _loop.call_soon_threadsafe(_loop.stop)
+
+async def _fetch_all(query: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    pool = await get_pool()
+    async with pool.connection() as conn:
+        cur = await conn.execute(query, params)
+        return await cur.fetchall()
+
+# ----------------------------
+# 비동기 fetch (동기 repo fetch_timeseries/fetch_snapshot/fetch_top_competitors와 동일 반환 형태)
+# ----------------------------
+async def fetch_timeseries_async(mct: str, m0: str, m1: str) -> List[Dict[str, Any]]:
+    return await _fetch_all(_Q_TIMESERIES, {"m": mct, "m0": m0, "m1": m1})
+
+async def fetch_snapshot_async(mct: str) -> Optional[Dict[str, Any]]:
+    rows = await _fetch_all(_Q_SNAPSHOT, {"m": mct})
+    return rows[0] if rows else None
+
+async def fetch_top_competitors_async(mct: str) -> List[Dict[str, Any]]:
+    return await _fetch_all(_Q_COMPETITORS, {"mct": mct})
+
+async def gather_report_data(mct: str, m0: str, m1: str, timings: Optional[Dict[str, float]] = None
+                             ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """(timeseries, snapshot, competitors)를 병렬 조회. 지연 ≈ 가장 느린 쿼리 1개.
+    timings를 넘기면 쿼리별 소요(ms)를 fetch.timeseries/fetch.snapshot/fetch.competitors로 기록."""
+    async def timed(name: str, coro):
+        t0 = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            if timings is not None:
+                timings[name] = round((time.perf_counter() - t0) * 1000, 1)
+
+    return await asyncio.gather(
+        timed("fetch.timeseries", fetch_timeseries_async(mct, m0, m1)),
+        timed("fetch.snapshot", fetch_snapshot_async(mct)),
+        timed("fetch.competitors", fetch_top_competitors_async(mct)),
+    )
@@ -1,34 +1,59 @@
+from typing import Any, Dict, List, Optional
 from sqlalchemy import text
 from app.deps import get_session
+from app.cache import cached, invalidate
 
+# 최신월 · 대상 가맹점과 같은 (상권, 업종)의 상위 3개 (mart_competitor_rank 인덱스 조회)
 SQL_COMPETITORS = text("""
-with base as (
-  select
-    o.encoded_mct,
-    o.mct_nm,
-    o.hpsn_mct_bzn_cd_nm as bizarea,
-    o.hpsn_mct_zcd_nm as industry,
-    u.m1_sme_ry_saa_rat as ind_sales_idx,
-    u.m12_sme_ry_saa_pce_rt as ind_rank_pct,
-    u.m12_sme_bzn_saa_pce_rt as area_rank_pct
-  from stg_merchant_overview o
-  join stg_merchant_monthly_usage u using(encoded_mct)
-  where to_date(u.ta_ym,'YYYYMM') = (
-      select max(to_date(ta_ym,'YYYYMM')) from stg_merchant_monthly_usage
-  )
-),
-target as (
-  select bizarea, industry from base where encoded_mct = :mct
-)
-select b.encoded_mct, b.mct_nm, b.ind_sales_idx, b.ind_rank_pct, b.area_rank_pct
-from base b join target t
-  on b.bizarea = t.bizarea and b.industry = t.industry
-where b.ind_sales_idx > 100
-order by b.ind_sales_idx desc
+select r.encoded_mct, r.mct_nm, r.ind_sales_idx, r.ind_rank_pct, r.area_rank_pct
+from public.stg_merchant_overview t
+join public.mart_competitor_rank r
+  on r.month = (select max(month) from public.mart_merchant_monthly_metrics)
+ and r.bizarea = t.hpsn_mct_bzn_cd_nm
+ and r.industry = t.hpsn_mct_zcd_nm
+where t.encoded_mct = :mct
+order by r.rank
 limit 3;
 """)
 
+# 배치용: 가맹점 N곳의 상위 3개를 한 번에(rank <= 3 = 단건 쿼리의 limit 3)
+_SQL_COMPETITORS_BATCH = text("""
+select t.encoded_mct as target_mct,
+       r.encoded_mct, r.mct_nm, r.ind_sales_idx, r.ind_rank_pct, r.area_rank_pct
+from public.stg_merchant_overview t
+join public.mart_competitor_rank r
+  on r.month = (select max(month) from public.mart_merchant_monthly_metrics)
+ and r.bizarea = t.hpsn_mct_bzn_cd_nm
+ and r.industry = t.hpsn_mct_zcd_nm
+ and r.rank <= 3
+where t.encoded_mct = any(:mcts)
+order by t.encoded_mct, r.rank;
+""")
+
+_SQL_REFRESH_RANK = text("select public.refresh_competitor_rank_months(cast(:yms as text[]))")
+
+@cached
 def fetch_top_competitors(mct: str):
     with get_session() as s:
         rows = s.execute(SQL_COMPETITORS, {"mct": mct}).mappings().all()
     return [dict(r) for r in rows]
+
+def fetch_top_competitors_batch(mcts: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """가맹점별 상위 3개 {encoded_mct: rows}."""
+    mcts = list(dict.fromkeys(mcts))
+    out: Dict[str, List[Dict[str, Any]]] = {m: [] for m in mcts}
+    if not mcts:
+        return out
+    with get_session() as s:
+        rows = s.execute(_SQL_COMPETITORS_BATCH, {"mcts": mcts}).mappings().all()
+    for r in rows:
+        d = dict(r)
+        out[d.pop("target_mct")].append(d)
+    return out
+
+def refresh_competitor_rank(months: Optional[List[str]] = None) -> int:
+    """refresh_metrics_mart() 이후 같은 months로 호출. 그 월의 상권·업종별 순위만 재계산(None이면 전체)."""
+    with get_session() as s:
+        n = s.execute(_SQL_REFRESH_RANK, {"yms": months}).scalar()
+    invalidate()
+    return int(n or 0)
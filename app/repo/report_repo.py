@@ -0,0 +1,77 @@
+from typing import Any, Dict, List, Optional, Set
+from sqlalchemy import text
+from app.deps import get_session
+
+# 대상 가맹점 선택: 필터 조합별 SQL(‘:x is null or col=:x’ 대신 인덱스 사용 가능한 형태)
+_SQL_MERCHANTS = {
+    (False, False): "",
+    (True, False): "where hpsn_mct_bzn_cd_nm = :bizarea",
+    (False, True): "where hpsn_mct_zcd_nm = :industry",
+    (True, True): "where hpsn_mct_bzn_cd_nm = :bizarea and hpsn_mct_zcd_nm = :industry",
+}
+
+_SQL_DONE = text("""
+select encoded_mct
+from public.reports
+where data_month = :dm and prompt_version = :pv and model = :model
+  and status in ('done', 'no_data')
+""")
+
+_SQL_FETCH = text("""
+select encoded_mct, data_month, prompt_version, model, status, report, error, elapsed_ms, payload, updated_at
+from public.reports
+where encoded_mct = :mct and data_month = :dm and prompt_version = :pv and model = :model
+""")
+
+_SQL_UPSERT = text("""
+insert into public.reports
+  (encoded_mct, data_month, prompt_version, model, status, report, error, elapsed_ms, payload)
+values
+  (:encoded_mct, :data_month, :prompt_version, :model, :status, :report, :error, :elapsed_ms,
+   cast(:payload as jsonb))
+on conflict (encoded_mct, data_month, prompt_version, model) do update
+   set status = excluded.status,
+       report = excluded.report,
+       error = excluded.error,
+       elapsed_ms = excluded.elapsed_ms,
+       payload = coalesce(excluded.payload, public.reports.payload),
+       updated_at = now()
+""")
+
+def select_merchants(bizarea: Optional[str] = None, industry: Optional[str] = None,
+                     limit: Optional[int] = None) -> List[str]:
+    where = _SQL_MERCHANTS[(bizarea is not None, industry is not None)]
+    sql = f"select encoded_mct from public.stg_merchant_overview {where} order by encoded_mct"
+    if limit:
+        sql += " limit :limit"
+    with get_session() as s:
+        rows = s.execute(text(sql), {"bizarea": bizarea, "industry": industry, "limit": limit}).scalars().all()
+    return list(rows)
+
+def fetch_done_mcts(data_month: str, prompt_version: str, model: str) -> Set[str]:
+    """같은 실행 키(적재월·프롬프트·모델)로 이미 끝난 가맹점 → 배치 재개 시 건너뜀."""
+    with get_session() as s:
+        rows = s.execute(_SQL_DONE, {"dm": data_month, "pv": prompt_version, "model": model}).scalars().all()
+    return set(rows)
+
+def fetch_report(mct: str, data_month: str, prompt_version: str, model: str) -> Optional[Dict[str, Any]]:
+    """저장 보고서 1건(PK 조회). 없으면 None."""
+    with get_session() as s:
+        row = s.execute(_SQL_FETCH, {"mct": mct, "dm": data_month, "pv": prompt_version, "model": model}).mappings().first()
+    return dict(row) if row else None
+
+def upsert_reports(rows: List[Dict[str, Any]]) -> int:
+    """
+    rows: encoded_mct, data_month, prompt_version, model, status, report, error, elapsed_ms, payload(JSON 문자열|None)
+    executemany 1회. payload가 None이면 기존 값 유지.
+    """
+    if not rows:
+        return 0
+    keys = ("report", "error", "elapsed_ms", "payload")
+    rows = [{**{k: None for k in keys}, **r} for r in rows]
+    with get_session() as s:
+        s.execute(_SQL_UPSERT, rows)
+    return len(rows)
+
+def upsert_report(row: Dict[str, Any]) -> None:
+    upsert_reports([row])
@@ -1,87 +1,102 @@
 from typing import Any, Dict, List, Optional
-from datetime import date
-from app.repo.metrics_repo import fetch_timeseries, fetch_snapshot
+import numpy as np
+import pandas as pd
+from app.repo.metrics_repo import fetch_timeseries_batch
+from app.services.merchant_bundle import MerchantBundle, load_bundle
 
-def _fmt_pct(x: Optional[float]) -> str:
-    if x is None:
-        return "-"
-    return f"{x:.1f}%"
+# 카드 사양 테이블
+# - fmt: pct(1.0%) | rank(P10) | visit_mix(신규/재방문 조합)
+# - direction: +1 증가=개선, -1 감소=개선(백분위는 낮을수록 상위 → prev - now)
+# - badge: 개선 시 ▲ 표시 여부
+CARD_SPECS: List[Dict[str, Any]] = [
+    {"key": "peer_ind_sales_idx", "title": "업종대비 매출지수", "fmt": "pct",  "direction": 1,  "badge": True,  "tooltip": "업종 평균=100"},
+    {"key": "peer_ind_cnt_idx",   "title": "업종대비 건수지수", "fmt": "pct",  "direction": 1,  "badge": True,  "tooltip": "업종 평균=100"},
+    {"key": "ind_rank_pct",       "title": "업종 내 백분위",   "fmt": "rank", "direction": -1, "badge": True,  "tooltip": "낮을수록 상위"},
+    {"key": "area_rank_pct",      "title": "상권 내 백분위",   "fmt": "rank", "direction": -1, "badge": True,  "tooltip": "낮을수록 상위"},
+    {"key": "delivery_ratio",     "title": "배달 비중",        "fmt": "pct",  "direction": 1,  "badge": False, "tooltip": "음수는 0으로 보정"},
+    {"key": "visit_mix",          "title": "방문 구성",        "fmt": "visit_mix", "direction": 0, "badge": False, "tooltip": "최근 월 방문자 구성"},
+]
 
-def _fmt_rank(x: Optional[float]) -> str:
-    if x is None:
-        return "-"
-    return f"P{x:.0f}"
+_METRIC_COLS = [s["key"] for s in CARD_SPECS if s["fmt"] != "visit_mix"] + ["new_ratio", "revisit_ratio"]
 
-def _delta(a: Optional[float], b: Optional[float]) -> Optional[float]:
-    if a is None or b is None:
-        return None
-    return a - b
+def _fmt(x: pd.Series, pattern: str) -> pd.Series:
+    v = x.to_numpy(dtype=float, na_value=np.nan)
+    s = np.char.mod(pattern, np.nan_to_num(v))
+    return pd.Series(np.where(np.isnan(v), "-", s), index=x.index)
 
-def build_dashboard_cards(mct: str, start: str, end: str) -> Dict[str, Any]:
-    ts = fetch_timeseries(mct, start, end)
-    snap = fetch_snapshot(mct)
+def _fmt_pct(x: pd.Series) -> pd.Series:
+    return _fmt(x, "%.1f%%")
 
-    latest = ts[-1] if ts else None
-    prev = ts[-2] if len(ts) >= 2 else None
+def _fmt_rank(x: pd.Series) -> pd.Series:
+    return _fmt(x, "P%.0f")
 
-    cards: List[Dict[str, Any]] = []
-    if latest:
-        # 매출지수(업종대비)
-        cards.append({
-            "key": "peer_ind_sales_idx",
-            "title": "업종대비 매출지수",
-            "value": _fmt_pct(latest.get("peer_ind_sales_idx")),
-            "delta": _fmt_pct(_delta(latest.get("peer_ind_sales_idx"), prev.get("peer_ind_sales_idx") if prev else None)),
-            "tooltip": "업종 평균=100",
-            "badge": "▲" if _delta(latest.get("peer_ind_sales_idx"), prev.get("peer_ind_sales_idx") if prev else None) and _delta(latest.get("peer_ind_sales_idx"), prev.get("peer_ind_sales_idx")) > 0 else " "
-        })
-        # 건수지수(업종대비)
-        cards.append({
-            "key": "peer_ind_cnt_idx",
-            "title": "업종대비 건수지수",
-            "value": _fmt_pct(latest.get("peer_ind_cnt_idx")),
-            "delta": _fmt_pct(_delta(latest.get("peer_ind_cnt_idx"), prev.get("peer_ind_cnt_idx") if prev else None)),
-            "tooltip": "업종 평균=100",
-            "badge": "▲" if _delta(latest.get("peer_ind_cnt_idx"), prev.get("peer_ind_cnt_idx") if prev else None) and _delta(latest.get("peer_ind_cnt_idx"), prev.get("peer_ind_cnt_idx")) > 0 else " "
-        })
-        # 업종 내 백분위
-        cards.append({
-            "key": "ind_rank_pct",
-            "title": "업종 내 백분위",
-            "value": _fmt_rank(latest.get("ind_rank_pct")),
-            "delta": _fmt_pct(_delta(prev.get("ind_rank_pct"), latest.get("ind_rank_pct")) if prev else None),  # 낮을수록 개선 → prev - now
-            "tooltip": "낮을수록 상위",
-            "badge": "▲" if prev and latest.get("ind_rank_pct") is not None and prev.get("ind_rank_pct") and latest["ind_rank_pct"] < prev["ind_rank_pct"] else " "
-        })
-        # 상권 내 백분위
-        cards.append({
-            "key": "area_rank_pct",
-            "title": "상권 내 백분위",
-            "value": _fmt_rank(latest.get("area_rank_pct")),
-            "delta": _fmt_pct(_delta(prev.get("area_rank_pct"), latest.get("area_rank_pct")) if prev else None),
-            "tooltip": "낮을수록 상위",
-            "badge": "▲" if prev and latest.get("area_rank_pct") is not None and prev.get("area_rank_pct") and latest["area_rank_pct"] < prev["area_rank_pct"] else " "
-        })
-        # 배달매출 비율
-        cards.append({
-            "key": "delivery_ratio",
-            "title": "배달 비중",
-            "value": _fmt_pct(latest.get("delivery_ratio")),
-            "delta": _fmt_pct(_delta(latest.get("delivery_ratio"), prev.get("delivery_ratio") if prev else None)),
-            "tooltip": "음수는 0으로 보정",
-            "badge": ""
-        })
-        # 신규/재방문
-        demo = latest.get("demographics") or {}
-        visit = demo.get("visit") or {}
-        cards.append({
-            "key": "visit_mix",
-            "title": "방문 구성",
-            "value": f"신규 {_fmt_pct(visit.get('new'))} / 재방문 {_fmt_pct(visit.get('revisit'))}",
-            "delta": "",
-            "tooltip": "최근 월 방문자 구성",
-            "badge": ""
-        })
+def timeseries_frame(ts_by_mct: Dict[str, List[Dict[str, Any]]]) -> pd.DataFrame:
+    """{mct: rows} → long frame(encoded_mct, month, 지표 컬럼). 방문 구성은 new_ratio/revisit_ratio 컬럼."""
+    recs = [
+        {"encoded_mct": mct, "month": r.get("month"), **{c: r.get(c) for c in _METRIC_COLS}}
+        for mct, rows in ts_by_mct.items() for r in rows
+    ]
+    df = pd.DataFrame.from_records(recs, columns=["encoded_mct", "month", *_METRIC_COLS])
+    df[_METRIC_COLS] = df[_METRIC_COLS].apply(pd.to_numeric, errors="coerce")
+    return df
+
+def cards_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    long frame → 카드 테이블(가맹점×카드 1행). 최근/직전 월만 사용, 전 지표 한 번에 계산.
+    컬럼: encoded_mct, key, title, value, delta, tooltip, badge
+    """
+    if df.empty:
+        return pd.DataFrame(columns=["encoded_mct", "key", "title", "value", "delta", "tooltip", "badge"])
+    df = df.sort_values(["encoded_mct", "month"], kind="stable")
+    nth_from_end = df.groupby("encoded_mct", sort=False).cumcount(ascending=False)
+    latest = df[nth_from_end == 0].set_index("encoded_mct")
+    prev = df[nth_from_end == 1].set_index("encoded_mct").reindex(latest.index)
+
+    out = []
+    for spec in CARD_SPECS:
+        key, fmt = spec["key"], spec["fmt"]
+        if fmt == "visit_mix":
+            value = "신규 " + _fmt_pct(latest["new_ratio"]) + " / 재방문 " + _fmt_pct(latest["revisit_ratio"])
+            delta = pd.Series("", index=latest.index)
+            badge = pd.Series("", index=latest.index)
+        else:
+            cur, before = latest[key], prev[key]
+            diff = (cur - before) * spec["direction"]
+            value = _fmt_pct(cur) if fmt == "pct" else _fmt_rank(cur)
+            delta = _fmt_pct(diff)
+            badge = pd.Series(np.where(diff > 0, "▲", " "), index=latest.index) if spec["badge"] else pd.Series("", index=latest.index)
+        out.append(pd.DataFrame({
+            "encoded_mct": latest.index,
+            "key": key,
+            "title": spec["title"],
+            "value": value.to_numpy(),
+            "delta": delta.to_numpy(),
+            "tooltip": spec["tooltip"],
+            "badge": badge.to_numpy(),
+        }))
+    return pd.concat(out, ignore_index=True)  # 카드 사양 순서(spec-major)
+
+def _cards_by_mct(table: pd.DataFrame) -> Dict[str, List[Dict[str, Any]]]:
+    # spec-major 순회 → 가맹점별 리스트는 CARD_SPECS 순서 유지
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for rec in table.to_dict("records"):
+        out.setdefault(rec.pop("encoded_mct"), []).append(rec)
+    return out
+
+def build_cards_batch(mcts: List[str], start: str, end: str) -> Dict[str, List[Dict[str, Any]]]:
+    """배치 export용: 가맹점 N곳 카드 사양을 쿼리 1회 + 벡터 연산 1회로."""
+    ts_by_mct = fetch_timeseries_batch(mcts, start, end)
+    cards = _cards_by_mct(cards_table(timeseries_frame(ts_by_mct)))
+    return {m: cards.get(m, []) for m in ts_by_mct}
+
+def build_dashboard_cards(mct: str, start: str, end: str, bundle: Optional[MerchantBundle] = None) -> Dict[str, Any]:
+    # 같은 화면의 보고서와 번들 공유(가맹점 원자료 1회 조회)
+    if bundle is None or not bundle.covers(start, end):
+        bundle = load_bundle(mct, start, end)
+    ts = bundle.timeseries_between(start, end)
+    snap = bundle.snapshot
+
+    cards = _cards_by_mct(cards_table(timeseries_frame({mct: ts}))).get(mct, [])
 
     context = {
         "merchant": {
@@ -0,0 +1,374 @@
+"""
+stg_* CSV 적재(증분·멱등).
+- CSV를 블록 단위로 읽어 psycopg3 COPY → 임시 테이블(파일 전체를 메모리에 올리지 않음)
+- 임시 테이블에서 월(TA_YM)별 행 수·체크섬 계산 → ingest_month_state와 같으면 그 월은 병합 생략
+- 바뀐 월만 PK(ENCODED_MCT[, month]) 기준 upsert. 값이 같은 행은 갱신하지 않음(is distinct from)
+  월별 테이블은 같은 트랜잭션에서 그 월의 CSV에 없는 행을 먼저 삭제(월 단위 교체).
+  개요는 월별 테이블이 FK로 참조 → upsert만
+  month(파티션 키, ddl_011)는 TA_YM에서 채우고, 없는 월 파티션은 병합 전에 생성
+- 월별 이용 CSV의 버킷 원문은 bucket_value(ddl_012)에 새 값만 추가 → 마트는 조회 테이블 조인
+- 테이블별 병합·상태 갱신은 1트랜잭션(COPY·월 파티션 생성은 그 앞의 짧은 트랜잭션) → 중간 실패 시 재실행하면 같은 결과
+- 변경이 있으면 바뀐 월만 마트 갱신(refresh_metrics_mart → refresh_competitor_rank, ddl_013) + 캐시 무효화.
+  개요가 바뀌면 상권·업종이 전 월에 걸리므로 전체 갱신
+- 병렬 모드(--workers N): 월별 CSV를 TA_YM별 파일로 나눠 풀 커넥션 N개로 동시 적재.
+  월 단위 트랜잭션이 끝나면 ingest_month_state에 체크포인트(분할 파일 sha256) → 재실행 시 끝난 월은 COPY 없이 생략
+
+실행:
+  python -m app.services.ingest_service --overview overview.csv --usage usage.csv --customers customers.csv
+  python -m app.services.ingest_service --usage usage_2019_2025.csv --customers customers_2019_2025.csv --workers 4
+"""
+from __future__ import annotations
+import argparse
+import csv
+import hashlib
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import psycopg
+from psycopg_pool import ConnectionPool
+
+from app.cache import invalidate
+from app.deps import libpq_dsn
+from app.repo.compare_repo import refresh_competitor_rank
+from app.repo.metrics_repo import refresh_metrics_mart
+
+COPY_BLOCK = 1 << 20  # 1MB
+OVERVIEW_KEY = "*"    # 월이 없는 개요 테이블의 상태 키
+
+# bucket_value 대상 버킷 컬럼(매출·건수·고객수·객단가·취소율)
+BUCKET_COLS = ("rc_m1_saa", "rc_m1_to_ue_ct", "rc_m1_ue_cus_cn", "rc_m1_av_np_at", "apv_ce_rat")
+
+# 적재 순서 = FK 순서(개요 → 월별)
+TABLES = {
+    "overview": {"table": "stg_merchant_overview", "pk": ("encoded_mct",), "monthly": False},
+    "usage": {"table": "stg_merchant_monthly_usage", "pk": ("encoded_mct", "month"), "monthly": True},
+    "customers": {"table": "stg_merchant_monthly_customers", "pk": ("encoded_mct", "month"), "monthly": True},
+}
+
+
+def _table_columns(conn: psycopg.Connection, table: str) -> List[str]:
+    rows = conn.execute(
+        "select column_name from information_schema.columns "
+        "where table_schema = 'public' and table_name = %s order by ordinal_position", (table,)
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def _read_header(f) -> List[str]:
+    # 헤더 1줄만 파싱(본문은 COPY가 CSV 그대로 처리). BOM 제거, 대소문자 무시
+    line = f.readline()
+    return [h.strip().lstrip("\ufeff").lower() for h in next(csv.reader([line]))]
+
+
+def _copy_csv(conn: psycopg.Connection, path: str, tmp: str, table_cols: Sequence[str], encoding: str) -> int:
+    with open(path, encoding=encoding, newline="") as f:
+        header = _read_header(f)
+        unknown = [h for h in header if h not in table_cols]
+        if unknown:
+            raise ValueError(f"{path}: 테이블에 없는 컬럼 {unknown}")
+        cols = ", ".join(header)
+        with conn.cursor() as cur:
+            # 인용 없는 빈값만 NULL(따옴표 "" 는 빈 문자열)
+            with cur.copy(f"copy {tmp} ({cols}) from stdin with (format csv, null '')") as cp:
+                while True:
+                    block = f.read(COPY_BLOCK)
+                    if not block:
+                        break
+                    cp.write(block)
+            return cur.rowcount
+
+
+def _month_checksums(conn: psycopg.Connection, tmp: str, monthly: bool) -> Dict[str, tuple]:
+    # 행 텍스트 md5를 PK 순으로 이어 붙인 md5 → 입력 행 순서와 무관
+    month = "ta_ym" if monthly else f"'{OVERVIEW_KEY}'"
+    order = "encoded_mct, ta_ym" if monthly else "encoded_mct"
+    rows = conn.execute(f"""
+        select {month} as ym, count(*), md5(string_agg(md5(t::text), '' order by {order}))
+        from {tmp} t
+        group by 1
+    """).fetchall()
+    return {ym: (n, chk) for ym, n, chk in rows}
+
+
+def _changed_months(conn: psycopg.Connection, table: str, sums: Dict[str, tuple]) -> List[str]:
+    prev = {ym: (n, chk) for ym, n, chk in conn.execute(
+        "select ta_ym, row_count, checksum from public.ingest_month_state where table_name = %s", (table,)
+    ).fetchall()}
+    return sorted(ym for ym, v in sums.items() if prev.get(ym) != v)
+
+
+def _bucket_raws(conn: psycopg.Connection, tmp: str, months: List[str]) -> List[str]:
+    rows = conn.execute(f"""
+        select distinct b
+        from {tmp} t cross join lateral unnest(array[{", ".join(f"t.{c}" for c in BUCKET_COLS)}]) b
+        where t.ta_ym = any(%s) and b is not null
+    """, (months,)).fetchall()
+    return [r[0] for r in rows]
+
+
+def add_bucket_values(conn: psycopg.Connection, raws: List[str]) -> int:
+    """새 버킷 원문만 bucket_value에 추가. 짧은 별도 트랜잭션(병렬 월 적재끼리 키 잠금 대기 방지)."""
+    if not raws:
+        return 0
+    with conn.transaction():
+        return conn.execute("select public.add_bucket_values(%s)", (raws,)).fetchone()[0]
+
+
+def ensure_partitions(conn: psycopg.Connection, table: str, months: Sequence[str]) -> None:
+    """TA_YM 목록의 월 파티션 생성(이미 있으면 잠금 없이 통과)."""
+    for ym in months:
+        conn.execute("select public.ensure_month_partition(%s, public.ym_to_month(%s))", (table, ym))
+
+
+def _merge(conn: psycopg.Connection, table: str, tmp: str, cols: Sequence[str], pk: Sequence[str],
+           months: Optional[List[str]]) -> int:
+    rest = [c for c in cols if c not in pk]
+    col_list = ", ".join(cols)
+    select_list = ", ".join("public.ym_to_month(ta_ym)" if c == "month" else c for c in cols)
+    where = "where ta_ym = any(%s)" if months is not None else ""
+    deleted = 0
+    if months is not None:
+        # 바뀐 월에서 CSV에 없는 행 삭제(month 조건 → 해당 월 파티션만)
+        deleted = conn.execute(f"""
+            delete from public.{table} t
+            where t.month = any(array(select public.ym_to_month(ym) from unnest(%s::text[]) ym))
+              and t.ta_ym = any(%s)
+              and not exists (select 1 from {tmp} s where s.encoded_mct = t.encoded_mct and s.ta_ym = t.ta_ym)
+        """, (months, months)).rowcount
+    sql = f"""
+        insert into public.{table} as t ({col_list})
+        select {select_list} from {tmp} {where}
+        on conflict ({", ".join(pk)}) do update
+           set {", ".join(f"{c} = excluded.{c}" for c in rest)}
+         where ({", ".join(f"t.{c}" for c in rest)}) is distinct from ({", ".join(f"excluded.{c}" for c in rest)})
+    """
+    cur = conn.execute(sql, (months,) if months is not None else None)
+    return deleted + cur.rowcount
+
+
+def _save_state(conn: psycopg.Connection, table: str, sums: Dict[str, tuple], months: List[str],
+                source_checksum: Optional[str] = None) -> None:
+    if not months:
+        return
+    with conn.cursor() as cur:
+        cur.executemany("""
+            insert into public.ingest_month_state(table_name, ta_ym, row_count, checksum, source_checksum)
+            values (%s, %s, %s, %s, %s)
+            on conflict (table_name, ta_ym) do update
+               set row_count = excluded.row_count, checksum = excluded.checksum,
+                   source_checksum = excluded.source_checksum, loaded_at = now()
+        """, [(table, ym, sums[ym][0], sums[ym][1], source_checksum) for ym in months])
+
+
+def ingest_file(conn: psycopg.Connection, kind: str, path: str, encoding: str = "utf-8",
+                force: bool = False, source_checksum: Optional[str] = None) -> Dict[str, Any]:
+    """
+    CSV 1개 적재. 반환: rows(입력 행), months(병합한 월), changed(실제 변경·삭제 행), skipped(생략 월 수).
+    COPY(임시 테이블) → 월 파티션 생성(짧은 트랜잭션) → 병합·상태 갱신(1트랜잭션).
+    파티션 생성이 긴 병합 트랜잭션 안에서 부모 테이블 잠금을 잡고 있지 않도록 분리.
+    """
+    spec = TABLES[kind]
+    table, pk, monthly = spec["table"], spec["pk"], spec["monthly"]
+    tmp = f"_ingest_{kind}"
+    t0 = time.perf_counter()
+    try:
+        with conn.transaction():
+            cols = _table_columns(conn, table)
+            conn.execute(f"drop table if exists {tmp}")
+            conn.execute(f"create temp table {tmp} (like public.{table})")
+            if monthly:
+                conn.execute(f"alter table {tmp} alter column month drop not null")  # CSV에 없음 → 병합 시 채움
+            rows = _copy_csv(conn, path, tmp, cols, encoding)
+            sums = _month_checksums(conn, tmp, monthly)
+        if monthly and sums:
+            with conn.transaction():
+                ensure_partitions(conn, table, sorted(sums))
+        with conn.transaction():
+            months = sorted(sums) if force else _changed_months(conn, table, sums)
+            changed = 0
+            raws: List[str] = []
+            if months:
+                if kind == "usage":
+                    raws = _bucket_raws(conn, tmp, months)
+                changed = _merge(conn, table, tmp, cols, pk, months if monthly else None)
+            if source_checksum is not None:
+                months_state = sorted(sums)  # 내용이 같아도 분할 파일 체크포인트는 기록
+            else:
+                months_state = months
+            _save_state(conn, table, sums, months_state, source_checksum)
+    finally:
+        if not conn.closed:
+            with conn.transaction():
+                conn.execute(f"drop table if exists {tmp}")
+    add_bucket_values(conn, raws)
+    return {"table": table, "rows": rows, "months": months, "changed": changed,
+            "skipped": len(sums) - len(months), "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+
+def _split_by_month(path: str, encoding: str, out_dir: str) -> Dict[str, Tuple[str, str]]:
+    """월별 CSV 1회 스캔 → TA_YM별 파일(헤더 포함, utf-8). 반환: {ta_ym: (경로, sha256)}.
+    행은 원문 텍스트 그대로 기록(따옴표 "" = 빈 문자열, 인용 없는 빈값 = NULL 구분 유지)."""
+    files: Dict[str, Any] = {}
+    hashes: Dict[str, Any] = {}
+    raw: List[str] = []  # 현재 레코드의 원문 줄(인용된 개행이면 여러 줄)
+
+    def lines(f):
+        for ln in f:
+            raw.append(ln)
+            yield ln
+
+    with open(path, encoding=encoding, newline="") as f:
+        reader = csv.reader(lines(f))
+        header = [h.strip().lstrip("\ufeff").lower() for h in next(reader)]
+        raw.clear()
+        i = header.index("ta_ym")
+        line = ",".join(header) + "\n"
+        try:
+            for row in reader:
+                text_row = "".join(raw).rstrip("\r\n") + "\n"  # 줄 끝만 \n으로 통일(COPY는 파일 내 줄바꿈 혼용 불가)
+                raw.clear()
+                if not row:
+                    continue
+                ym = row[i]
+                out = files.get(ym)
+                if out is None:
+                    out = files[ym] = open(os.path.join(out_dir, f"{ym}.csv"), "w", encoding="utf-8", newline="")
+                    out.write(line)
+                    hashes[ym] = hashlib.sha256()
+                out.write(text_row)
+                hashes[ym].update(text_row.encode("utf-8"))
+        finally:
+            for out in files.values():
+                out.close()
+    return {ym: (files[ym].name, hashes[ym].hexdigest()) for ym in files}
+
+
+def _checkpoints(pool: ConnectionPool, table: str) -> Dict[str, Optional[str]]:
+    with pool.connection() as conn:
+        rows = conn.execute(
+            "select ta_ym, source_checksum from public.ingest_month_state where table_name = %s", (table,)
+        ).fetchall()
+    return dict(rows)
+
+
+def _ingest_month(pool: ConnectionPool, kind: str, ym: str, path: str, sha: str, force: bool) -> Dict[str, Any]:
+    with pool.connection() as conn:
+        r = ingest_file(conn, kind, path, "utf-8", force, source_checksum=sha)
+    r["ta_ym"] = ym
+    return r
+
+
+def run_parallel_ingest(paths: Dict[str, str], workers: int = 4, encoding: str = "utf-8", force: bool = False,
+                        refresh: bool = True) -> List[Dict[str, Any]]:
+    """
+    개요는 단일 연결로 먼저(FK), 월별 2개 테이블은 (테이블, 월) 단위로 동시 적재.
+    월마다 1트랜잭션 + 체크포인트 → 중간 실패 후 재실행하면 남은 월만 적재.
+    """
+    results: List[Dict[str, Any]] = []
+    if paths.get("overview"):
+        with psycopg.connect(libpq_dsn(), prepare_threshold=None) as conn:
+            results.append(ingest_file(conn, "overview", paths["overview"], encoding, force))
+
+    failed: List[str] = []
+    with tempfile.TemporaryDirectory(prefix="ingest_") as tmp_dir, \
+            ConnectionPool(libpq_dsn(), min_size=1, max_size=max(1, workers),
+                           kwargs={"prepare_threshold": None}) as pool:
+        tasks = []
+        for kind in ("usage", "customers"):
+            if not paths.get(kind):
+                continue
+            table = TABLES[kind]["table"]
+            out_dir = os.path.join(tmp_dir, kind)
+            os.makedirs(out_dir)
+            parts = _split_by_month(paths[kind], encoding, out_dir)
+            done = {} if force else _checkpoints(pool, table)
+            # 파티션은 워커 시작 전에 한 번에(월 트랜잭션끼리 부모 테이블 DDL 잠금 경합 방지)
+            with pool.connection() as conn:
+                ensure_partitions(conn, table, sorted(parts))
+            for ym in sorted(parts):
+                path, sha = parts[ym]
+                if done.get(ym) == sha:
+                    results.append({"table": table, "ta_ym": ym, "rows": 0, "months": [], "changed": 0,
+                                    "skipped": 1, "checkpoint": True})
+                    continue
+                tasks.append((kind, ym, path, sha))
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+            futs = {ex.submit(_ingest_month, pool, *t, force): t for t in tasks}
+            for fut in as_completed(futs):
+                kind, ym = futs[fut][:2]
+                try:
+                    r = fut.result()
+                except Exception as e:
+                    failed.append(f"{TABLES[kind]['table']}:{ym} ({e})")
+                    continue
+                results.append(r)
+                print(f"[ingest] {r['table']} {ym}: rows={r['rows']} changed={r['changed']} ({r['elapsed_ms']}ms)")
+
+    if refresh and any(r["changed"] for r in results):
+        refresh_derived(_refresh_scope(results))
+    if failed:
+        raise RuntimeError("적재 실패 월(재실행 시 이어서 진행): " + ", ".join(sorted(failed)))
+    return results
+
+
+def _refresh_scope(results: List[Dict[str, Any]]) -> Optional[List[str]]:
+    """마트를 다시 계산할 월(YYYYMM). 개요가 바뀌었으면 None(전체)."""
+    months = set()
+    for r in results:
+        if not r["changed"]:
+            continue
+        if r["table"] == TABLES["overview"]["table"]:
+            return None
+        months.update(r["months"])
+    return sorted(months)
+
+
+def refresh_derived(months: Optional[List[str]] = None) -> None:
+    """월별 지표 마트 → 경쟁점 순위 → repo 캐시 순서로 갱신. months=None이면 전체."""
+    refresh_metrics_mart(months)
+    refresh_competitor_rank(months)
+    invalidate()
+
+
+def run_ingest(paths: Dict[str, str], encoding: str = "utf-8", force: bool = False,
+               refresh: bool = True) -> List[Dict[str, Any]]:
+    """paths: {"overview"|"usage"|"customers": csv 경로}. 개요를 먼저 적재(FK)."""
+    results = []
+    with psycopg.connect(libpq_dsn(), prepare_threshold=None) as conn:
+        for kind in TABLES:
+            if paths.get(kind):
+                results.append(ingest_file(conn, kind, paths[kind], encoding, force))
+    if refresh and any(r["changed"] for r in results):
+        refresh_derived(_refresh_scope(results))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="stg_* CSV 증분 적재(COPY → 바뀐 월만 병합 → 마트 갱신)")
+    ap.add_argument("--overview", help="가맹점 개요 CSV(stg_merchant_overview)")
+    ap.add_argument("--usage", help="월별 이용 CSV(stg_merchant_monthly_usage)")
+    ap.add_argument("--customers", help="월별 고객 CSV(stg_merchant_monthly_customers)")
+    ap.add_argument("--encoding", default="utf-8", help="CSV 인코딩(예: cp949)")
+    ap.add_argument("--force", action="store_true", help="체크섬이 같아도 모든 월 병합")
+    ap.add_argument("--no-refresh", action="store_true", help="마트 갱신 생략")
+    ap.add_argument("--workers", type=int, default=1, help="2 이상이면 월별 분할·병렬 적재(체크포인트)")
+    a = ap.parse_args(argv)
+    paths = {"overview": a.overview, "usage": a.usage, "customers": a.customers}
+    if not any(paths.values()):
+        ap.error("CSV 경로를 1개 이상 지정하세요")
+    if a.workers > 1:
+        rs = run_parallel_ingest(paths, a.workers, a.encoding, a.force, refresh=not a.no_refresh)
+        merged = [r for r in rs if r.get("ta_ym") and not r.get("checkpoint")]
+        print(f"[ingest] months loaded={len(merged)} checkpoint_skipped={sum(1 for r in rs if r.get('checkpoint'))} "
+              f"changed={sum(r['changed'] for r in rs)}")
+        return
+    for r in run_ingest(paths, a.encoding, a.force, refresh=not a.no_refresh):
+        print(f"[ingest] {r['table']}: rows={r['rows']} merged_months={len(r['months'])} "
+              f"skipped_months={r['skipped']} changed={r['changed']} ({r['elapsed_ms']}ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+가맹점 데이터 번들.
+- 화면 1회(요청)에 필요한 가장 넓은 기간의 시계열·스냅샷·경쟁점을 한 번만 조회(3개 병렬)
+- KPI 카드·보고서·차트·LLM 페이로드는 번들에서 기간만 잘라 사용 → 같은 가맹점 중복 조회 제거
+- (mct, 최신 적재월) 단위 메모. 요청 기간이 더 넓으면 합집합 기간으로 1회 재조회
+"""
+from __future__ import annotations
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from app.cache import data_month, get_cache
+from app.repo.async_repo import gather_report_data, run_sync
+
+_bundle_cache = get_cache("merchant_bundle", maxsize=64)
+
+
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 1)
+
+
+def _as_date(x) -> date:
+    return x if isinstance(x, date) else date.fromisoformat(str(x)[:10])
+
+
+# 고객 구성 컬럼(시계열 SQL이 숫자 컬럼으로 반환). 키 = 화면/LLM에서 쓰는 짧은 이름
+AGE_COLS = {
+    "m_1020": "mal_1020", "m_30": "mal_30", "m_40": "mal_40", "m_50": "mal_50", "m_60": "mal_60",
+    "f_1020": "fme_1020", "f_30": "fme_30", "f_40": "fme_40", "f_50": "fme_50", "f_60": "fme_60",
+}
+VISIT_COLS = {"new": "new_ratio", "revisit": "revisit_ratio"}
+AFFINITY_COLS = {"resident": "resident_ratio", "worker": "worker_ratio", "floating": "floating_ratio"}
+
+NUMERIC_COLS = ["sales", "visits", "delivery_ratio", "peer_ind_sales_idx", "peer_ind_cnt_idx",
+                "ind_rank_pct", "area_rank_pct",
+                *AGE_COLS.values(), *VISIT_COLS.values(), *AFFINITY_COLS.values()]
+
+
+def age_mix(rec: Dict[str, Any]) -> Dict[str, Any]:
+    """행(dict) → {"m_1020": 비율, ...}. 컬럼이 없으면 빈 dict."""
+    return {k: rec[c] for k, c in AGE_COLS.items() if c in rec}
+
+
+def _total(vals: List[Any]) -> Any:
+    # SQL 합과 같게: 하나라도 NULL이면 NULL
+    return None if any(v is None for v in vals) else sum(vals)
+
+
+def demographics(rec: Dict[str, Any]) -> Dict[str, Any]:
+    """LLM 페이로드용 중첩 구조(male/female/age/visit/affinity)."""
+    ages = {k: rec.get(c) for k, c in AGE_COLS.items()}
+    return {
+        "male": _total([v for k, v in ages.items() if k.startswith("m_")]),
+        "female": _total([v for k, v in ages.items() if k.startswith("f_")]),
+        "age": ages,
+        "visit": {k: rec.get(c) for k, c in VISIT_COLS.items()},
+        "affinity": {k: rec.get(c) for k, c in AFFINITY_COLS.items()},
+    }
+
+
+def clean_timeseries(df: pd.DataFrame) -> pd.DataFrame:
+    """시계열 rows → 차트/요약용 DataFrame(숫자형 변환)."""
+    if df.empty: return df
+    df = df.replace(-999999.9, pd.NA)
+
+    num_cols = [c for c in NUMERIC_COLS if c in df.columns]
+    for c in num_cols:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+
+    if "delivery_ratio" in df.columns:
+        df["delivery_ratio"] = df["delivery_ratio"].clip(lower=0)
+
+    if "month" in df.columns:
+        df["month"] = pd.to_datetime(df["month"], errors="coerce")
+        bad = df["month"].isna()
+        if bad.any():
+            df.loc[bad, "month"] = pd.to_datetime(df.loc[bad, "month"].astype(str), format="%Y%m", errors="coerce")
+    return df
+
+
+class MerchantBundle:
+    """가맹점 1곳의 원자료(읽기 전용). 기간 슬라이스는 메모리에서."""
+
+    def __init__(self, mct: str, m0: str, m1: str, timeseries: List[Dict[str, Any]],
+                 snapshot: Optional[Dict[str, Any]], competitors: List[Dict[str, Any]],
+                 data_month: Optional[str] = None, timings: Optional[Dict[str, float]] = None):
+        self.mct = mct
+        self.m0, self.m1 = m0, m1
+        self.timeseries = timeseries
+        self.snapshot = snapshot
+        self.competitors = competitors
+        self.data_month = data_month
+        self.timings = timings or {}
+        self._frame: Optional[pd.DataFrame] = None
+
+    def covers(self, m0: str, m1: str) -> bool:
+        return self.m0 <= m0 and m1 <= self.m1
+
+    def timeseries_between(self, m0: str, m1: str) -> List[Dict[str, Any]]:
+        d0, d1 = _as_date(m0), _as_date(m1)
+        return [dict(r) for r in self.timeseries if d0 <= _as_date(r["month"]) <= d1]
+
+    def frame(self, m0: Optional[str] = None, m1: Optional[str] = None) -> pd.DataFrame:
+        """정제 DataFrame(전체 1회 정제 후 기간 슬라이스)."""
+        if self._frame is None:
+            self._frame = clean_timeseries(pd.DataFrame(self.timeseries))
+        df = self._frame
+        if not df.empty and "month" in df.columns and (m0 or m1):
+            mask = pd.Series(True, index=df.index)
+            if m0: mask &= df["month"] >= pd.Timestamp(m0)
+            if m1: mask &= df["month"] <= pd.Timestamp(m1)
+            df = df[mask]
+        return df.reset_index(drop=True)
+
+
+def default_end() -> str:
+    return date.today().replace(day=1).isoformat()
+
+
+def load_bundle(mct: str, m0: str, m1: Optional[str] = None) -> MerchantBundle:
+    m1 = m1 or default_end()
+    dm = data_month()
+    key = (mct, dm)
+    b = _bundle_cache.get(key, None)
+    if b is not None and b.covers(m0, m1):
+        return b
+    if b is not None:
+        m0, m1 = min(m0, b.m0), max(m1, b.m1)
+
+    timings: Dict[str, float] = {}
+    t0 = time.perf_counter()
+    ts, snap, comp = run_sync(gather_report_data(mct, m0, m1, timings))
+    timings["fetch"] = _ms(t0)
+    b = MerchantBundle(mct, m0, m1, ts, snap, comp, data_month=dm, timings=timings)
+    _bundle_cache.set(key, b)
+    return b
@@ -0,0 +1,121 @@
+"""
+전 가맹점 마케팅 보고서 배치 생성.
+- 대상: stg_merchant_overview (상권/업종 필터)
+- 청크 단위 set-based 조회(시계열·스냅샷·경쟁점 각 1쿼리) → MerchantBundle → 보고서 컨텍스트
+- 워커 풀에서 LLM 호출(동시성·RPM/TPM은 llm_limiter가 프로세스 전역으로 제한)
+- 청크마다 reports upsert → 중단 후 재실행하면 완료분(done/no_data)은 건너뛰고 이어서 진행
+  청크 저장이 실패하면 행 단위로 다시 저장, 그래도 실패한 행은 payload 없이 failed로 기록(보고서 본문은 보존)
+
+실행:
+  python -m app.services.report_batch_service --bizarea 성수 --industry 카페 --workers 4
+"""
+from __future__ import annotations
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from app.cache import data_month
+from app.chat_core import REPORT_PROMPT_VERSION, ChatCore, build_chat_core_from_env
+from app.repo.compare_repo import fetch_top_competitors_batch
+from app.repo.metrics_repo import fetch_snapshot_batch, fetch_timeseries_batch
+from app.repo.report_repo import fetch_done_mcts, select_merchants, upsert_reports
+from app.services.merchant_bundle import MerchantBundle
+from app.services.report_context_service import (
+    REPORT_M0, REPORT_M1, build_report_context, llm_context, report_payload,
+)
+
+BATCH_CHUNK = 200
+BATCH_WORKERS = 4
+
+
+def _load_bundles(mcts: List[str], m0: str, m1: str, dm: Optional[str]) -> Dict[str, MerchantBundle]:
+    ts = fetch_timeseries_batch(mcts, m0, m1)
+    snaps = fetch_snapshot_batch(mcts)
+    comps = fetch_top_competitors_batch(mcts)
+    return {m: MerchantBundle(m, m0, m1, ts[m], snaps[m], comps[m], data_month=dm) for m in mcts}
+
+
+def _generate_one(core: ChatCore, bundle: MerchantBundle, m0: str, m1: str) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    row = {"encoded_mct": bundle.mct, "report": None, "error": None, "payload": None}
+    try:
+        if not bundle.timeseries:
+            row.update(status="no_data")
+        else:
+            built = build_report_context(bundle.mct, m0, m1, bundle=bundle)
+            ctx = built["context"]
+            text = core.generate_marketing_report(llm_context(ctx))
+            if text.startswith("(LLM"):  # call_llm 오류/차단/일시 중단 문구
+                row.update(status="failed", error=text)
+            else:
+                # 화면(render_report)이 그대로 쓰는 스냅샷도 함께 저장
+                row.update(status="done", report=text, payload=report_payload(ctx, built["df"]))
+    except Exception as e:
+        row.update(status="failed", error=str(e))
+    row["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return row
+
+
+def _save(rows: List[Dict[str, Any]], key: Dict[str, Any]) -> None:
+    """청크 upsert. 실패 시 행 단위 재시도 → 그래도 실패하면 payload 없이 failed로 기록(rows 상태도 갱신)."""
+    try:
+        upsert_reports([{**r, **key} for r in rows])
+        return
+    except Exception:
+        pass
+    for r in rows:
+        try:
+            upsert_reports([{**r, **key}])
+            continue
+        except Exception as e:
+            r.update(status="failed", payload=None, error=f"저장 실패: {str(e).splitlines()[0] if str(e) else e!r}")
+        try:
+            upsert_reports([{**r, **key}])
+        except Exception as e:
+            print(f"[reports] {r['encoded_mct']} 저장 실패: {e}")
+
+
+def run_batch(bizarea: Optional[str] = None, industry: Optional[str] = None, limit: Optional[int] = None,
+              workers: int = BATCH_WORKERS, chunk: int = BATCH_CHUNK,
+              m0: str = REPORT_M0, m1: str = REPORT_M1, core: Optional[ChatCore] = None) -> Dict[str, int]:
+    core = core or build_chat_core_from_env()
+    dm = data_month()
+    if dm is None:
+        raise RuntimeError("적재된 월이 없음(mart_merchant_monthly_metrics 비어 있음): CSV 적재 후 실행")
+    key = {"data_month": dm, "prompt_version": REPORT_PROMPT_VERSION, "model": core.model}
+
+    mcts = select_merchants(bizarea, industry, limit)
+    done = fetch_done_mcts(dm, REPORT_PROMPT_VERSION, core.model)
+    todo = [m for m in mcts if m not in done]
+    stats = {"selected": len(mcts), "skipped": len(mcts) - len(todo), "done": 0, "failed": 0, "no_data": 0}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        for i in range(0, len(todo), chunk):
+            part = todo[i:i + chunk]
+            bundles = _load_bundles(part, m0, m1, dm)
+            rows = list(ex.map(lambda m: _generate_one(core, bundles[m], m0, m1), part))
+            _save(rows, key)
+            for r in rows:
+                stats[r["status"]] += 1
+            print(f"[reports] {min(i + chunk, len(todo))}/{len(todo)} "
+                  f"done={stats['done']} failed={stats['failed']} no_data={stats['no_data']}")
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="가맹점 마케팅 보고서 배치 생성(reports 테이블, 재실행 시 이어서)")
+    ap.add_argument("--bizarea", help="상권(HPSN_MCT_BZN_CD_NM)")
+    ap.add_argument("--industry", help="업종(HPSN_MCT_ZCD_NM)")
+    ap.add_argument("--limit", type=int)
+    ap.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    ap.add_argument("--chunk", type=int, default=BATCH_CHUNK)
+    ap.add_argument("--m0", default=REPORT_M0)
+    ap.add_argument("--m1", default=REPORT_M1)
+    a = ap.parse_args(argv)
+    stats = run_batch(a.bizarea, a.industry, a.limit, a.workers, a.chunk, a.m0, a.m1)
+    print(f"[reports] {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+보고서 컨텍스트 조립 서비스.
+- 원자료는 MerchantBundle에서 기간만 잘라 사용(3개 조회는 번들 로드 시 병렬 1회)
+- pandas 요약 1회 후 (mct, 기간, 최신 적재월) 단위로 메모
+- 단계별 소요시간(ms) 반환 → 느린 구간 확인용
+- 고객 구성은 숫자 컬럼으로 유지. 중첩 demographics는 LLM 호출 직전 llm_context()에서만 생성
+"""
+from __future__ import annotations
+import copy
+import decimal
+import json
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.cache import get_cache
+from app.services.merchant_bundle import (
+    AFFINITY_COLS, AGE_COLS, VISIT_COLS, MerchantBundle, age_mix, demographics, load_bundle,
+)
+
+REPORT_M0 = "2024-01-01"
+REPORT_M1 = "2025-10-01"
+
+_ctx_cache = get_cache("report_context", maxsize=128)
+
+# reports.payload 형식 버전. report_payload 구조/컬럼을 바꾸면 올릴 것(이전 버전은 저장분 재작성)
+PAYLOAD_VERSION = 2
+
+
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 1)
+
+
+def _mean(df: pd.DataFrame, col: str) -> Optional[float]:
+    """유한값 평균. 컬럼이 없거나 전부 NULL/inf면 None(NaN은 jsonb에 저장 불가)."""
+    if df.empty or col not in df.columns:
+        return None
+    vals = pd.to_numeric(df[col], errors="coerce").replace([np.inf, -np.inf], np.nan).dropna()
+    return float(vals.mean()) if not vals.empty else None
+
+
+def build_report_context(mct: str, m0: str = REPORT_M0, m1: str = REPORT_M1,
+                         bundle: Optional[MerchantBundle] = None) -> Dict[str, Any]:
+    """
+    반환: {"context": LLM/화면용 dict, "df": 정제 DataFrame, "timings": 단계별 ms, "cached": bool}
+    bundle: 같은 화면에서 이미 로드한 번들(없으면 로드/메모 재사용)
+    """
+    t_total = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    t0 = time.perf_counter()
+    if bundle is None or not bundle.covers(m0, m1):
+        bundle = load_bundle(mct, m0, m1)
+    timings["bundle"] = _ms(t0)
+    timings.update({f"bundle.{k}": v for k, v in bundle.timings.items()})
+
+    key = (mct, m0, m1, bundle.data_month)
+    hit = _ctx_cache.get(key, None)
+    if hit is not None:
+        ctx, df = hit
+        timings["total"] = _ms(t_total)
+        return {"context": copy.deepcopy(ctx), "df": df.copy(), "timings": timings, "cached": True}
+
+    t0 = time.perf_counter()
+    ts = bundle.timeseries_between(m0, m1)
+    df = bundle.frame(m0, m1)
+    timings["frame"] = _ms(t0)
+
+    t0 = time.perf_counter()
+    ctx = {
+        "merchant": bundle.snapshot,
+        "summary": {
+            "avg_sales_idx": _mean(df, "peer_ind_sales_idx"),
+            "avg_rank_area": _mean(df, "area_rank_pct"),
+            "avg_delivery": _mean(df, "delivery_ratio"),
+        },
+        "customers": age_mix(df.iloc[-1].to_dict()) if not df.empty else {},
+        "competitors": bundle.competitors,
+        "timeseries": ts,
+    }
+    timings["assemble"] = _ms(t0)
+
+    _ctx_cache.set(key, (ctx, df))
+    timings["total"] = _ms(t_total)
+    return {"context": copy.deepcopy(ctx), "df": df.copy(), "timings": timings, "cached": False}
+
+
+_DEMO_FLAT = {*AGE_COLS.values(), *VISIT_COLS.values(), *AFFINITY_COLS.values()}
+
+
+def llm_context(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """generate_marketing_report 입력: 시계열 행의 고객 구성 컬럼 → demographics 중첩 1개."""
+    out = dict(ctx)
+    out["timeseries"] = [
+        {**{k: v for k, v in r.items() if k not in _DEMO_FLAT}, "demographics": demographics(r)}
+        for r in ctx.get("timeseries") or []
+    ]
+    return out
+
+
+# ----------------------------
+# 저장 보고서(reports.payload) 직렬화
+# ----------------------------
+def _json_default(o):
+    if isinstance(o, pd.Timestamp):     return o.date().isoformat()
+    if isinstance(o, (datetime, date)): return o.isoformat()
+    if isinstance(o, np.integer):       return int(o)
+    if isinstance(o, (np.floating, decimal.Decimal)):
+        f = float(o)
+        return f if np.isfinite(f) else None
+    if isinstance(o, np.bool_):         return bool(o)
+    return str(o)
+
+
+def report_payload(ctx: Dict[str, Any], df: pd.DataFrame) -> str:
+    """
+    화면 렌더에 필요한 것만(헤더·경쟁점·요약·정제 행) JSON 문자열로. 원자료 timeseries는 제외.
+    행은 columns/data 배열(jsonb는 객체 키 순서를 보존하지 않음).
+    NaN/inf는 null로(allow_nan=False: 남아 있으면 저장 전에 ValueError).
+    """
+    clean = df.replace([np.inf, -np.inf], np.nan)
+    frame = clean.astype(object).where(clean.notna(), None)
+    return json.dumps({
+        "version": PAYLOAD_VERSION,
+        "merchant": ctx.get("merchant"),
+        "summary": ctx.get("summary"),
+        "competitors": ctx.get("competitors") or [],
+        "columns": list(frame.columns),
+        "data": frame.values.tolist(),
+    }, ensure_ascii=False, allow_nan=False, default=_json_default)
+
+
+def _as_payload(payload: Any) -> Dict[str, Any]:
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    return payload or {}
+
+
+def payload_is_current(payload: Any) -> bool:
+    """저장 payload가 현재 형식(PAYLOAD_VERSION)인지. 아니면 호출측에서 다시 만들어 저장."""
+    return _as_payload(payload).get("version") == PAYLOAD_VERSION
+
+
+def frame_from_payload(payload: Any) -> Tuple[Dict[str, Any], pd.DataFrame]:
+    """report_payload 역변환 → (ctx 일부, 정제 DataFrame)."""
+    payload = _as_payload(payload)
+    df = pd.DataFrame(payload.get("data") or [], columns=payload.get("columns") or None)
+    if "month" in df.columns:
+        df["month"] = pd.to_datetime(df["month"], errors="coerce")
+    ctx = {k: payload.get(k) for k in ("merchant", "summary", "competitors")}
+    return ctx, df
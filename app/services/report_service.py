@@ -1,17 +1,7 @@
 import pandas as pd
 import plotly.express as px
-import json
-from app.repo.metrics_repo import fetch_timeseries, fetch_snapshot
-from app.repo.compare_repo import fetch_top_competitors
-
-def _clean(df: pd.DataFrame) -> pd.DataFrame:
-    # -999999.9 → None
-    df = df.replace(-999999.9, pd.NA)
-    # demographics JSON → columns
-    demo = pd.json_normalize(df["demographics"])
-    demo.columns = [f"demo_{c}" for c in demo.columns]
-    df = pd.concat([df.drop(columns=["demographics"]), demo], axis=1)
-    return df
+from app.services.merchant_bundle import age_mix
+from app.services.report_context_service import build_report_context
 
 def make_visuals(df: pd.DataFrame):
     figs = {}
@@ -26,7 +16,7 @@ def make_visuals(df: pd.DataFrame):
         title="상권 내 매출 순위 (낮을수록 상위)", range_y=[0,100])
     # 4) 고객 성별·연령 구성
     last = df.iloc[-1]
-    ages = {k.replace("demo_age.",""):v for k,v in last.items() if "demo_age" in k}
+    ages = age_mix(last)
     # 연령 그룹 합산
     age_groups = {
         "남성 20대 이하": ages.get("m_1020",0),
@@ -45,20 +35,5 @@ def make_visuals(df: pd.DataFrame):
     return figs
 
 def build_llm_context(mct: str):
-    ts = fetch_timeseries(mct, "2024-01-01", "2025-10-01")
-    snap = fetch_snapshot(mct)
-    df = _clean(pd.DataFrame(ts))
-    competitors = fetch_top_competitors(mct)
-
-    context = {
-        "merchant": snap,
-        "summary": {
-            "avg_sales_idx": float(df["peer_ind_sales_idx"].mean(skipna=True)),
-            "avg_rank_area": float(df["area_rank_pct"].mean(skipna=True)),
-            "avg_delivery": float(df["delivery_ratio"].mean(skipna=True)),
-        },
-        "customers": df.filter(regex="demo_age").iloc[-1].to_dict(),
-        "competitors": competitors,
-        "timeseries": ts,
-    }
-    return context, df
+    built = build_report_context(mct)
+    return built["context"], built["df"]
@@ -0,0 +1,65 @@
+-- 월별 지표 마트: 버킷 파싱·월 변환·센티널(-999999.9) NULL 처리를 적재 시 1회만 수행
+-- (delivery_ratio는 기존 조회와 같이 음수·센티널을 0으로 보정)
+-- 앱 조회(metrics_repo)는 이 마트만 읽는다. CSV 적재 후 refresh 필요:
+--   refresh materialized view concurrently public.mv_merchant_monthly_metrics;
+
+-- 버킷 문자열 → 대표값(중앙값)
+-- '2_10-25%' → 0.175, '3_25-50' → 37.5, '6_90%초과(...)' → 0.9, '1_10%이하' → 0.1
+create or replace function public.bucket_midpoint(raw text)
+returns numeric
+language sql
+immutable strict parallel safe
+as $$
+  select case
+           when m.rng is not null and m.rng[3] = '%' then (m.rng[1]::numeric + m.rng[2]::numeric) / 2 / 100.0
+           when m.rng is not null then (m.rng[1]::numeric + m.rng[2]::numeric) / 2
+           when x.t ~ '^[0-9]+$' then x.t::numeric
+           when m.gt is not null then m.gt[1]::numeric / 100.0   -- 'N%초과' → N(기존 조회값 유지)
+           when m.le is not null then m.le[1]::numeric / 100.0   -- 'N%이하' → N(기존 조회값 유지)
+           else null
+         end
+  from (select regexp_replace(raw, '.*_', '') as t) x
+  cross join lateral (
+    select
+      regexp_match(x.t, '^([0-9]+)[^0-9]+([0-9]+)(%?)$') as rng,
+      regexp_match(x.t, '^([0-9]+)%\s*초과')             as gt,
+      regexp_match(x.t, '^([0-9]+)%\s*이하')             as le
+  ) m
+$$;
+
+create materialized view if not exists public.mv_merchant_monthly_metrics as
+select
+  u.encoded_mct,
+  u.ta_ym,
+  to_date(u.ta_ym, 'YYYYMM')::date                    as month,
+  regexp_replace(u.rc_m1_saa, '.*_', '')              as sales_bucket,
+  regexp_replace(u.rc_m1_to_ue_ct, '.*_', '')         as visits_bucket,
+  public.bucket_midpoint(u.rc_m1_saa)                 as sales,      -- 0~1(%) 혹은 절대값 버킷 대표값
+  public.bucket_midpoint(u.rc_m1_to_ue_ct)            as visits,
+  greatest(u.dlv_saa_rat, 0)                          as delivery_ratio,   -- 음수·센티널 → 0
+  nullif(u.m1_sme_ry_saa_rat, -999999.9)              as peer_ind_sales_idx,   -- 동종업종 매출지수(=100 평균)
+  nullif(u.m1_sme_ry_cnt_rat, -999999.9)              as peer_ind_cnt_idx,     -- 동종업종 건수지수
+  nullif(u.m12_sme_ry_saa_pce_rt, -999999.9)          as ind_rank_pct,         -- 업종 내 백분위(낮을수록 상위)
+  nullif(u.m12_sme_bzn_saa_pce_rt, -999999.9)         as area_rank_pct,        -- 상권 내 백분위
+  nullif(c.m12_mal_1020_rat, -999999.9)               as mal_1020,
+  nullif(c.m12_mal_30_rat, -999999.9)                 as mal_30,
+  nullif(c.m12_mal_40_rat, -999999.9)                 as mal_40,
+  nullif(c.m12_mal_50_rat, -999999.9)                 as mal_50,
+  nullif(c.m12_mal_60_rat, -999999.9)                 as mal_60,
+  nullif(c.m12_fme_1020_rat, -999999.9)               as fme_1020,
+  nullif(c.m12_fme_30_rat, -999999.9)                 as fme_30,
+  nullif(c.m12_fme_40_rat, -999999.9)                 as fme_40,
+  nullif(c.m12_fme_50_rat, -999999.9)                 as fme_50,
+  nullif(c.m12_fme_60_rat, -999999.9)                 as fme_60,
+  nullif(c.mct_ue_cln_reu_rat, -999999.9)             as revisit_ratio,
+  nullif(c.mct_ue_cln_new_rat, -999999.9)             as new_ratio,
+  nullif(c.rc_m1_shc_rsd_ue_cln_rat, -999999.9)       as resident_ratio,
+  nullif(c.rc_m1_shc_wp_ue_cln_rat, -999999.9)        as worker_ratio,
+  nullif(c.rc_m1_shc_flp_ue_cln_rat, -999999.9)       as floating_ratio
+from public.stg_merchant_monthly_usage u
+left join public.stg_merchant_monthly_customers c
+  on c.encoded_mct = u.encoded_mct and c.ta_ym = u.ta_ym;
+
+-- concurrently refresh 용 유니크 인덱스 + 최신월 조회
+create unique index if not exists ux_mv_metrics_mct_month on public.mv_merchant_monthly_metrics(encoded_mct, month);
+create index if not exists idx_mv_metrics_month on public.mv_merchant_monthly_metrics(month);
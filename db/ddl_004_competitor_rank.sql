@@ -0,0 +1,27 @@
+-- 경쟁점 순위 마트: 월·(상권, 업종)별 업종대비 매출지수 상위 N(=10)
+-- mv_merchant_monthly_metrics 갱신 뒤 refresh:
+--   refresh materialized view concurrently public.mv_competitor_rank;
+create materialized view if not exists public.mv_competitor_rank as
+select *
+from (
+  select
+    m.month,
+    o.hpsn_mct_bzn_cd_nm as bizarea,
+    o.hpsn_mct_zcd_nm    as industry,
+    row_number() over (
+      partition by m.month, o.hpsn_mct_bzn_cd_nm, o.hpsn_mct_zcd_nm
+      order by m.peer_ind_sales_idx desc, m.encoded_mct
+    )                    as rank,
+    m.encoded_mct,
+    o.mct_nm,
+    m.peer_ind_sales_idx as ind_sales_idx,
+    m.ind_rank_pct,
+    m.area_rank_pct
+  from public.mv_merchant_monthly_metrics m
+  join public.stg_merchant_overview o on o.encoded_mct = m.encoded_mct
+  where m.peer_ind_sales_idx > 100
+) r
+where r.rank <= 10;
+
+create unique index if not exists ux_mv_comp_rank_month_mct on public.mv_competitor_rank(month, encoded_mct);
+create index if not exists idx_mv_comp_rank_lookup on public.mv_competitor_rank(month, bizarea, industry, rank);
@@ -0,0 +1,14 @@
+-- LLM 응답 캐시(영속 2단). LLM_CACHE_BACKEND=postgres 일 때 사용
+-- cache_key = sha256(model + generation config + 정규화 프롬프트)  → app/llm_cache.py
+create table if not exists public.llm_response_cache (
+  cache_key   text primary key,
+  model       text not null,
+  value       jsonb not null,
+  created_at  timestamptz not null default now(),
+  last_hit_at timestamptz not null default now(),
+  hits        integer not null default 0
+);
+
+-- TTL 만료 / 행 수 상한(최근 사용 순) 퇴출용
+create index if not exists idx_llm_cache_created_at on public.llm_response_cache(created_at);
+create index if not exists idx_llm_cache_last_hit   on public.llm_response_cache(last_hit_at desc);
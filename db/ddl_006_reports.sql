@@ -0,0 +1,19 @@
+-- 가맹점 마케팅 보고서 저장소(배치 생성/화면 조회 공용)
+-- 키: (가맹점, 적재월 YYYYMM, 프롬프트 버전, 모델) → 데이터/프롬프트/모델이 바뀌면 새 행
+-- status: done | failed | no_data   (배치 재실행 시 done·no_data 는 건너뜀 = 중단 지점부터 재개)
+create table if not exists public.reports (
+  encoded_mct    text        not null,
+  data_month     text        not null,
+  prompt_version text        not null,
+  model          text        not null,
+  status         text        not null,
+  report         text,
+  error          text,
+  elapsed_ms     numeric,
+  created_at     timestamptz not null default now(),
+  updated_at     timestamptz not null default now(),
+  primary key (encoded_mct, data_month, prompt_version, model)
+);
+
+-- 배치 재개: 같은 실행 키의 완료 가맹점 목록
+create index if not exists idx_reports_run on public.reports(data_month, prompt_version, model, status);
@@ -0,0 +1,3 @@
+-- reports: 화면 렌더용 스냅샷(가맹점 헤더·경쟁점·요약·차트 행) 추가
+-- 기준월이 같으면 보고서 화면은 이 행 1건(PK 조회)으로 렌더 → 원자료 3쿼리·정제·LLM 호출 생략
+alter table public.reports add column if not exists payload jsonb;
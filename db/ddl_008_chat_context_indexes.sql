@@ -0,0 +1,10 @@
+-- 챗 컨텍스트 로드(ChatCore.load_context) 인덱스
+-- 리뷰: 필터 조합별 SQL(chat_core._SQL_REVIEWS) 각각이 "인덱스 역순 스캔 + limit 20"으로 끝나도록
+--   area+category / area / category / 필터 없음
+create index if not exists idx_review_raw_area_cat_created on public.review_raw(area, category, created_at desc);
+create index if not exists idx_review_raw_area_created     on public.review_raw(area, created_at desc);
+create index if not exists idx_review_raw_cat_created      on public.review_raw(category, created_at desc);
+create index if not exists idx_review_raw_created          on public.review_raw(created_at desc);
+
+-- 직전 대화 요약: user_id 최신 종료 1건
+create index if not exists idx_conversations_user_ended on public.conversations(user_id, ended_at desc);
@@ -0,0 +1,11 @@
+-- CSV 적재 상태(app/services/ingest_service.py)
+-- 테이블·월(TA_YM)별 행 수 + 내용 체크섬. 다음 적재에서 같으면 그 월은 병합 생략
+-- 개요 테이블(stg_merchant_overview)은 월이 없으므로 ta_ym = '*'
+create table if not exists public.ingest_month_state (
+  table_name  text        not null,
+  ta_ym       text        not null,
+  row_count   bigint      not null,
+  checksum    text        not null,
+  loaded_at   timestamptz not null default now(),
+  primary key (table_name, ta_ym)
+);
@@ -0,0 +1,4 @@
+-- 병렬 적재 체크포인트(ingest_service --workers N)
+-- 월별 분할 파일의 sha256. 같으면 COPY 없이 그 월을 건너뜀 → 실패한 백필을 재실행하면 끝난 월부터 이어서
+-- 단일 연결 적재는 null로 덮어씀(다음 병렬 적재에서 DB 체크섬으로 다시 판정)
+alter table public.ingest_month_state add column if not exists source_checksum text;
@@ -0,0 +1,210 @@
+-- 월별 2개 RAW 테이블 → month(date) 컬럼 + 월 단위 range 파티션
+-- - PK: (ENCODED_MCT, month)  (month = TA_YM 1일. TA_YM 문자열은 원본 그대로 유지)
+-- - 파티션: stg_merchant_monthly_usage_pYYYYMM / stg_merchant_monthly_customers_pYYYYMM
+--   적재(app/services/ingest_service.py)가 새 월마다 ensure_month_partition() 호출
+-- - 뷰·마트는 to_date(TA_YM) 대신 month를 사용 → 월 범위 조건에서 파티션 pruning
+-- 기존 데이터는 옮긴 뒤 구 테이블 삭제. 1트랜잭션.
+begin;
+
+-- TA_YM('YYYYMM') → 월 1일. to_date는 stable이라 immutable 버전을 둠
+create or replace function public.ym_to_month(ym text)
+returns date
+language sql
+immutable strict parallel safe
+as $$ select make_date(substr(ym, 1, 4)::int, substr(ym, 5, 2)::int, 1) $$;
+
+-- 파티션이 없을 때만 생성(있으면 부모 테이블 잠금 없이 바로 반환)
+create or replace function public.ensure_month_partition(parent text, m date)
+returns void
+language plpgsql
+as $$
+declare
+  lo date := date_trunc('month', m)::date;
+  part text := format('%s_p%s', parent, to_char(lo, 'YYYYMM'));
+begin
+  if to_regclass(format('public.%I', part)) is not null then
+    return;
+  end if;
+  execute format('create table if not exists public.%I partition of public.%I for values from (%L) to (%L)',
+                 part, parent, lo, (lo + interval '1 month')::date);
+end
+$$;
+
+-- 구 테이블에 걸린 뷰·마트 제거(아래에서 month 기준으로 재생성)
+drop materialized view if exists public.mv_competitor_rank;
+drop materialized view if exists public.mv_merchant_monthly_metrics;
+drop view if exists public.merchant_monthly_usage;
+drop view if exists public.merchant_monthly_customers;
+
+alter table public.stg_merchant_monthly_usage rename to stg_merchant_monthly_usage_unpart;
+alter table public.stg_merchant_monthly_customers rename to stg_merchant_monthly_customers_unpart;
+alter index if exists public.idx_stg_usage_mct_ym rename to idx_stg_usage_mct_ym_unpart;
+alter index if exists public.idx_stg_cust_mct_ym rename to idx_stg_cust_mct_ym_unpart;
+
+create table public.stg_merchant_monthly_usage (
+  ENCODED_MCT                text    not null,
+  TA_YM                      text    not null, -- YYYYMM
+  MCT_OPE_MS_CN              text    not null,
+  RC_M1_SAA                  text    not null,
+  RC_M1_TO_UE_CT             text    not null,
+  RC_M1_UE_CUS_CN            text    not null,
+  RC_M1_AV_NP_AT             text    not null,
+  APV_CE_RAT                 text,            -- 구간값(문자)
+  DLV_SAA_RAT                numeric not null,
+  M1_SME_RY_SAA_RAT          numeric not null,
+  M1_SME_RY_CNT_RAT          numeric not null,
+  M12_SME_RY_SAA_PCE_RT      numeric not null,
+  M12_SME_BZN_SAA_PCE_RT     numeric not null,
+  M12_SME_RY_ME_MCT_RAT      numeric not null,
+  M12_SME_BZN_ME_MCT_RAT     numeric not null,
+  month                      date    not null, -- ym_to_month(TA_YM), 파티션 키
+  primary key (ENCODED_MCT, month),
+  foreign key (ENCODED_MCT) references public.stg_merchant_overview(ENCODED_MCT)
+) partition by range (month);
+
+create table public.stg_merchant_monthly_customers (
+  ENCODED_MCT                   text    not null,
+  TA_YM                         text    not null, -- YYYYMM
+  M12_MAL_1020_RAT              numeric not null,
+  M12_MAL_30_RAT                numeric not null,
+  M12_MAL_40_RAT                numeric not null,
+  M12_MAL_50_RAT                numeric not null,
+  M12_MAL_60_RAT                numeric not null,
+  M12_FME_1020_RAT              numeric not null,
+  M12_FME_30_RAT                numeric not null,
+  M12_FME_40_RAT                numeric not null,
+  M12_FME_50_RAT                numeric not null,
+  M12_FME_60_RAT                numeric not null,
+  MCT_UE_CLN_REU_RAT            numeric not null,
+  MCT_UE_CLN_NEW_RAT            numeric not null,
+  RC_M1_SHC_RSD_UE_CLN_RAT      numeric not null,
+  RC_M1_SHC_WP_UE_CLN_RAT       numeric not null,
+  RC_M1_SHC_FLP_UE_CLN_RAT      numeric not null,
+  month                         date    not null, -- ym_to_month(TA_YM), 파티션 키
+  primary key (ENCODED_MCT, month),
+  foreign key (ENCODED_MCT) references public.stg_merchant_overview(ENCODED_MCT)
+) partition by range (month);
+
+-- 월 범위 전체 조회(마트 refresh·월 단위 병합)용
+create index if not exists idx_stg_usage_month on public.stg_merchant_monthly_usage(month);
+create index if not exists idx_stg_cust_month  on public.stg_merchant_monthly_customers(month);
+
+-- 기존 월 파티션 생성 후 데이터 이전
+select public.ensure_month_partition('stg_merchant_monthly_usage', m)
+from (select distinct public.ym_to_month(TA_YM) as m from public.stg_merchant_monthly_usage_unpart) x;
+select public.ensure_month_partition('stg_merchant_monthly_customers', m)
+from (select distinct public.ym_to_month(TA_YM) as m from public.stg_merchant_monthly_customers_unpart) x;
+
+insert into public.stg_merchant_monthly_usage
+select u.*, public.ym_to_month(u.TA_YM) from public.stg_merchant_monthly_usage_unpart u;
+insert into public.stg_merchant_monthly_customers
+select c.*, public.ym_to_month(c.TA_YM) from public.stg_merchant_monthly_customers_unpart c;
+
+drop table public.stg_merchant_monthly_usage_unpart;
+drop table public.stg_merchant_monthly_customers_unpart;
+
+-- 정규화 뷰(ddl_001과 동일 컬럼, month는 저장 컬럼)
+create or replace view public.merchant_monthly_usage as
+select
+  u.ENCODED_MCT                                  as encoded_mct,
+  u.month                                        as month,
+  u.MCT_OPE_MS_CN                                as ope_months_bucket,
+  u.RC_M1_SAA                                    as sales_bucket,
+  u.RC_M1_TO_UE_CT                               as trx_bucket,
+  u.RC_M1_UE_CUS_CN                              as uniq_cus_bucket,
+  u.RC_M1_AV_NP_AT                               as aov_bucket,
+  u.APV_CE_RAT                                   as cancel_bucket,
+  nullif(u.DLV_SAA_RAT,              -999999.9)  as delivery_ratio,
+  nullif(u.M1_SME_RY_SAA_RAT,        -999999.9)  as peer_industry_sales_ratio,
+  nullif(u.M1_SME_RY_CNT_RAT,        -999999.9)  as peer_industry_trx_ratio,
+  nullif(u.M12_SME_RY_SAA_PCE_RT,    -999999.9)  as industry_rank_pct,
+  nullif(u.M12_SME_BZN_SAA_PCE_RT,   -999999.9)  as bizarea_rank_pct,
+  nullif(u.M12_SME_RY_ME_MCT_RAT,    -999999.9)  as industry_churn_ratio,
+  nullif(u.M12_SME_BZN_ME_MCT_RAT,   -999999.9)  as bizarea_churn_ratio
+from public.stg_merchant_monthly_usage u;
+
+create or replace view public.merchant_monthly_customers as
+select
+  c.ENCODED_MCT                                as encoded_mct,
+  c.month                                      as month,
+  nullif(c.M12_MAL_1020_RAT,      -999999.9)   as male_u20_ratio,
+  nullif(c.M12_MAL_30_RAT,        -999999.9)   as male_30_ratio,
+  nullif(c.M12_MAL_40_RAT,        -999999.9)   as male_40_ratio,
+  nullif(c.M12_MAL_50_RAT,        -999999.9)   as male_50_ratio,
+  nullif(c.M12_MAL_60_RAT,        -999999.9)   as male_60p_ratio,
+  nullif(c.M12_FME_1020_RAT,      -999999.9)   as female_u20_ratio,
+  nullif(c.M12_FME_30_RAT,        -999999.9)   as female_30_ratio,
+  nullif(c.M12_FME_40_RAT,        -999999.9)   as female_40_ratio,
+  nullif(c.M12_FME_50_RAT,        -999999.9)   as female_50_ratio,
+  nullif(c.M12_FME_60_RAT,        -999999.9)   as female_60p_ratio,
+  nullif(c.MCT_UE_CLN_REU_RAT,    -999999.9)   as revisit_ratio,
+  nullif(c.MCT_UE_CLN_NEW_RAT,    -999999.9)   as new_cus_ratio,
+  nullif(c.RC_M1_SHC_RSD_UE_CLN_RAT, -999999.9) as residential_use_ratio,
+  nullif(c.RC_M1_SHC_WP_UE_CLN_RAT,  -999999.9) as workplace_use_ratio,
+  nullif(c.RC_M1_SHC_FLP_UE_CLN_RAT, -999999.9) as floating_use_ratio
+from public.stg_merchant_monthly_customers c;
+
+-- 월별 지표 마트(ddl_003): month 저장 컬럼 사용, 고객 테이블은 (가맹점, month)로 조인 → 파티션 단위 조인
+create materialized view public.mv_merchant_monthly_metrics as
+select
+  u.encoded_mct,
+  u.ta_ym,
+  u.month,
+  regexp_replace(u.rc_m1_saa, '.*_', '')              as sales_bucket,
+  regexp_replace(u.rc_m1_to_ue_ct, '.*_', '')         as visits_bucket,
+  public.bucket_midpoint(u.rc_m1_saa)                 as sales,      -- 0~1(%) 혹은 절대값 버킷 대표값
+  public.bucket_midpoint(u.rc_m1_to_ue_ct)            as visits,
+  greatest(u.dlv_saa_rat, 0)                          as delivery_ratio,   -- 음수·센티널 → 0
+  nullif(u.m1_sme_ry_saa_rat, -999999.9)              as peer_ind_sales_idx,   -- 동종업종 매출지수(=100 평균)
+  nullif(u.m1_sme_ry_cnt_rat, -999999.9)              as peer_ind_cnt_idx,     -- 동종업종 건수지수
+  nullif(u.m12_sme_ry_saa_pce_rt, -999999.9)          as ind_rank_pct,         -- 업종 내 백분위(낮을수록 상위)
+  nullif(u.m12_sme_bzn_saa_pce_rt, -999999.9)         as area_rank_pct,        -- 상권 내 백분위
+  nullif(c.m12_mal_1020_rat, -999999.9)               as mal_1020,
+  nullif(c.m12_mal_30_rat, -999999.9)                 as mal_30,
+  nullif(c.m12_mal_40_rat, -999999.9)                 as mal_40,
+  nullif(c.m12_mal_50_rat, -999999.9)                 as mal_50,
+  nullif(c.m12_mal_60_rat, -999999.9)                 as mal_60,
+  nullif(c.m12_fme_1020_rat, -999999.9)               as fme_1020,
+  nullif(c.m12_fme_30_rat, -999999.9)                 as fme_30,
+  nullif(c.m12_fme_40_rat, -999999.9)                 as fme_40,
+  nullif(c.m12_fme_50_rat, -999999.9)                 as fme_50,
+  nullif(c.m12_fme_60_rat, -999999.9)                 as fme_60,
+  nullif(c.mct_ue_cln_reu_rat, -999999.9)             as revisit_ratio,
+  nullif(c.mct_ue_cln_new_rat, -999999.9)             as new_ratio,
+  nullif(c.rc_m1_shc_rsd_ue_cln_rat, -999999.9)       as resident_ratio,
+  nullif(c.rc_m1_shc_wp_ue_cln_rat, -999999.9)        as worker_ratio,
+  nullif(c.rc_m1_shc_flp_ue_cln_rat, -999999.9)       as floating_ratio
+from public.stg_merchant_monthly_usage u
+left join public.stg_merchant_monthly_customers c
+  on c.encoded_mct = u.encoded_mct and c.month = u.month;
+
+create unique index if not exists ux_mv_metrics_mct_month on public.mv_merchant_monthly_metrics(encoded_mct, month);
+create index if not exists idx_mv_metrics_month on public.mv_merchant_monthly_metrics(month);
+
+-- 경쟁점 순위 마트(ddl_004 그대로 재생성)
+create materialized view public.mv_competitor_rank as
+select *
+from (
+  select
+    m.month,
+    o.hpsn_mct_bzn_cd_nm as bizarea,
+    o.hpsn_mct_zcd_nm    as industry,
+    row_number() over (
+      partition by m.month, o.hpsn_mct_bzn_cd_nm, o.hpsn_mct_zcd_nm
+      order by m.peer_ind_sales_idx desc, m.encoded_mct
+    )                    as rank,
+    m.encoded_mct,
+    o.mct_nm,
+    m.peer_ind_sales_idx as ind_sales_idx,
+    m.ind_rank_pct,
+    m.area_rank_pct
+  from public.mv_merchant_monthly_metrics m
+  join public.stg_merchant_overview o on o.encoded_mct = m.encoded_mct
+  where m.peer_ind_sales_idx > 100
+) r
+where r.rank <= 10;
+
+create unique index if not exists ux_mv_comp_rank_month_mct on public.mv_competitor_rank(month, encoded_mct);
+create index if not exists idx_mv_comp_rank_lookup on public.mv_competitor_rank(month, bizarea, industry, rank);
+
+commit;
@@ -0,0 +1,111 @@
+-- 버킷 문자열 → 대표값 조회 테이블
+-- 버킷 원문은 컬럼당 몇 개 값뿐 → 정규식(bucket_midpoint)은 새 원문이 들어올 때 1회만 실행하고
+-- 마트(mv_merchant_monthly_metrics)는 이 테이블과 해시 조인
+-- 적재(app/services/ingest_service.py)가 월별 이용 CSV의 버킷 원문으로 add_bucket_values() 호출
+begin;
+
+create table if not exists public.bucket_value (
+  raw    text    primary key,   -- 원문 예: '2_10-25%'
+  label  text    not null,      -- 구간 표시 예: '10-25%'
+  value  numeric                -- bucket_midpoint(raw). 해석 불가면 null
+);
+
+-- 새 원문만 추가(이미 있는 값은 그대로)
+create or replace function public.add_bucket_values(raws text[])
+returns integer
+language sql
+as $$
+  with ins as (
+    insert into public.bucket_value(raw, label, value)
+    select r, regexp_replace(r, '.*_', ''), public.bucket_midpoint(r)
+    from (select distinct r from unnest(raws) r where r is not null) x
+    on conflict (raw) do nothing
+    returning 1
+  )
+  select count(*)::int from ins
+$$;
+
+-- 기존 적재분의 버킷 원문(매출·건수·고객수·객단가·취소율)
+select public.add_bucket_values(array(
+  select distinct b
+  from public.stg_merchant_monthly_usage u
+  cross join lateral unnest(array[u.rc_m1_saa, u.rc_m1_to_ue_ct, u.rc_m1_ue_cus_cn, u.rc_m1_av_np_at, u.apv_ce_rat]) b
+));
+
+-- 마트 재생성: 버킷 5개를 조회 테이블 조인으로 해석
+-- (조회 테이블에 없는 원문만 bucket_midpoint로 대체 → 적재 경로 밖에서 넣은 데이터도 동일 결과.
+--  조회 테이블에 value가 null로 있는 원문(해석 불가)은 정규식을 다시 돌리지 않도록 coalesce 대신 raw 존재 여부로 분기)
+drop materialized view if exists public.mv_competitor_rank;
+drop materialized view if exists public.mv_merchant_monthly_metrics;
+
+create materialized view public.mv_merchant_monthly_metrics as
+select
+  u.encoded_mct,
+  u.ta_ym,
+  u.month,
+  case when bs.raw is null then regexp_replace(u.rc_m1_saa, '.*_', '') else bs.label end       as sales_bucket,
+  case when bv.raw is null then regexp_replace(u.rc_m1_to_ue_ct, '.*_', '') else bv.label end  as visits_bucket,
+  case when bs.raw is null then public.bucket_midpoint(u.rc_m1_saa) else bs.value end          as sales,      -- 0~1(%) 혹은 절대값 버킷 대표값
+  case when bv.raw is null then public.bucket_midpoint(u.rc_m1_to_ue_ct) else bv.value end     as visits,
+  case when bc.raw is null then public.bucket_midpoint(u.rc_m1_ue_cus_cn) else bc.value end    as customers,  -- 유니크 고객 수 구간
+  case when ba.raw is null then public.bucket_midpoint(u.rc_m1_av_np_at) else ba.value end     as avg_price,  -- 객단가 구간
+  case when bx.raw is null then public.bucket_midpoint(u.apv_ce_rat) else bx.value end         as cancel_rate, -- 취소율 구간
+  greatest(u.dlv_saa_rat, 0)                          as delivery_ratio,   -- 음수·센티널 → 0
+  nullif(u.m1_sme_ry_saa_rat, -999999.9)              as peer_ind_sales_idx,   -- 동종업종 매출지수(=100 평균)
+  nullif(u.m1_sme_ry_cnt_rat, -999999.9)              as peer_ind_cnt_idx,     -- 동종업종 건수지수
+  nullif(u.m12_sme_ry_saa_pce_rt, -999999.9)          as ind_rank_pct,         -- 업종 내 백분위(낮을수록 상위)
+  nullif(u.m12_sme_bzn_saa_pce_rt, -999999.9)         as area_rank_pct,        -- 상권 내 백분위
+  nullif(c.m12_mal_1020_rat, -999999.9)               as mal_1020,
+  nullif(c.m12_mal_30_rat, -999999.9)                 as mal_30,
+  nullif(c.m12_mal_40_rat, -999999.9)                 as mal_40,
+  nullif(c.m12_mal_50_rat, -999999.9)                 as mal_50,
+  nullif(c.m12_mal_60_rat, -999999.9)                 as mal_60,
+  nullif(c.m12_fme_1020_rat, -999999.9)               as fme_1020,
+  nullif(c.m12_fme_30_rat, -999999.9)                 as fme_30,
+  nullif(c.m12_fme_40_rat, -999999.9)                 as fme_40,
+  nullif(c.m12_fme_50_rat, -999999.9)                 as fme_50,
+  nullif(c.m12_fme_60_rat, -999999.9)                 as fme_60,
+  nullif(c.mct_ue_cln_reu_rat, -999999.9)             as revisit_ratio,
+  nullif(c.mct_ue_cln_new_rat, -999999.9)             as new_ratio,
+  nullif(c.rc_m1_shc_rsd_ue_cln_rat, -999999.9)       as resident_ratio,
+  nullif(c.rc_m1_shc_wp_ue_cln_rat, -999999.9)        as worker_ratio,
+  nullif(c.rc_m1_shc_flp_ue_cln_rat, -999999.9)       as floating_ratio
+from public.stg_merchant_monthly_usage u
+left join public.stg_merchant_monthly_customers c
+  on c.encoded_mct = u.encoded_mct and c.month = u.month
+left join public.bucket_value bs on bs.raw = u.rc_m1_saa
+left join public.bucket_value bv on bv.raw = u.rc_m1_to_ue_ct
+left join public.bucket_value bc on bc.raw = u.rc_m1_ue_cus_cn
+left join public.bucket_value ba on ba.raw = u.rc_m1_av_np_at
+left join public.bucket_value bx on bx.raw = u.apv_ce_rat;
+
+create unique index if not exists ux_mv_metrics_mct_month on public.mv_merchant_monthly_metrics(encoded_mct, month);
+create index if not exists idx_mv_metrics_month on public.mv_merchant_monthly_metrics(month);
+
+-- 경쟁점 순위 마트(ddl_004 그대로 재생성)
+create materialized view public.mv_competitor_rank as
+select *
+from (
+  select
+    m.month,
+    o.hpsn_mct_bzn_cd_nm as bizarea,
+    o.hpsn_mct_zcd_nm    as industry,
+    row_number() over (
+      partition by m.month, o.hpsn_mct_bzn_cd_nm, o.hpsn_mct_zcd_nm
+      order by m.peer_ind_sales_idx desc, m.encoded_mct
+    )                    as rank,
+    m.encoded_mct,
+    o.mct_nm,
+    m.peer_ind_sales_idx as ind_sales_idx,
+    m.ind_rank_pct,
+    m.area_rank_pct
+  from public.mv_merchant_monthly_metrics m
+  join public.stg_merchant_overview o on o.encoded_mct = m.encoded_mct
+  where m.peer_ind_sales_idx > 100
+) r
+where r.rank <= 10;
+
+create unique index if not exists ux_mv_comp_rank_month_mct on public.mv_competitor_rank(month, encoded_mct);
+create index if not exists idx_mv_comp_rank_lookup on public.mv_competitor_rank(month, bizarea, industry, rank);
+
+commit;
@@ -0,0 +1,147 @@
+-- 월별 지표·경쟁점 순위를 머티리얼라이즈드 뷰 → 일반 테이블(월 단위 증분 갱신)
+-- - refresh materialized view는 항상 전 기간 재계산 → 적재 비용이 누적 연수에 비례
+-- - 정의는 뷰(v_*)로 두고, 적재가 바뀐 월(TA_YM)만 delete + insert(refresh_*_months)
+--   월 조건이 stg 월 파티션·순위 window의 partition by(month)까지 내려가 해당 월만 계산
+-- - 개요(상권·업종)가 바뀌면 순위는 전 월 재계산(인자 null = 전체)
+-- 적재(app/services/ingest_service.py)가 변경된 월 목록으로 호출
+begin;
+
+drop materialized view if exists public.mv_competitor_rank;
+drop materialized view if exists public.mv_merchant_monthly_metrics;
+
+-- 월별 지표 정의(ddl_012 마트와 동일)
+create or replace view public.v_merchant_monthly_metrics as
+select
+  u.encoded_mct,
+  u.ta_ym,
+  u.month,
+  case when bs.raw is null then regexp_replace(u.rc_m1_saa, '.*_', '') else bs.label end       as sales_bucket,
+  case when bv.raw is null then regexp_replace(u.rc_m1_to_ue_ct, '.*_', '') else bv.label end  as visits_bucket,
+  case when bs.raw is null then public.bucket_midpoint(u.rc_m1_saa) else bs.value end          as sales,      -- 0~1(%) 혹은 절대값 버킷 대표값
+  case when bv.raw is null then public.bucket_midpoint(u.rc_m1_to_ue_ct) else bv.value end     as visits,
+  case when bc.raw is null then public.bucket_midpoint(u.rc_m1_ue_cus_cn) else bc.value end    as customers,  -- 유니크 고객 수 구간
+  case when ba.raw is null then public.bucket_midpoint(u.rc_m1_av_np_at) else ba.value end     as avg_price,  -- 객단가 구간
+  case when bx.raw is null then public.bucket_midpoint(u.apv_ce_rat) else bx.value end         as cancel_rate, -- 취소율 구간
+  greatest(u.dlv_saa_rat, 0)                          as delivery_ratio,   -- 음수·센티널 → 0
+  nullif(u.m1_sme_ry_saa_rat, -999999.9)              as peer_ind_sales_idx,   -- 동종업종 매출지수(=100 평균)
+  nullif(u.m1_sme_ry_cnt_rat, -999999.9)              as peer_ind_cnt_idx,     -- 동종업종 건수지수
+  nullif(u.m12_sme_ry_saa_pce_rt, -999999.9)          as ind_rank_pct,         -- 업종 내 백분위(낮을수록 상위)
+  nullif(u.m12_sme_bzn_saa_pce_rt, -999999.9)         as area_rank_pct,        -- 상권 내 백분위
+  nullif(c.m12_mal_1020_rat, -999999.9)               as mal_1020,
+  nullif(c.m12_mal_30_rat, -999999.9)                 as mal_30,
+  nullif(c.m12_mal_40_rat, -999999.9)                 as mal_40,
+  nullif(c.m12_mal_50_rat, -999999.9)                 as mal_50,
+  nullif(c.m12_mal_60_rat, -999999.9)                 as mal_60,
+  nullif(c.m12_fme_1020_rat, -999999.9)               as fme_1020,
+  nullif(c.m12_fme_30_rat, -999999.9)                 as fme_30,
+  nullif(c.m12_fme_40_rat, -999999.9)                 as fme_40,
+  nullif(c.m12_fme_50_rat, -999999.9)                 as fme_50,
+  nullif(c.m12_fme_60_rat, -999999.9)                 as fme_60,
+  nullif(c.mct_ue_cln_reu_rat, -999999.9)             as revisit_ratio,
+  nullif(c.mct_ue_cln_new_rat, -999999.9)             as new_ratio,
+  nullif(c.rc_m1_shc_rsd_ue_cln_rat, -999999.9)       as resident_ratio,
+  nullif(c.rc_m1_shc_wp_ue_cln_rat, -999999.9)        as worker_ratio,
+  nullif(c.rc_m1_shc_flp_ue_cln_rat, -999999.9)       as floating_ratio
+from public.stg_merchant_monthly_usage u
+left join public.stg_merchant_monthly_customers c
+  on c.encoded_mct = u.encoded_mct and c.month = u.month
+left join public.bucket_value bs on bs.raw = u.rc_m1_saa
+left join public.bucket_value bv on bv.raw = u.rc_m1_to_ue_ct
+left join public.bucket_value bc on bc.raw = u.rc_m1_ue_cus_cn
+left join public.bucket_value ba on ba.raw = u.rc_m1_av_np_at
+left join public.bucket_value bx on bx.raw = u.apv_ce_rat;
+
+create table if not exists public.mart_merchant_monthly_metrics as
+select * from public.v_merchant_monthly_metrics with no data;
+
+create unique index if not exists ux_mart_metrics_mct_month on public.mart_merchant_monthly_metrics(encoded_mct, month);
+create index if not exists idx_mart_metrics_month on public.mart_merchant_monthly_metrics(month);
+
+-- 경쟁점 순위 정의(ddl_004와 동일, 지표 테이블 기준)
+create or replace view public.v_competitor_rank as
+select *
+from (
+  select
+    m.month,
+    o.hpsn_mct_bzn_cd_nm as bizarea,
+    o.hpsn_mct_zcd_nm    as industry,
+    row_number() over (
+      partition by m.month, o.hpsn_mct_bzn_cd_nm, o.hpsn_mct_zcd_nm
+      order by m.peer_ind_sales_idx desc, m.encoded_mct
+    )                    as rank,
+    m.encoded_mct,
+    o.mct_nm,
+    m.peer_ind_sales_idx as ind_sales_idx,
+    m.ind_rank_pct,
+    m.area_rank_pct
+  from public.mart_merchant_monthly_metrics m
+  join public.stg_merchant_overview o on o.encoded_mct = m.encoded_mct
+  where m.peer_ind_sales_idx > 100
+) r
+where r.rank <= 10;
+
+create table if not exists public.mart_competitor_rank as
+select * from public.v_competitor_rank with no data;
+
+create unique index if not exists ux_mart_comp_rank_month_mct on public.mart_competitor_rank(month, encoded_mct);
+create index if not exists idx_mart_comp_rank_lookup on public.mart_competitor_rank(month, bizarea, industry, rank);
+
+-- 지정 월(TA_YM 배열, null = 전체)만 재계산. 반환: 넣은 행 수
+create or replace function public.refresh_metrics_months(yms text[] default null)
+returns integer
+language plpgsql
+as $$
+declare
+  ym text;
+  n integer;
+  total integer := 0;
+begin
+  if yms is null then
+    delete from public.mart_merchant_monthly_metrics;
+    insert into public.mart_merchant_monthly_metrics select * from public.v_merchant_monthly_metrics;
+    get diagnostics total = row_count;
+    return total;
+  end if;
+  -- 월마다 month = 상수 조건 → 조인 양쪽 월 파티션만 스캔
+  foreach ym in array yms loop
+    delete from public.mart_merchant_monthly_metrics where month = public.ym_to_month(ym);
+    insert into public.mart_merchant_monthly_metrics
+    select * from public.v_merchant_monthly_metrics where month = public.ym_to_month(ym);
+    get diagnostics n = row_count;
+    total := total + n;
+  end loop;
+  return total;
+end
+$$;
+
+create or replace function public.refresh_competitor_rank_months(yms text[] default null)
+returns integer
+language plpgsql
+as $$
+declare
+  ym text;
+  n integer;
+  total integer := 0;
+begin
+  if yms is null then
+    delete from public.mart_competitor_rank;
+    insert into public.mart_competitor_rank select * from public.v_competitor_rank;
+    get diagnostics total = row_count;
+    return total;
+  end if;
+  -- 월마다 month = 상수 조건 → 조인 양쪽 월 파티션만 스캔
+  foreach ym in array yms loop
+    delete from public.mart_competitor_rank where month = public.ym_to_month(ym);
+    insert into public.mart_competitor_rank
+    select * from public.v_competitor_rank where month = public.ym_to_month(ym);
+    get diagnostics n = row_count;
+    total := total + n;
+  end loop;
+  return total;
+end
+$$;
+
+select public.refresh_metrics_months();
+select public.refresh_competitor_rank_months();
+
+commit;
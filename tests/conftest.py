@@ -0,0 +1,10 @@
+# tests/conftest.py
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# test_db.py는 실제 DB 연결 스모크 스크립트(DATABASE_URL 필요, import 시 실행) → pytest 수집 제외
+collect_ignore = ["test_db.py"]
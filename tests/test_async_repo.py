@@ -0,0 +1,26 @@
+# tests/test_async_repo.py
+# 보고서 원자료 3종 병렬 조회: 지연 ≈ 가장 느린 쿼리, 쿼리별 소요 기록
+import asyncio
+import time
+
+import app.repo.async_repo as ar
+
+
+def test_gather_report_data_runs_queries_concurrently(monkeypatch):
+    async def slow(value, delay=0.2):
+        await asyncio.sleep(delay)
+        return value
+
+    monkeypatch.setattr(ar, "fetch_timeseries_async", lambda mct, m0, m1: slow([{"mct": mct, "m0": m0}]))
+    monkeypatch.setattr(ar, "fetch_snapshot_async", lambda mct: slow({"mct": mct}))
+    monkeypatch.setattr(ar, "fetch_top_competitors_async", lambda mct: slow([], delay=0.1))
+
+    timings = {}
+    t0 = time.perf_counter()
+    ts, snap, comp = asyncio.run(ar.gather_report_data("A", "202401", "202406", timings))
+    elapsed = time.perf_counter() - t0
+
+    assert ts == [{"mct": "A", "m0": "202401"}] and snap == {"mct": "A"} and comp == []
+    assert elapsed < 0.45  # 순차면 0.5초
+    assert set(timings) == {"fetch.timeseries", "fetch.snapshot", "fetch.competitors"}
+    assert timings["fetch.competitors"] < timings["fetch.snapshot"]
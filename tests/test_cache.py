@@ -0,0 +1,111 @@
+# tests/test_cache.py
+# TTLCache(LRU·TTL)와 @cached 키(최신 적재월) 검증. DB 없이 data_month를 대체
+import pytest
+
+import app.cache as cache
+from app.cache import TTLCache
+
+
+class _Clock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(cache.time, "monotonic", c)
+    return c
+
+
+def test_lru_eviction_drops_least_recently_used():
+    c = TTLCache(maxsize=2, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # a 최근 사용 → b가 가장 오래됨
+    c.set("c", 3)
+    assert c.get("b", None) is None
+    assert c.get("a") == 1 and c.get("c") == 3
+    assert c.stats()["evictions"] == 1
+    assert c.stats()["size"] == 2
+
+
+def test_ttl_expiry(clock):
+    c = TTLCache(maxsize=10, ttl=5)
+    c.set("k", "v")
+    clock.t += 4.9
+    assert c.get("k") == "v"
+    clock.t += 0.2
+    assert c.get("k", None) is None
+    assert c.stats()["size"] == 0  # 만료 항목은 조회 시 제거
+
+
+def test_per_item_ttl_override(clock):
+    c = TTLCache(maxsize=10, ttl=100)
+    c.set("short", 1, ttl=1)
+    clock.t += 2
+    assert c.get("short", None) is None
+
+
+def test_stats_hit_rate():
+    c = TTLCache(maxsize=10, ttl=60)
+    assert c.stats()["hit_rate"] is None
+    c.set("k", 1)
+    c.get("k")
+    c.get("missing", None)
+    s = c.stats()
+    assert (s["hits"], s["misses"], s["hit_rate"]) == (1, 1, 0.5)
+
+
+@pytest.fixture
+def month(monkeypatch):
+    state = {"ym": "202406"}
+    monkeypatch.setattr(cache, "data_month", lambda: state["ym"])
+    cache.invalidate()
+    yield state
+    cache.invalidate()
+
+
+def test_cached_reuses_result_per_data_month(month):
+    calls = []
+
+    @cache.cached
+    def fetch(mct, m0=None):
+        calls.append((mct, m0))
+        return [{"mct": mct}]
+
+    assert fetch("A") == [{"mct": "A"}]
+    assert fetch("A") == [{"mct": "A"}]
+    assert fetch("A", m0="202401") == [{"mct": "A"}]  # kwargs도 키에 포함
+    assert len(calls) == 2
+    month["ym"] = "202407"  # 새 월 적재 → 키가 바뀌어 다시 조회
+    fetch("A")
+    assert len(calls) == 3
+
+
+def test_cached_returns_copies(month):
+    @cache.cached
+    def fetch():
+        return [{"v": 1}]
+
+    fetch()[0]["v"] = 99
+    assert fetch() == [{"v": 1}]
+    assert fetch.uncached() == [{"v": 1}]
+
+
+def test_invalidate_clears_all_caches(month):
+    calls = []
+
+    @cache.cached
+    def fetch():
+        calls.append(1)
+        return 1
+
+    fetch()
+    cache.invalidate()
+    fetch()
+    assert len(calls) == 2
+    assert cache.cache_stats()["repo"]["size"] == 1
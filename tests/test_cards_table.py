@@ -0,0 +1,83 @@
+# tests/test_cards_table.py
+# 벡터화 cards_table이 이전 가맹점별 루프 구현과 같은 카드를 만드는지 비교
+from datetime import date
+
+import pandas as pd
+
+from app.services.card_items_service import CARD_SPECS, _cards_by_mct, cards_table, timeseries_frame
+
+
+def _pct(x):
+    return "-" if x is None else f"{x:.1f}%"
+
+
+def _rank(x):
+    return "-" if x is None else f"P{x:.0f}"
+
+
+def _loop_cards(ts):
+    """이전 구현(행 dict 순회) 기준값."""
+    if not ts:
+        return []
+    latest = ts[-1]
+    prev = ts[-2] if len(ts) >= 2 else {}
+    cards = []
+    for spec in CARD_SPECS:
+        key = spec["key"]
+        if spec["fmt"] == "visit_mix":
+            value = f"신규 {_pct(latest.get('new_ratio'))} / 재방문 {_pct(latest.get('revisit_ratio'))}"
+            delta, badge = "", ""
+        else:
+            cur, before = latest.get(key), prev.get(key)
+            diff = None if cur is None or before is None else (cur - before) * spec["direction"]
+            value = _pct(cur) if spec["fmt"] == "pct" else _rank(cur)
+            delta = _pct(diff)
+            badge = ("▲" if diff is not None and diff > 0 else " ") if spec["badge"] else ""
+        cards.append({"key": key, "title": spec["title"], "value": value, "delta": delta,
+                      "tooltip": spec["tooltip"], "badge": badge})
+    return cards
+
+
+def _row(month, **kw):
+    base = {"peer_ind_sales_idx": 100.0, "peer_ind_cnt_idx": 95.5, "ind_rank_pct": 40.0, "area_rank_pct": 55.0,
+            "delivery_ratio": 12.34, "new_ratio": 30.0, "revisit_ratio": 70.0}
+    return {"month": month, **base, **kw}
+
+
+TS = {
+    "A": [  # 개선·악화 혼합
+        _row(date(2024, 1, 1)),
+        _row(date(2024, 2, 1), peer_ind_sales_idx=110.26, ind_rank_pct=35.0, area_rank_pct=60.0, delivery_ratio=10.0),
+    ],
+    "B": [_row(date(2024, 2, 1), peer_ind_cnt_idx=None)],  # 직전 월 없음, 결측
+    "C": [  # 입력 순서가 월 순서가 아님
+        _row(date(2024, 3, 1), peer_ind_sales_idx=90.0, revisit_ratio=None),
+        _row(date(2024, 1, 1), peer_ind_sales_idx=50.0),
+        _row(date(2024, 2, 1), peer_ind_sales_idx=80.0, ind_rank_pct=45.0),
+    ],
+}
+
+
+def test_matches_loop_implementation():
+    got = _cards_by_mct(cards_table(timeseries_frame(TS)))
+    for mct, rows in TS.items():
+        ordered = sorted(rows, key=lambda r: r["month"])
+        assert got[mct] == _loop_cards(ordered), mct
+
+
+def test_card_order_and_values():
+    cards = _cards_by_mct(cards_table(timeseries_frame({"A": TS["A"]})))["A"]
+    assert [c["key"] for c in cards] == [s["key"] for s in CARD_SPECS]
+    by_key = {c["key"]: c for c in cards}
+    assert by_key["peer_ind_sales_idx"]["value"] == "110.3%"
+    assert by_key["peer_ind_sales_idx"]["badge"] == "▲"
+    assert by_key["ind_rank_pct"]["delta"] == "5.0%"  # 백분위는 낮아져야 개선
+    assert by_key["area_rank_pct"]["badge"] == " "
+    assert by_key["visit_mix"]["value"] == "신규 30.0% / 재방문 70.0%"
+
+
+def test_empty_frame():
+    table = cards_table(timeseries_frame({}))
+    assert table.empty
+    assert list(table.columns) == ["encoded_mct", "key", "title", "value", "delta", "tooltip", "badge"]
+    assert isinstance(table, pd.DataFrame)
@@ -0,0 +1,56 @@
+# tests/test_chat_core.py
+# 대화 종료 저장: 메시지 다중행 insert 1회 + 요약은 백그라운드(종료 중이면 현재 스레드에서)
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import app.chat_core as cc
+from app.chat_core import ChatCore
+
+
+class _Result:
+    def scalar(self):
+        return 7
+
+
+class _Engine:
+    def __init__(self):
+        self.calls = []
+
+    @contextmanager
+    def begin(self):
+        yield self
+
+    def execute(self, stmt, params=None):
+        self.calls.append((" ".join(str(stmt).split()), params))
+        return _Result()
+
+
+def _core():
+    core = ChatCore()
+    core.engine = _Engine()
+    core.llm_ready = True
+    return core
+
+
+def test_end_conversation_inserts_messages_once_and_summarizes(monkeypatch):
+    core = _core()
+    done = threading.Event()
+    got = []
+    monkeypatch.setattr(core, "_summarize_conversation", lambda cid, msgs: (got.append((cid, msgs)), done.set()))
+    msgs = [{"role": "user", "content": "안녕"}, {"role": "assistant", "content": "네"}]
+    assert core.end_conversation(msgs, {"area": "성수"}) == 7
+    sqls = [s for s, _ in core.engine.calls]
+    assert len(sqls) == 2 and sqls[0].startswith("insert into conversations") and "unnest" in sqls[1]
+    assert core.engine.calls[1][1] == {"cid": 7, "roles": ["user", "assistant"], "contents": ["안녕", "네"]}
+    assert done.wait(2)
+    assert got == [(7, msgs)]
+
+
+def test_submit_summary_runs_inline_after_executor_shutdown(monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=1)
+    pool.shutdown()
+    monkeypatch.setattr(cc, "_summary_pool", pool)
+    ran = []
+    cc._submit_summary(lambda x: ran.append((x, threading.current_thread())), 1)
+    assert ran == [(1, threading.current_thread())]
@@ -0,0 +1,150 @@
+# tests/test_chat_writer.py
+# write-behind 큐: 순서·배치·즉시 flush·재시도. 엔진은 트랜잭션별 실행 내용을 기록하는 가짜
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+import app.chat_writer as cw
+from app.chat_writer import ChatWriter
+
+
+class _Result:
+    def __init__(self, value=None):
+        self._value = value
+
+    def scalar(self):
+        return self._value
+
+
+class _Conn:
+    def __init__(self, engine):
+        self.engine = engine
+        self.ops = []
+
+    def execute(self, stmt, params=None):
+        sql = str(stmt)
+        if "insert into conversations" in sql:
+            self.engine.next_id += 1
+            self.ops.append(("open", self.engine.next_id))
+            return _Result(self.engine.next_id)
+        if "insert into messages" in sql:
+            self.ops.append(("messages", list(zip(params["cids"], params["roles"], params["contents"]))))
+        elif "update conversations" in sql:
+            self.ops.append(("close", [p["cid"] for p in params]))
+        return _Result()
+
+
+class _Engine:
+    def __init__(self, fail_times=0):
+        self.next_id = 0
+        self.fail_times = fail_times
+        self.txns = []  # 커밋된 트랜잭션별 ops
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def begin(self):
+        conn = _Conn(self)
+        with self.lock:
+            if self.fail_times:
+                self.fail_times -= 1
+                raise RuntimeError("db down")
+        yield conn
+        with self.lock:
+            self.txns.append(conn.ops)
+
+    def messages(self):
+        return [m for ops in self.txns for kind, v in ops if kind == "messages" for m in v]
+
+
+@pytest.fixture
+def make_writer():
+    writers = []
+
+    def make(engine, **kw):
+        w = ChatWriter(engine, **{"flush_sec": 5.0, **kw})
+        writers.append(w)
+        return w
+
+    yield make
+    for w in writers:
+        w.shutdown()
+
+
+def test_messages_keep_queue_order_across_conversations(make_writer):
+    eng = _Engine()
+    w = make_writer(eng, batch_size=100)
+    a = w.open({"area": "성수"})
+    b = w.open()
+    w.append(a, "user", "a1")
+    w.append(b, "user", "b1")
+    w.append(a, "assistant", "a2")
+    w.append(b, "assistant", "b2")
+    assert w.flush(timeout=2)
+    assert eng.messages() == [(1, "user", "a1"), (2, "user", "b1"), (1, "assistant", "a2"), (2, "assistant", "b2")]
+    assert len(eng.txns) == 1  # 한 트랜잭션·다중행 insert 1회
+    assert w.stats()["written"] == 4
+
+
+def test_barrier_first_in_batch_writes_immediately(make_writer):
+    w = make_writer(_Engine(), flush_sec=5.0)
+    t0 = time.monotonic()
+    assert w.flush(timeout=2)
+    assert time.monotonic() - t0 < 1.0
+
+
+def test_close_flushes_without_waiting_and_calls_back(make_writer):
+    eng = _Engine()
+    w = make_writer(eng, flush_sec=5.0)
+    got = threading.Event()
+    closed = []
+    tok = w.open()
+    w.append(tok, "user", "hi")
+    w.close(tok, lambda cid: (closed.append(cid), got.set()))
+    assert got.wait(1.0)
+    assert closed == [1]
+    assert eng.txns[-1][-1] == ("close", [1])
+    assert w.stats()["open_conversations"] == 0
+
+
+def test_batch_size_triggers_write(make_writer):
+    eng = _Engine()
+    w = make_writer(eng, batch_size=3, flush_sec=5.0)
+    tok = w.open()
+    w.append(tok, "user", "1")
+    w.append(tok, "user", "2")
+    deadline = time.monotonic() + 1.0
+    while not eng.txns and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert eng.txns and eng.messages() == [(1, "user", "1"), (1, "user", "2")]
+
+
+def test_retry_keeps_batch_and_id_mapping(make_writer, monkeypatch):
+    monkeypatch.setattr(cw.time, "sleep", lambda s: None)
+    eng = _Engine(fail_times=2)
+    w = make_writer(eng, retries=3)
+    tok = w.open()
+    w.append(tok, "user", "x")
+    assert w.flush(timeout=2)
+    assert eng.messages() == [(1, "user", "x")]  # 실패한 시도의 id는 쓰이지 않음
+    s = w.stats()
+    assert (s["errors"], s["dropped"], s["written"]) == (2, 0, 1)
+
+
+def test_drops_after_retries_exhausted(make_writer, monkeypatch):
+    monkeypatch.setattr(cw.time, "sleep", lambda s: None)
+    w = make_writer(_Engine(fail_times=10), retries=1)
+    tok = w.open()
+    w.append(tok, "user", "x")
+    assert w.flush(timeout=2)
+    assert w.stats()["dropped"] == 2
+
+
+def test_shutdown_drains_queue():
+    eng = _Engine()
+    w = ChatWriter(eng, flush_sec=5.0)
+    tok = w.open()
+    w.append(tok, "user", "bye")
+    w.shutdown(timeout=2)
+    assert eng.messages() == [(1, "user", "bye")]
@@ -1,7 +1,13 @@
 # test_db.py
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
 load_dotenv()  # .env 파일 로드
 
@@ -9,7 +15,10 @@ url = os.getenv("DATABASE_URL")
 if not url:
     raise RuntimeError("DATABASE_URL not found")
 
-engine = create_engine(url)
+from app.deps import get_engine, pool_stats
+
+engine = get_engine(url)
 with engine.begin() as conn:
     result = conn.execute(text("select 1")).scalar()
     print("DB 연결 성공:", result == 1)
+print("풀 상태:", pool_stats(url))
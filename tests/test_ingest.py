@@ -0,0 +1,106 @@
+# tests/test_ingest.py
+# 증분 적재의 월 판정·월 단위 교체(삭제+upsert)·월 분할. DB는 실행된 SQL만 기록하는 가짜 커넥션
+import hashlib
+
+from app.services import ingest_service as ig
+
+
+class _Cursor:
+    def __init__(self, rows=(), rowcount=0):
+        self._rows = list(rows)
+        self.rowcount = rowcount
+
+    def fetchall(self):
+        return self._rows
+
+
+class _Conn:
+    def __init__(self, results=()):
+        self.calls = []
+        self._results = list(results)
+
+    def execute(self, sql, params=None):
+        self.calls.append((" ".join(sql.split()), params))
+        return self._results.pop(0) if self._results else _Cursor()
+
+
+def test_changed_months_compares_count_and_checksum():
+    conn = _Conn([_Cursor([("202401", 10, "a"), ("202402", 10, "b"), ("202403", 5, "c")])])
+    sums = {"202401": (10, "a"), "202402": (10, "x"), "202403": (6, "c"), "202404": (3, "d")}
+    assert ig._changed_months(conn, "stg_merchant_monthly_usage", sums) == ["202402", "202403", "202404"]
+    assert conn.calls[0][1] == ("stg_merchant_monthly_usage",)
+
+
+def test_merge_monthly_deletes_missing_rows_then_upserts():
+    conn = _Conn([_Cursor(rowcount=2), _Cursor(rowcount=5)])
+    cols = ["encoded_mct", "ta_ym", "month", "v"]
+    n = ig._merge(conn, "stg_merchant_monthly_usage", "tmp_u", cols, ("encoded_mct", "month"), ["202402"])
+    assert n == 7  # 삭제 + 변경
+    (delete, dparams), (upsert, uparams) = conn.calls
+    assert delete.startswith("delete from public.stg_merchant_monthly_usage")
+    assert "not exists (select 1 from tmp_u" in delete
+    assert dparams == (["202402"], ["202402"])
+    assert "where ta_ym = any(%s)" in upsert and "public.ym_to_month(ta_ym)" in upsert
+    assert "is distinct from" in upsert
+    assert uparams == (["202402"],)
+
+
+def test_merge_overview_upserts_only():
+    conn = _Conn([_Cursor(rowcount=1)])
+    n = ig._merge(conn, "stg_merchant_overview", "tmp_o", ["encoded_mct", "name"], ("encoded_mct",), None)
+    assert n == 1
+    assert len(conn.calls) == 1
+    assert conn.calls[0][0].startswith("insert into public.stg_merchant_overview")
+
+
+def test_save_state_skips_when_nothing_changed():
+    conn = _Conn()
+    ig._save_state(conn, "stg_merchant_monthly_usage", {"202401": (1, "a")}, [])
+    assert conn.calls == []
+
+
+def test_refresh_scope():
+    usage, cust, ov = (ig.TABLES[k]["table"] for k in ("usage", "customers", "overview"))
+    results = [
+        {"table": usage, "months": ["202402"], "changed": 3},
+        {"table": cust, "months": ["202401", "202402"], "changed": 1},
+        {"table": cust, "months": ["202405"], "changed": 0},  # 내용 같음 → 제외
+    ]
+    assert ig._refresh_scope(results) == ["202401", "202402"]
+    assert ig._refresh_scope(results + [{"table": ov, "months": ["*"], "changed": 1}]) is None
+    assert ig._refresh_scope(results + [{"table": ov, "months": [], "changed": 0}]) == ["202401", "202402"]
+
+
+def test_split_by_month_keeps_raw_rows(tmp_path):
+    src = tmp_path / "usage.csv"
+    src.write_bytes(
+        "\ufeffENCODED_MCT,TA_YM,NOTE\r\n"
+        'A,202401,""\r\n'
+        "B,202402,\r\n"
+        'C,202401,"two\nlines"\r\n'.encode("utf-8")
+    )
+    out = tmp_path / "out"
+    out.mkdir()
+    parts = ig._split_by_month(str(src), "utf-8", str(out))
+    assert sorted(parts) == ["202401", "202402"]
+    path, sha = parts["202401"]
+    with open(path, encoding="utf-8", newline="") as f:
+        body = f.read()
+    assert body == 'encoded_mct,ta_ym,note\nA,202401,""\nC,202401,"two\nlines"\n'  # "" 와 빈값 구분 유지
+    assert sha == hashlib.sha256('A,202401,""\nC,202401,"two\nlines"\n'.encode("utf-8")).hexdigest()
+    with open(parts["202402"][0], encoding="utf-8", newline="") as f:
+        assert f.read().endswith("B,202402,\n")
+
+
+def test_split_by_month_checksum_is_stable(tmp_path):
+    a = tmp_path / "a.csv"
+    b = tmp_path / "b.csv"
+    a.write_text("encoded_mct,ta_ym\nA,202401\nB,202402\n", encoding="utf-8")
+    b.write_text("encoded_mct,ta_ym\nB,202402\nA,202401\nA,202403\n", encoding="utf-8")  # 다른 월 추가·순서 변경
+    (tmp_path / "oa").mkdir()
+    (tmp_path / "ob").mkdir()
+    pa = ig._split_by_month(str(a), "utf-8", str(tmp_path / "oa"))
+    pb = ig._split_by_month(str(b), "utf-8", str(tmp_path / "ob"))
+    assert pa["202401"][1] == pb["202401"][1]  # 내용이 같은 월은 체크포인트 일치 → 재적재 생략
+    assert pa["202402"][1] == pb["202402"][1]
+    assert "202403" in pb
@@ -0,0 +1,118 @@
+# tests/test_llm_limiter.py
+# 토큰 버킷·동시성 슬롯·대기열 timeout. postgres 슬롯은 DB 오류 시 fail open만 확인
+import threading
+
+import pytest
+
+import app.llm_limiter as lim
+from app.llm_limiter import LLMLimiter, LLMQueueTimeout, TokenBucket
+
+
+class _Clock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(lim.time, "monotonic", c)
+    return c
+
+
+def test_token_bucket_take_and_refill(clock):
+    b = TokenBucket(per_minute=60)  # 초당 1
+    assert b.try_take(60) == 0.0
+    assert b.try_take(1) == pytest.approx(1.0)
+    clock.t += 2
+    assert b.try_take(2) == 0.0
+    assert b.available() == 0.0
+
+
+def test_token_bucket_caps_oversized_request_and_settles(clock):
+    b = TokenBucket(per_minute=10)
+    assert b.try_take(1000) == 0.0  # 상한보다 큰 요청은 capacity만 차감
+    b.adjust(-4)  # 환급
+    assert b.available() == 4.0
+    clock.t += 600
+    assert b.available() == 10.0  # capacity 초과 보충 없음
+
+
+def test_token_bucket_unlimited():
+    b = TokenBucket(per_minute=0)
+    assert b.try_take(10 ** 9) == 0.0
+    assert b.available() is None
+
+
+def test_limiter_times_out_when_slots_busy():
+    limiter = LLMLimiter(max_concurrency=1, rpm=0, tpm=0, queue_timeout=0.05, backend="local")
+    with limiter.acquire():
+        with pytest.raises(LLMQueueTimeout):
+            with limiter.acquire():
+                pass
+    s = limiter.stats()
+    assert (s["timeouts"], s["acquired"], s["in_flight"], s["queue_depth"]) == (1, 1, 0, 0)
+    with limiter.acquire():  # 슬롯 반환 확인
+        pass
+
+
+def test_limiter_times_out_on_rpm_and_returns_slot():
+    limiter = LLMLimiter(max_concurrency=2, rpm=1, tpm=0, queue_timeout=0.05, backend="local")
+    with limiter.acquire():
+        pass
+    with pytest.raises(LLMQueueTimeout):
+        with limiter.acquire():
+            pass
+    assert limiter.slots._sem.acquire(blocking=False) and limiter.slots._sem.acquire(blocking=False)
+
+
+def test_limiter_caps_concurrency():
+    limiter = LLMLimiter(max_concurrency=2, rpm=0, tpm=0, queue_timeout=5, backend="local")
+    peak, lock, gate = [0, 0], threading.Lock(), threading.Barrier(2)
+
+    def work():
+        with limiter.acquire():
+            with lock:
+                peak[0] += 1
+                peak[1] = max(peak[1], peak[0])
+            try:
+                gate.wait(timeout=0.2)
+            except threading.BrokenBarrierError:
+                pass
+            with lock:
+                peak[0] -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[1] == 2
+    assert limiter.stats()["acquired"] == 6
+
+
+def test_permit_settles_tpm(clock):
+    limiter = LLMLimiter(max_concurrency=1, rpm=0, tpm=1000, queue_timeout=1, backend="local")
+    with limiter.acquire(est_tokens=300) as permit:
+        assert limiter.tpm.available() == 700
+        permit.settle({"total_tokens": 100})
+    assert limiter.tpm.available() == 900
+
+
+def test_postgres_slots_fail_open_on_db_error(monkeypatch):
+    limiter = LLMLimiter(max_concurrency=1, rpm=0, tpm=0, queue_timeout=0.1, backend="postgres")
+
+    def boom():
+        raise OSError("connection refused")
+
+    monkeypatch.setattr(limiter.slots, "_engine", boom)
+    with limiter.acquire():
+        with pytest.raises(LLMQueueTimeout):  # 프로세스 슬롯은 계속 보유
+            with limiter.acquire():
+                pass
+    with limiter.acquire():
+        pass
+    assert limiter.stats()["slot_fail_open"] == 2
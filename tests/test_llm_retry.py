@@ -0,0 +1,125 @@
+# tests/test_llm_retry.py
+# 재시도 판정·데드라인 예산·서킷 브레이커 상태 전이(시계는 가짜로 대체)
+import pytest
+
+import app.llm_retry as retry
+from app.llm_retry import CircuitBreaker, RetryPolicy, is_retryable
+
+
+class _Clock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+    def sleep(self, s):
+        self.t += s
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(retry.time, "monotonic", c)
+    monkeypatch.setattr(retry.time, "sleep", c.sleep)
+    return c
+
+
+class _ApiError(Exception):
+    def __init__(self, code, msg="error"):
+        super().__init__(msg)
+        self.code = code
+
+
+@pytest.mark.parametrize("err,expected", [
+    (TimeoutError(), True),
+    (ConnectionError(), True),
+    (_ApiError(429), True),
+    (_ApiError(503), True),
+    (_ApiError(400, "invalid argument"), False),
+    (_ApiError(403, "permission denied"), False),
+    ("504 Gateway Timeout", True),
+    ("API key not valid", False),
+    (None, False),
+])
+def test_is_retryable(err, expected):
+    assert is_retryable(err) is expected
+
+
+def test_call_timeout_shrinks_with_budget(clock):
+    p = RetryPolicy(deadline_sec=10, call_timeout_sec=4, min_call_sec=1)
+    deadline = p.start()
+    assert p.call_timeout(deadline) == 4
+    clock.t += 7.5
+    assert p.call_timeout(deadline) == pytest.approx(2.5)
+    clock.t += 2
+    assert p.call_timeout(deadline) is None
+
+
+def test_backoff_respects_deadline(clock, monkeypatch):
+    monkeypatch.setattr(retry.random, "uniform", lambda a, b: b)  # 최대 지연
+    p = RetryPolicy(deadline_sec=5, base_delay=1, max_delay=3, min_call_sec=1)
+    deadline = p.start()
+    assert p.backoff(0, deadline) is True  # 1초 대기
+    assert clock.t == 1001.0
+    assert p.backoff(1, deadline) is True  # 2초
+    assert p.backoff(2, deadline) is False  # 3초 대기 후 남는 예산 < 1초 → 대기하지 않음
+    assert clock.t == 1003.0
+
+
+def test_breaker_opens_after_threshold_and_short_circuits(clock):
+    b = CircuitBreaker(failure_threshold=3, reset_after=10)
+    for _ in range(2):
+        b.record_failure()
+    assert b.state == "closed" and b.allow()
+    b.record_failure()
+    assert b.state == "open"
+    assert b.allow() is False
+    assert b.stats()["short_circuits"] == 1
+
+
+def test_breaker_half_open_probe_success_closes(clock):
+    b = CircuitBreaker(failure_threshold=1, reset_after=10)
+    b.record_failure()
+    clock.t += 10
+    assert b.allow() is True  # 시험 호출 1건
+    assert b.state == "half_open"
+    assert b.allow() is False  # 시험 중 다른 호출 차단
+    b.record_success()
+    assert b.state == "closed" and b.allow()
+
+
+def test_breaker_half_open_probe_failure_reopens(clock):
+    b = CircuitBreaker(failure_threshold=1, reset_after=10)
+    b.record_failure()
+    clock.t += 10
+    assert b.allow()
+    b.record_failure()
+    assert b.state == "open"
+    clock.t += 9
+    assert b.allow() is False
+
+
+def test_breaker_abandon_reopens_only_probe(clock):
+    b = CircuitBreaker(failure_threshold=1, reset_after=10)
+    b.abandon()  # closed에서는 영향 없음
+    assert b.state == "closed"
+    b.record_failure()
+    clock.t += 10
+    assert b.allow()
+    b.abandon()
+    assert b.state == "open"
+    assert b.allow() is False
+    clock.t += 10
+    assert b.allow() is True
+
+
+def test_breaker_lost_probe_expires(clock):
+    b = CircuitBreaker(failure_threshold=1, reset_after=10)
+    b.record_failure()
+    clock.t += 10
+    assert b.allow()  # 결과 보고 없이 사라진 시험 호출
+    clock.t += 5
+    assert b.allow() is False
+    clock.t += 5
+    assert b.allow() is True  # reset_after 경과 → 새 시험 호출 허용
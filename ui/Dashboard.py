@@ -5,11 +5,14 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 import json
+import os
 from datetime import datetime, timedelta
 import streamlit as st
 from streamlit.components.v1 import html as component_html
 
 from app.services.card_items_service import build_dashboard_cards
+from app.services.merchant_bundle import load_bundle
+from app.services.report_context_service import REPORT_M0, REPORT_M1
 from ui.components.cards import render_dashboard
 from ui import marketing_report
 
@@ -17,6 +20,7 @@ from ui import marketing_report
 BRAND = "AI 세일즈 어드바이저"
 AREA_DEFAULT = "뚝섬"
 CATEGORY_DEFAULT = "이자카야"
+REPORT_DEBUG = os.getenv("REPORT_DEBUG", "0") == "1"  # 보고서 아래 산출 입력·소요시간·캐시/풀 상태 표시
 
 st.set_page_config(page_title="세일즈 어드바이저", page_icon="💬", layout="wide")
 
@@ -215,19 +219,33 @@ setInterval(tick, 5000);
     )
 
 # ---------- Data helpers ----------
-def get_dashboard_context(area: str, category: str):
-    DEMO_MCTS = {
-        ("성수", "이자카야"): "AAA80B422A",
-        ("성수", "카페"): "D2E6E383CD",
-        ("뚝섬", "이자카야"): "1F7D63C933",
-        ("뚝섬", "카페"): "0F646F50F7",
-    }
+# area/category 조합 → DEMO MCT
+DEMO_MCTS = {
+    ("성수", "이자카야"): "AAA80B422A",
+    ("성수", "카페"): "D2E6E383CD",
+    ("뚝섬", "이자카야"): "1F7D63C933",
+    ("뚝섬", "카페"): "0F646F50F7",
+}
+
+def _card_window() -> tuple[str, str]:
+    end = datetime.today().replace(day=1)
+    start = end - timedelta(days=365)
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+def get_merchant_bundle(area: str, category: str):
+    """카드·보고서가 함께 쓰는 가장 넓은 기간으로 1회 로드."""
     mct = DEMO_MCTS.get((area, category))
     if not mct:
         return None
-    end = datetime.today().replace(day=1)
-    start = end - timedelta(days=365)
-    return build_dashboard_cards(mct=mct, start=start.strftime("%Y-%m-%d"), end=end.strftime("%Y-%m-%d"))
+    start, end = _card_window()
+    return load_bundle(mct, min(start, REPORT_M0), max(end, REPORT_M1))
+
+def get_dashboard_context(area: str, category: str, bundle=None):
+    mct = DEMO_MCTS.get((area, category))
+    if not mct:
+        return None
+    start, end = _card_window()
+    return build_dashboard_cards(mct=mct, start=start, end=end, bundle=bundle)
 
 def _filter_kpi_context(ctx):
     """
@@ -347,23 +365,18 @@ if (host && block) host.appendChild(block);
         open_report = st.button("📄 마케팅 보고서", use_container_width=True)
     with rr2:
         st.markdown("<div class='report-desc'>최근 리뷰와 업종 트렌드를 반영한 맞춤 보고서를 확인하세요.</div>", unsafe_allow_html=True)
+    # 보고서·KPI 공용 번들(같은 가맹점 원자료 1회 조회)
+    bundle = get_merchant_bundle(S.area, S.category)
     if open_report:
         with st.expander("📄 마케팅 보고서", expanded=True):
-            # area/category 조합에 따른 DEMO MCT 매핑 유지
-            DEMO_MCTS = {
-                ("성수", "이자카야"): "AAA80B422A",
-                ("성수", "카페"): "D2E6E383CD",
-                ("뚝섬", "이자카야"): "1F7D63C933",
-                ("뚝섬", "카페"): "0F646F50F7",
-            }
             mct = DEMO_MCTS.get((S.area, S.category))
             if mct:
-                marketing_report.render_report(mct)
+                marketing_report.render_report(mct, show_debug=REPORT_DEBUG, bundle=bundle)
             else:
                 st.warning("선택된 상권/업종에 해당하는 가맹점이 없습니다.")
 
     # KPI 영역
-    ctx = get_dashboard_context(S.area, S.category)
+    ctx = get_dashboard_context(S.area, S.category, bundle=bundle)
     if not ctx:
         st.warning(f"{S.area}/{S.category} 데이터가 없습니다.")
     else:
@@ -5,7 +5,7 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-import time
+import os
 import re
 import streamlit as st
 from streamlit.components.v1 import html as component_html
@@ -18,7 +18,10 @@ except Exception:
     CORE = None
 
 # ---------- 설정 ----------
-DELAY_SEC = 5  
+# 1이면 Gemini 스트리밍 응답(GEMINI_API_KEY 필요), 아니면 규칙 기반 데모 답변
+USE_LLM = os.getenv("CHAT_USE_LLM", "0") == "1"
+# 1이면 대화/메시지를 DB(conversations/messages)에 write-behind 큐로 적재
+PERSIST = os.getenv("CHAT_PERSIST", "0") == "1"
 
 # ---------- CSS ----------
 CHAT_CSS = r"""
@@ -157,18 +160,37 @@ def _route_answer(user_text: str, area: str, category: str) -> str:
     return f"[{area}/{category}]\n{_DEMO_TEXT['summary']}"
 
 # ---------- helpers ----------
+def _meta() -> dict:
+    S = st.session_state
+    return {"user_id": S.get("user_id", "demo-user"),
+            "area": S.get("ctx_area") or S.get("area"), "category": S.get("ctx_category") or S.get("category")}
+
 def _append(role: str, content: str):
-    st.session_state.messages.append({"role": role, "content": content})
+    S = st.session_state
+    S.messages.append({"role": role, "content": content})
+    if PERSIST and CORE:
+        # 큐에 넣기만 함(배치 기록은 app/chat_writer 워커)
+        if not S.get("conv_token"):
+            S.conv_token = CORE.start_conversation(_meta())
+        CORE.log_message(S.conv_token, role, content)
+
+def _end_conversation():
+    S = st.session_state
+    if PERSIST and CORE and S.get("conv_token"):
+        CORE.end_conversation(S.messages, _meta(), conversation=S.conv_token)
+    S.conv_token = None
 
 def _stream_answer(prompt: str):
     area = st.session_state.get("ctx_area") or st.session_state.get("area") or "지역"
     category = st.session_state.get("ctx_category") or st.session_state.get("category") or "업종"
-    text = _route_answer(prompt, area, category)
-    # 답변 시작 전 지연
-    time.sleep(DELAY_SEC)
-    for ch in text:
-        time.sleep(0.01)
-        yield ch
+    if USE_LLM and CORE and CORE.llm_ready:
+        # SDK 청크를 받는 즉시 전달(인위적 지연 없음). Gemini 장애 시 규칙 기반 답변으로 대체
+        yield from CORE.reply_stream(st.session_state.messages,
+                                     fallback=lambda _: _route_answer(prompt, area, category))
+        return
+    # 규칙 기반: 즉시 줄 단위 출력
+    for line in _route_answer(prompt, area, category).splitlines(keepends=True):
+        yield line
 
 # ---------- main ----------
 def render_chat():
@@ -195,12 +217,14 @@ def render_chat():
     bc1, bc2, bc3 = st.columns([1,1,1])
     with bc1:
         if st.button("🏠 홈으로", use_container_width=True, key="btn_home"):
+            _end_conversation()
             S.mode = "landing"; S.show_report = False; st.rerun()
     with bc2:
         if st.button("📄 마케팅 보고서", use_container_width=True, key="btn_report"):
             S.show_report = True
     with bc3:
         if st.button("🗑 대화 초기화", use_container_width=True, key="btn_clear"):
+            _end_conversation()
             S.messages = []; S.show_report = False; st.rerun()
     st.markdown('</div></div>', unsafe_allow_html=True)
 
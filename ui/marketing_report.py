@@ -5,7 +5,8 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-import json
+import os
+import time
 from datetime import date, datetime
 import decimal
 import numpy as np
@@ -13,12 +14,21 @@ import pandas as pd
 import plotly.express as px
 import streamlit as st
 
-from app.repo.metrics_repo import fetch_timeseries, fetch_snapshot
-from app.repo.compare_repo import fetch_top_competitors
+from app.cache import cache_stats, data_month
+from app.deps import all_pool_stats
+from app.repo.report_repo import fetch_report, upsert_report
+from app.services.merchant_bundle import AGE_COLS, age_mix
+from app.services.report_context_service import (
+    build_report_context, frame_from_payload, llm_context, payload_is_current, report_payload,
+)
 
 # LLM 비활성 데모 모드
 USE_LLM = False  # 항상 하드코딩 스토리라인 출력
 
+# reports 저장 키(규칙 기반 스토리라인). _story_from_df 문구/로직을 바꾸면 버전 올릴 것
+STORY_VERSION = "story-v1"
+STORY_MODEL = "rule"
+
 # ----------------------------
 # Helpers
 # ----------------------------
@@ -30,36 +40,6 @@ def _json_default(o):
     if isinstance(o, np.bool_):         return bool(o)
     return str(o)
 
-def _clean(df: pd.DataFrame) -> pd.DataFrame:
-    if df.empty: return df
-    df = df.replace(-999999.9, pd.NA)
-
-    num_cols = [c for c in ["sales","peer_ind_sales_idx","area_rank_pct","delivery_ratio"] if c in df.columns]
-    for c in num_cols:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-
-    if "delivery_ratio" in df.columns:
-        df["delivery_ratio"] = df["delivery_ratio"].clip(lower=0)
-
-    if "month" in df.columns:
-        df["month"] = pd.to_datetime(df["month"], errors="coerce")
-        bad = df["month"].isna()
-        if bad.any():
-            df.loc[bad, "month"] = pd.to_datetime(df.loc[bad, "month"].astype(str), format="%Y%m", errors="coerce")
-
-    if "demographics" in df.columns:
-        def _ensure_dict(x):
-            if isinstance(x, str):
-                try: return json.loads(x)
-                except Exception: return {}
-            return x or {}
-        df["demographics"] = df["demographics"].apply(_ensure_dict)
-        demo = pd.json_normalize(df["demographics"])
-        if not demo.empty:
-            demo.columns = [f"demo_{c}" for c in demo.columns]
-            df = pd.concat([df.drop(columns=["demographics"]), demo], axis=1)
-    return df
-
 def _story_from_df(df: pd.DataFrame, ctx: dict) -> str:
     """차트 스토리라인에 맞춘 데모 텍스트. LLM 미사용."""
     if df.empty:
@@ -91,7 +71,7 @@ def _story_from_df(df: pd.DataFrame, ctx: dict) -> str:
     # 4) 고객 분포(최근 월)
     demo_line = ""
     last = df.tail(1).to_dict("records")[0]
-    ages = {k.replace("demo_age.", ""): v for k, v in last.items() if str(k).startswith("demo_age.")}
+    ages = age_mix(last)
     if ages:
         # 주요 4개 그룹만 노출
         tops = sorted([(k, float(ages.get(k, 0) or 0)) for k in ages], key=lambda x: x[1], reverse=True)[:4]
@@ -134,7 +114,7 @@ def make_visuals(df: pd.DataFrame) -> dict:
     last = df.tail(1).to_dict("records")
     if last:
         last = last[0]
-        age_fields = {k.replace("demo_age.", ""): v for k, v in last.items() if str(k).startswith("demo_age.")}
+        age_fields = age_mix(last)
         if age_fields:
             age_groups = {
                 "남성 20대 이하": age_fields.get("m_1020", 0),
@@ -156,35 +136,69 @@ def make_visuals(df: pd.DataFrame) -> dict:
 # Data assembly
 # ----------------------------
 def build_llm_context(mct: str):
-    ts = fetch_timeseries(mct, "2024-01-01", "2025-10-01")
-    snap = fetch_snapshot(mct)
-    comp = fetch_top_competitors(mct)
-
-    df = _clean(pd.DataFrame(ts))
-
-    avg_sales_idx = float(df["peer_ind_sales_idx"].mean(skipna=True)) if "peer_ind_sales_idx" in df.columns and not df.empty else None
-    avg_rank_area = float(df["area_rank_pct"].mean(skipna=True)) if "area_rank_pct" in df.columns and not df.empty else None
-    avg_delivery = float(df["delivery_ratio"].mean(skipna=True)) if "delivery_ratio" in df.columns and not df.empty else None
-    customers = df.filter(regex=r"^demo_age\.").tail(1).to_dict("records")[0] if not df.filter(regex=r"^demo_age\.").empty else {}
-
-    context = {
-        "merchant": snap,
-        "summary": {
-            "avg_sales_idx": avg_sales_idx,
-            "avg_rank_area": avg_rank_area,
-            "avg_delivery": avg_delivery,
-        },
-        "customers": customers,
-        "competitors": comp,
-        "timeseries": ts,
-    }
-    return context, df
+    # 3개 조회 병렬 + (mct, 최신월) 단위 메모 → 재실행 시 재조회·재정제 없음
+    built = build_report_context(mct)
+    return built["context"], built["df"]
+
+def _report_key():
+    if USE_LLM:
+        from app.chat_core import REPORT_PROMPT_VERSION
+        return REPORT_PROMPT_VERSION, os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+    return STORY_VERSION, STORY_MODEL
+
+def _generate_text(ctx: dict, df: pd.DataFrame) -> str:
+    if USE_LLM:
+        from app.chat_core import build_chat_core_from_env
+        return build_chat_core_from_env().generate_marketing_report(llm_context(ctx))
+    return _story_from_df(df, ctx)
+
+def load_report(mct: str, bundle=None):
+    """
+    기준월이 같은 저장 보고서가 있으면 PK 조회 1건으로 반환.
+    없으면 컨텍스트 조립 → 스토리라인/LLM 생성 → reports 저장.
+    저장분 payload가 이전 형식(PAYLOAD_VERSION 불일치)이면 본문은 재사용하고 payload만 다시 저장.
+    반환: (ctx, df, text, info)
+    """
+    t0 = time.perf_counter()
+    dm = data_month()
+    pv, model = _report_key()
+    stored = None
+    if dm:
+        try:
+            stored = fetch_report(mct, dm, pv, model)
+        except Exception:
+            stored = None  # 저장소 장애 시 생성 경로로
+    done = bool(stored and stored["status"] == "done" and stored.get("payload"))
+    if done and payload_is_current(stored["payload"]):
+        ctx, df = frame_from_payload(stored["payload"])
+        return ctx, df, stored["report"], {"source": "stored", "data_month": dm,
+                                            "total": round((time.perf_counter() - t0) * 1000, 1)}
+
+    built = build_report_context(mct, bundle=bundle)
+    ctx, df = built["context"], built["df"]
+    info = {"source": "restored" if done else "generated", "data_month": dm,
+            "cached": built["cached"], **built["timings"]}
+    if not ctx or not ctx.get("merchant"):
+        return ctx, df, None, info
+    t1 = time.perf_counter()
+    text = stored["report"] if done else _generate_text(ctx, df)
+    info["generate"] = round((time.perf_counter() - t1) * 1000, 1)
+    if dm and not text.startswith("(LLM"):
+        try:
+            upsert_report({
+                "encoded_mct": mct, "data_month": dm, "prompt_version": pv, "model": model,
+                "status": "done", "report": text, "elapsed_ms": stored["elapsed_ms"] if done else info["generate"],
+                "payload": report_payload(ctx, df),
+            })
+        except Exception:
+            pass
+    return ctx, df, text, info
 
 # ----------------------------
 # Public API
 # ----------------------------
-def render_report(mct: str, show_debug: bool = False):
-    ctx, df = build_llm_context(mct)
+def render_report(mct: str, show_debug: bool = False, bundle=None):
+    ctx, df, text, info = load_report(mct, bundle=bundle)
     if not ctx or not ctx.get("merchant"):
         st.warning("해당 가맹점 데이터를 찾을 수 없습니다.")
         return
@@ -210,16 +224,20 @@ def render_report(mct: str, show_debug: bool = False):
 
     # ---------------- DEMO 스토리라인 ----------------
     st.markdown("### 🤖 AI 기반 마케팅 인사이트 (Demo)")
-    st.write(_story_from_df(df, ctx))
+    st.write(text)
 
     if show_debug:
         st.markdown("#### 📦 스토리라인 산출 입력(축약)")
         slim = {
             "merchant": {k: ctx.get("merchant", {}).get(k) for k in ("name","industry","bizarea","month")},
-            "timeseries_rows": len(ctx.get("timeseries") or []),
+            "timeseries_rows": len(df),
             "competitors_rows": len(ctx.get("competitors") or []),
-            "has_demo_age": bool(df.filter(regex=r'^demo_age\.').shape[1]),
+            "has_demo_age": bool(set(AGE_COLS.values()) & set(df.columns)),
             "avg_peer_idx": ctx.get("summary", {}).get("avg_sales_idx"),
             "avg_rank_pct": ctx.get("summary", {}).get("avg_rank_area"),
         }
         st.json(slim)
+        st.markdown("#### ⏱ 단계별 소요(ms)")
+        st.json(info)
+        st.markdown("#### 🗄 캐시·커넥션 풀")
+        st.json({"cache": cache_stats(), "pools": all_pool_stats()})